@@ -0,0 +1,68 @@
+"""
+Liaison des comptes Discord <-> Twitch
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Sur Discord, `!link` donne un code à usage unique ; le viewer le tape dans le
+chat Twitch (`!link CODE`) pour prouver qu'il possède le compte. Les liens sont
+stockés par ID (Discord -> ID Twitch), un changement de pseudo ne casse rien.
+"""
+
+import json
+import os
+import secrets
+import time
+from config import ACCOUNT_LINKS_FILE, ACCOUNT_LINK_CODE_TTL_S
+
+
+class LiensComptes:
+    """Liens Discord -> Twitch + codes de confirmation en attente."""
+
+    def __init__(self):
+        self.liens = {}       # {discord_id: {"twitch_id": ..., "twitch_login": ...}}
+        self._en_attente = {}  # {code: (discord_id, expiration)}
+        self._charger()
+
+    def _charger(self):
+        if not os.path.exists(ACCOUNT_LINKS_FILE):
+            return
+        try:
+            with open(ACCOUNT_LINKS_FILE, "r", encoding="utf-8") as f:
+                self.liens = json.load(f)
+        except Exception as e:
+            print(f"[LIENS] Erreur chargement: {e}")
+
+    def _sauver(self):
+        try:
+            os.makedirs(os.path.dirname(ACCOUNT_LINKS_FILE), exist_ok=True)
+            tmp = ACCOUNT_LINKS_FILE + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.liens, f, indent=4)
+            os.replace(tmp, ACCOUNT_LINKS_FILE)
+        except Exception as e:
+            print(f"[LIENS] Erreur sauvegarde: {e}")
+
+    def demander(self, discord_id: int) -> str:
+        """Crée un code de liaison pour ce compte Discord."""
+        maintenant = time.time()
+        # Purge des codes expirés (et de l'ancien code de ce compte)
+        self._en_attente = {
+            c: (d, exp) for c, (d, exp) in self._en_attente.items()
+            if exp > maintenant and d != str(discord_id)
+        }
+        code = secrets.token_hex(3).upper()
+        self._en_attente[code] = (str(discord_id), maintenant + ACCOUNT_LINK_CODE_TTL_S)
+        return code
+
+    def confirmer(self, code: str, twitch_id: str, twitch_login: str) -> str | None:
+        """Valide un code tapé sur Twitch. Retourne l'ID Discord lié, ou None."""
+        entree = self._en_attente.pop(code.strip().upper(), None)
+        if not entree or entree[1] < time.time():
+            return None
+        discord_id = entree[0]
+        self.liens[discord_id] = {"twitch_id": str(twitch_id), "twitch_login": twitch_login}
+        self._sauver()
+        return discord_id
+
+    def twitch_de(self, discord_id: int) -> dict | None:
+        """Compte Twitch lié à ce compte Discord."""
+        return self.liens.get(str(discord_id))
@@ -0,0 +1,110 @@
+"""
+Diffusion des annonces de live vers plusieurs destinations
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Chaque destination (webhook Discord, salons du bot Discord...) est envoyée en
+parallèle, avec ses propres réessais : une destination lente ou en erreur ne
+retarde pas les autres. La latence détection -> envoi est mesurée.
+
+Un POST n'est pas idempotent : seuls les échecs dont on sait que rien n'a été
+posté (connexion impossible, 429, 5xx) sont réessayés, sinon un timeout après
+acceptation par Discord donnerait deux annonces.
+"""
+
+import abc
+import asyncio
+import time
+import aiohttp
+from config import ANNOUNCE_RETRIES, ANNOUNCE_BUS_TIMEOUT_S
+from event_bus import AnnonceLive
+
+
+class EchecNonDelivre(Exception):
+    """Échec sans rien de posté (connexion refusée, 429, 5xx) : réessai sans risque de doublon."""
+
+
+class Destination(abc.ABC):
+    """Cible d'une annonce."""
+    nom = "destination"
+
+    @abc.abstractmethod
+    async def envoyer(self, mention: str, embed: dict, suivi: dict):
+        """Envoie l'annonce. Lève EchecNonDelivre si un réessai est sans risque, une autre exception sinon.
+
+        `suivi` est propre à une annonce (partagé entre ses réessais) : une destination
+        à plusieurs cibles y note ce qui est déjà posté.
+        """
+
+
+class WebhookDestination(Destination):
+    """Webhook Discord (via le client HTTP partagé)."""
+
+    def __init__(self, bot, url: str):
+        self.bot = bot
+        self.url = url
+        # On n'affiche pas le token du webhook dans les logs
+        self.nom = "webhook …" + url[-6:]
+
+    async def envoyer(self, mention: str, embed: dict, suivi: dict):
+        payload = {
+            "content": mention,
+            "embeds": [embed],
+            "allowed_mentions": {"parse": ["roles"]}
+        }
+        try:
+            resp = await self.bot.http_client.request("POST", self.url, json=payload, retries=0)
+        except aiohttp.ClientConnectorError as e:
+            # Connexion jamais établie : rien n'a été envoyé
+            raise EchecNonDelivre(f"connexion impossible ({e})") from e
+        if resp.status == 429 or resp.status >= 500:
+            raise EchecNonDelivre(f"Discord {resp.status}: {resp.data}")
+        if not resp.ok:
+            raise RuntimeError(f"Discord {resp.status}: {resp.data}")
+
+
+class BusDestination(Destination):
+    """Salons du bot Discord (même process), via le bus d'événements et sa connexion existante."""
+    nom = "bot Discord"
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def envoyer(self, mention: str, embed: dict, suivi: dict):
+        # Réessai : uniquement les salons qui ont échoué la fois précédente
+        salons = suivi.get("salons", ())
+        accuse = asyncio.get_running_loop().create_future()
+        if not self.bot.bus.publish(AnnonceLive(mention, embed, accuse, salons)):
+            raise EchecNonDelivre("bot Discord non connecté")
+        # Le bot Discord résout `accuse` avec {salon: None si posté, sinon l'exception}
+        resultats = await asyncio.wait_for(accuse, timeout=ANNOUNCE_BUS_TIMEOUT_S)
+        echecs = {salon: e for salon, e in resultats.items() if e is not None}
+        if not echecs:
+            return
+        suivi["salons"] = tuple(echecs)
+        detail = ", ".join(f"{salon}: {e}" for salon, e in echecs.items())
+        if all(isinstance(e, EchecNonDelivre) for e in echecs.values()):
+            raise EchecNonDelivre(detail)
+        raise RuntimeError(detail)
+
+
+async def _envoyer_avec_reessais(destination: Destination, mention: str, embed: dict, debut: float) -> tuple:
+    """Retourne (nom, succès, latence depuis la détection en secondes, erreur)."""
+    erreur = None
+    suivi = {}
+    for essai in range(ANNOUNCE_RETRIES + 1):
+        try:
+            await destination.envoyer(mention, embed, suivi)
+            return destination.nom, True, time.perf_counter() - debut, None
+        except EchecNonDelivre as e:
+            erreur = e
+            if essai < ANNOUNCE_RETRIES:
+                await asyncio.sleep(1 * 2 ** essai)
+        except Exception as e:
+            # Peut-être posté (timeout...) : pas de réessai, pour ne pas annoncer deux fois
+            return destination.nom, False, time.perf_counter() - debut, e
+    return destination.nom, False, time.perf_counter() - debut, erreur
+
+
+async def diffuser(destinations: list[Destination], mention: str, embed: dict, debut: float) -> list[tuple]:
+    """Envoie l'annonce à toutes les destinations en parallèle."""
+    return await asyncio.gather(*(_envoyer_avec_reessais(d, mention, embed, debut) for d in destinations))
@@ -3,11 +3,14 @@ import os
 import asyncio
 import time
 from config import (
-    TWITCH_CHANNEL, DISCORD_ANNOUNCE_URL, DISCORD_ROLE_ID,
+    TWITCH_CHANNEL, DISCORD_ANNOUNCE_URLS, DISCORD_ANNOUNCE_CHANNEL_IDS, DISCORD_ROLE_ID,
     POLL_INTERVAL_S, ANNOUNCE_MESSAGES, MENTION_MESSAGES,
-    DISCORD_ANNOUNCE_COOLDOWN_S, ANNOUNCE_STATE_FILE
+    DISCORD_ANNOUNCE_COOLDOWN_S, ANNOUNCE_STATE_FILE, ANNOUNCE_PREFETCH_S
 )
 from utils import detect_streamer, clean_title
+from announce_pipeline import WebhookDestination, BusDestination, diffuser
+
+IMAGE_PAR_DEFAUT = "https://static-cdn.jtvnw.net/ttv-static/404_preview-1280x720.jpg"
 
 
 class StreamAnnouncer:
@@ -18,6 +21,15 @@ class StreamAnnouncer:
         self._etait_en_live = False
         self._tache_surveillance = None
         self._last_announce_time = self._load_last_announce_time()
+        # Pré-chargé hors live : infos de la chaîne et box art (par game_id)
+        self._broadcaster_id = None
+        self._infos_chaine = None
+        self._infos_chaine_date = None  # time.monotonic() du dernier appel fetch_channels
+        self._box_arts = {}
+        self.destinations = (
+            [WebhookDestination(bot, url) for url in DISCORD_ANNOUNCE_URLS]
+            + ([BusDestination(bot)] if DISCORD_ANNOUNCE_CHANNEL_IDS else [])
+        )
 
     async def start(self):
         """Démarre la surveillance du stream."""
@@ -72,8 +84,14 @@ class StreamAnnouncer:
         except Exception as e:
             print(f"[POLL] Erreur API: {e}")
             return
+        detection = time.perf_counter()
         
         est_en_live = len(streams) > 0
+        # État partagé : les routines qui n'ont de sens qu'en live s'arrêtent hors ligne
+        self.bot.etat_live.mettre_a_jour(est_en_live)
+        if est_en_live:
+            # Échantillon viewers / catégorie pour l'historique des streams (même appel Helix)
+            await self.bot.sessions.echantillonner(streams[0])
         
         # Nouveau stream détecté
         if est_en_live and not self._etait_en_live:
@@ -82,68 +100,21 @@ class StreamAnnouncer:
             if now - self._last_announce_time < DISCORD_ANNOUNCE_COOLDOWN_S:
                 print(f"[LIVE] ⏳ Stream en cours, mais annonce ignorée (Cooldown actif). Prochaine annonce possible dans {int((DISCORD_ANNOUNCE_COOLDOWN_S - (now - self._last_announce_time)) / 60)} min.")
                 self._etait_en_live = True
+                self._debut_session(streams[0])
                 return
 
             stream = streams[0]
-            titre = stream.title or "Sans titre"
-            categorie = stream.game_name or "Aucune catégorie"
-            
-            # On récupère l'image du stream (1280x720)
-            # On ajoute "?t=" avec le temps actuel pour forcer Discord à recharger l'image (cache-buster)
-            try:
-                # TwitchIO v2.x utilise parfois .thumbnail_url ou .thumbnail
-                url_template = getattr(stream, "thumbnail_url", getattr(stream, "thumbnail", None))
-                
-                if url_template:
-                    image_url = url_template.format(width=1280, height=720)
-                    image_url += f"?t={int(time.time())}"
-                else:
-                    print(f"[DEBUG] Image introuvable. Attributs: {dir(stream)}")
-                    image_url = "https://static-cdn.jtvnw.net/ttv-static/404_preview-1280x720.jpg"
-            except Exception as e:
-                print(f"[POLL] Erreur formatage image: {e}")
-                image_url = "https://static-cdn.jtvnw.net/ttv-static/404_preview-1280x720.jpg"
-
-            # On récupère l'image de la catégorie (Box Art)
-            box_art_url = ""
-            try:
-                if stream.game_id:
-                    # On fetch les infos du jeu pour avoir la box art propre
-                    games_info = await self.bot.fetch_games(ids=[int(stream.game_id)])
-                    if games_info:
-                        # Format classique Twitch : {width}x{height}
-                        box_art_url = games_info[0].box_art_url.format(width=188, height=250)
-            except Exception as e:
-                print(f"[POLL] Erreur récupération categorie: {e}")
-            
+            self._debut_session(stream)
+            # Box art + infos chaîne en parallèle (souvent déjà en cache grâce au pré-chargement)
+            box_art_url, infos = await asyncio.gather(
+                self._box_art(stream.game_id), self._charger_infos_chaine()
+            )
+            titre = stream.title or getattr(infos, "title", None) or "Sans titre"
+            categorie = stream.game_name or getattr(infos, "game_name", None) or "Aucune catégorie"
             print(f"[LIVE] 🟢 Stream détecté ! {categorie} | {titre}")
-            
-            streamer = detect_streamer(titre)
-            template = ANNOUNCE_MESSAGES.get(streamer, ANNOUNCE_MESSAGES["DEFAULT"])
-            texte_annonce = template.format(title=clean_title(titre), category=categorie)
-            
-            # Mention du rôle + Petit message
-            role_ping = f"<@&{DISCORD_ROLE_ID}>" if DISCORD_ROLE_ID else "@everyone"
-            
-            # Selection du message de mention selon le streamer
-            mention_template = MENTION_MESSAGES.get(streamer, MENTION_MESSAGES["DEFAULT"])
-            mention = mention_template.format(role=role_ping)
-            
-            # On prépare l'Embed (le joli encadré)
-            embed = {
-                "title": f"🔴 LIVE : {titre}",
-                "description": texte_annonce,
-                "color": 0x9146FF,  # Violet Twitch
-                "image": {"url": image_url},
-                "thumbnail": {"url": box_art_url} if box_art_url else {},
-                "fields": [
-                    {"name": "Catégorie", "value": categorie, "inline": True},
-                    {"name": "Lien", "value": f"[Regarder sur Twitch](https://twitch.tv/{TWITCH_CHANNEL})", "inline": True}
-                ],
-                "footer": {"text": "RyosaChii Bot • Annonce Automatique"}
-            }
-            
-            await self._envoyer_annonce_riche(mention, embed)
+
+            mention, embed = self._construire_annonce(titre, categorie, self._image_stream(stream), box_art_url)
+            await self._envoyer_annonce_riche(mention, embed, detection)
             
             # Mise à jour de l'état
             self._etait_en_live = True
@@ -154,29 +125,121 @@ class StreamAnnouncer:
         elif not est_en_live and self._etait_en_live:
             print("[LIVE] 🔴 Stream terminé")
             self._etait_en_live = False
+            await self.bot.sessions.hors_ligne(self.bot.analytics.fin_stream())
 
-    async def _envoyer_annonce_riche(self, mention: str, embed: dict):
-        """Envoie une annonce Discord avec un Embed et une image."""
-        if not DISCORD_ANNOUNCE_URL:
-            print("[ANNOUNCE] Webhook non configuré")
-            return
-            
-        session = getattr(self.bot, "http_session", None)
-        if not session:
-            print("[ANNOUNCE] Pas de session HTTP")
-            return
+        # Hors live : on prépare la prochaine annonce (titre, catégorie, box art), sans appel Helix à chaque poll
+        elif not est_en_live:
+            await self.bot.sessions.hors_ligne()
+            if self._infos_chaine_date is None or time.monotonic() - self._infos_chaine_date >= ANNOUNCE_PREFETCH_S:
+                infos = await self._charger_infos_chaine(forcer=True)
+                if infos is not None:
+                    await self._box_art(getattr(infos, "game_id", None))
 
+    def _debut_session(self, stream):
+        """Ouvre la session de statistiques du stream (reprise si le bot redémarre en plein live)."""
+        debut = getattr(stream, "started_at", None)
+        self.bot.analytics.debut_stream(
+            debut.timestamp() if debut else time.time(), stream.title or "", stream.game_name or ""
+        )
+
+    # ─────────────────────────── PRÉ-CHARGEMENT ───────────────────────────
+
+    async def _charger_infos_chaine(self, forcer: bool = False):
+        """Infos de la chaîne (titre/catégorie), gardées en cache entre deux polls."""
+        if self._infos_chaine is not None and not forcer:
+            return self._infos_chaine
+        try:
+            if self._broadcaster_id is None:
+                users = await self.bot.fetch_users(names=[TWITCH_CHANNEL])
+                if not users:
+                    return self._infos_chaine
+                self._broadcaster_id = users[0].id
+            self._infos_chaine_date = time.monotonic()
+            infos = await self.bot.fetch_channels(broadcaster_ids=[self._broadcaster_id])
+            if infos:
+                self._infos_chaine = infos[0]
+        except Exception as e:
+            print(f"[POLL] Erreur infos chaîne: {e}")
+        return self._infos_chaine
+
+    async def _box_art(self, game_id) -> str:
+        """Image de la catégorie (Box Art), en cache par jeu."""
+        if not game_id:
+            return ""
+        game_id = str(game_id)
+        if game_id in self._box_arts:
+            return self._box_arts[game_id]
         try:
-            payload = {
-                "content": mention,
-                "embeds": [embed],
-                "allowed_mentions": {"parse": ["roles"]}
-            }
-            async with session.post(DISCORD_ANNOUNCE_URL, json=payload, timeout=5) as resp:
-                if 200 <= resp.status < 300:
-                    print("[ANNOUNCE] ✅ Annonce avec image envoyée !")
-                else:
-                    err_text = await resp.text()
-                    print(f"[ANNOUNCE] ❌ Erreur Discord {resp.status}: {err_text}")
+            # On fetch les infos du jeu pour avoir la box art propre
+            games_info = await self.bot.fetch_games(ids=[int(game_id)])
+            if games_info:
+                # Format classique Twitch : {width}x{height}
+                self._box_arts[game_id] = games_info[0].box_art_url.format(width=188, height=250)
+                return self._box_arts[game_id]
         except Exception as e:
-            print(f"[ANNOUNCE] ❌ Erreur: {e}")
+            print(f"[POLL] Erreur récupération categorie: {e}")
+        return ""
+
+    @staticmethod
+    def _image_stream(stream) -> str:
+        """Aperçu du stream (1280x720), avec un cache-buster : Discord met l'image en cache par URL."""
+        try:
+            # TwitchIO v2.x utilise parfois .thumbnail_url ou .thumbnail
+            url_template = getattr(stream, "thumbnail_url", getattr(stream, "thumbnail", None))
+            if url_template:
+                # "?t=" : sinon Discord réaffiche l'aperçu d'un live précédent (calculé une fois par annonce,
+                # les réessais envoient le même embed)
+                return url_template.format(width=1280, height=720) + f"?t={int(time.time())}"
+            print(f"[DEBUG] Image introuvable. Attributs: {dir(stream)}")
+        except Exception as e:
+            print(f"[POLL] Erreur formatage image: {e}")
+        return IMAGE_PAR_DEFAUT
+
+    # ─────────────────────────── ANNONCE ───────────────────────────
+
+    def _construire_annonce(self, titre: str, categorie: str, image_url: str, box_art_url: str) -> tuple[str, dict]:
+        """Construit la mention et l'Embed (le joli encadré)."""
+        streamer = detect_streamer(titre)
+        template = ANNOUNCE_MESSAGES.get(streamer, ANNOUNCE_MESSAGES["DEFAULT"])
+        texte_annonce = template.format(title=clean_title(titre), category=categorie)
+        
+        # Mention du rôle + Petit message
+        role_ping = f"<@&{DISCORD_ROLE_ID}>" if DISCORD_ROLE_ID else "@everyone"
+        
+        # Selection du message de mention selon le streamer
+        mention_template = MENTION_MESSAGES.get(streamer, MENTION_MESSAGES["DEFAULT"])
+        mention = mention_template.format(role=role_ping)
+        
+        embed = {
+            "title": f"🔴 LIVE : {titre}",
+            "description": texte_annonce,
+            "color": 0x9146FF,  # Violet Twitch
+            "image": {"url": image_url},
+            "thumbnail": {"url": box_art_url} if box_art_url else {},
+            "fields": [
+                {"name": "Catégorie", "value": categorie, "inline": True},
+                {"name": "Lien", "value": f"[Regarder sur Twitch](https://twitch.tv/{TWITCH_CHANNEL})", "inline": True}
+            ],
+            "footer": {"text": "RyosaChii Bot • Annonce Automatique"}
+        }
+        return mention, embed
+
+    async def _envoyer_annonce_riche(self, mention: str, embed: dict, detection: float):
+        """Envoie l'annonce à toutes les destinations en parallèle et mesure la latence."""
+        if not self.destinations:
+            print("[ANNOUNCE] Aucune destination configurée")
+            return
+
+        resultats = await diffuser(self.destinations, mention, embed, detection)
+        for nom, ok, latence, erreur in resultats:
+            if ok:
+                print(f"[ANNOUNCE] ✅ Annonce envoyée ({nom}) en {latence * 1000:.0f} ms")
+            else:
+                print(f"[ANNOUNCE] ❌ Échec ({nom}): {erreur}")
+
+        total = max(latence for _, _, latence, _ in resultats)
+        reussies = sum(1 for _, ok, _, _ in resultats if ok)
+        print(f"[ANNOUNCE] {reussies}/{len(resultats)} destinations, détection -> dernier envoi : {total * 1000:.0f} ms")
+        self.bot.moderator._log_background(
+            f"📣 Annonce live : {reussies}/{len(resultats)} destinations en {total * 1000:.0f} ms"
+        )
@@ -0,0 +1,251 @@
+"""
+Liste noire : comptes bots connus et domaines de scam (listes communautaires)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Les listes (une entrée par ligne, des centaines de milliers possibles) sont
+déposées dans data/blocklists/bots/ et data/blocklists/domaines/ : chaque
+fichier est une source, réimportée en bloc dans une base SQLite indexée
+(data/blocklist.db) quand il change. La vérification se fait en deux temps :
+  - un filtre de Bloom en mémoire (quelques Mo) répond "absent à coup sûr"
+    pour la quasi-totalité des messages, sans toucher au disque ;
+  - seuls les rares "peut-être" (vrais positifs + ~0,1 % de faux positifs)
+    sont confirmés par une lecture exacte de l'index SQLite.
+Une correspondance mène au ban direct (voir Moderator._verifier_liste_noire).
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from config import BLOCKLIST_DB_FILE, BLOCKLIST_DIRS, BLOCKLIST_REFRESH_S, BLOCKLIST_FAUX_POSITIFS
+from link_policy import analyser
+
+TYPES = ("bot", "domaine")
+
+
+class FiltreBloom:
+    """Ensemble approximatif : pas de faux négatif, `taux` de faux positifs."""
+    __slots__ = ("bits", "m", "k")
+
+    def __init__(self, capacite: int, taux: float):
+        capacite = max(1, capacite)
+        self.m = max(8, int(-capacite * math.log(taux) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacite * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+
+    def _positions(self, valeur: str):
+        # Double hachage (Kirsch-Mitzenmacher) : un seul condensé pour les k positions
+        empreinte = hashlib.blake2b(valeur.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(empreinte[:8], "little")
+        h2 = int.from_bytes(empreinte[8:], "little") | 1
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def ajouter(self, valeur: str):
+        bits = self.bits
+        for p in self._positions(valeur):
+            bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, valeur: str) -> bool:
+        bits = self.bits
+        for p in self._positions(valeur):
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+
+def _entrees(chemin: str):
+    """Valeurs d'un fichier de liste (commentaires #, CSV, format hosts "0.0.0.0 domaine")."""
+    with open(chemin, "r", encoding="utf-8", errors="ignore") as f:
+        for ligne in f:
+            ligne = ligne.split("#", 1)[0].strip()
+            if not ligne:
+                continue
+            champs = ligne.replace(",", " ").split()
+            valeur = champs[1] if len(champs) > 1 and champs[0] in ("0.0.0.0", "127.0.0.1") else champs[0]
+            yield valeur.lower().lstrip("@").strip(".")
+
+
+def _suffixes(hote: str) -> list[str]:
+    """'a.b.scam.com' -> ['a.b.scam.com', 'b.scam.com', 'scam.com'] (une entrée couvre ses sous-domaines)."""
+    labels = hote.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels) - 1)] or [hote]
+
+
+class BaseListeNoire:
+    """Index exact sur disque (import appelé depuis un thread)."""
+
+    def __init__(self, chemin: str = BLOCKLIST_DB_FILE):
+        self.chemin = chemin
+        self._conn = None  # Écriture (imports, dans un thread)
+        self._lecture = None  # Confirmations exactes (boucle asyncio, jamais bloquée par un import)
+        self._verrou = threading.Lock()
+
+    def ouvrir(self):
+        os.makedirs(os.path.dirname(self.chemin) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.chemin, check_same_thread=False)
+        with self._verrou, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entrees (
+                    type TEXT NOT NULL,
+                    valeur TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    PRIMARY KEY (type, valeur, source)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_entrees_source ON entrees(source);
+                CREATE TABLE IF NOT EXISTS sources (
+                    nom TEXT PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    entrees INTEGER NOT NULL,
+                    importe_le REAL NOT NULL
+                );
+            """)
+        # WAL : cette connexion lit pendant qu'un import écrit sur l'autre
+        self._lecture = sqlite3.connect(self.chemin, check_same_thread=False)
+
+    def fermer(self):
+        for conn in (self._conn, self._lecture):
+            if conn is not None:
+                conn.close()
+        self._conn = self._lecture = None
+
+    def sources(self) -> dict:
+        """{nom: (type, mtime, entrées)}"""
+        with self._verrou:
+            lignes = self._conn.execute("SELECT nom, type, mtime, entrees FROM sources").fetchall()
+        return {nom: (type_, mtime, n) for nom, type_, mtime, n in lignes}
+
+    def importer(self, type_: str, nom: str, chemin: str, mtime: float) -> int:
+        """Remplace toutes les entrées de la source en une transaction. Retourne leur nombre."""
+        valeurs = {v for v in _entrees(chemin) if v}
+        with self._verrou, self._conn:
+            self._conn.execute("DELETE FROM entrees WHERE source = ?", (nom,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO entrees VALUES (?, ?, ?)",
+                ((type_, v, nom) for v in valeurs)
+            )
+            self._conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                               (nom, type_, mtime, len(valeurs), time.time()))
+        return len(valeurs)
+
+    def retirer(self, nom: str):
+        """Source supprimée du dossier."""
+        with self._verrou, self._conn:
+            self._conn.execute("DELETE FROM entrees WHERE source = ?", (nom,))
+            self._conn.execute("DELETE FROM sources WHERE nom = ?", (nom,))
+
+    def construire_filtre(self, type_: str) -> tuple[FiltreBloom, int]:
+        """Filtre de Bloom de toutes les valeurs d'un type (lecture en flux, sans tout charger)."""
+        with self._verrou:
+            n = self._conn.execute("SELECT COUNT(*) FROM entrees WHERE type = ?", (type_,)).fetchone()[0]
+            filtre = FiltreBloom(n, BLOCKLIST_FAUX_POSITIFS)
+            for (valeur,) in self._conn.execute("SELECT DISTINCT valeur FROM entrees WHERE type = ?", (type_,)):
+                filtre.ajouter(valeur)
+        return filtre, n
+
+    def source_de(self, type_: str, valeur: str) -> str | None:
+        """Lecture exacte sur la clé primaire : nom de la source, None si absent."""
+        ligne = self._lecture.execute(
+            "SELECT source FROM entrees WHERE type = ? AND valeur = ? LIMIT 1", (type_, valeur)
+        ).fetchone()
+        return ligne[0] if ligne else None
+
+
+class ListeNoire:
+    """Filtres en mémoire + import / rafraîchissement périodique des fichiers."""
+
+    def __init__(self, dossiers: dict = BLOCKLIST_DIRS):
+        self.dossiers = dossiers
+        self.base = BaseListeNoire()
+        self.filtres = {}  # {type: FiltreBloom} ; absent = pas encore chargé (rien n'est bloqué)
+        self.tailles = {}  # {type: entrées}
+        self._tache = None
+
+    async def start(self):
+        if self._tache is None:
+            await asyncio.to_thread(self.base.ouvrir)
+            self._tache = asyncio.create_task(self._boucle())
+
+    async def stop(self):
+        if self._tache:
+            self._tache.cancel()
+            try:
+                await self._tache
+            except asyncio.CancelledError:
+                pass
+            self._tache = None
+            self.base.fermer()
+
+    # ─────────────────────────── VÉRIFICATION ───────────────────────────
+
+    def _chercher(self, type_: str, valeur: str) -> str | None:
+        filtre = self.filtres.get(type_)
+        if filtre is None or valeur not in filtre:
+            return None  # Cas courant : aucune lecture disque
+        return self.base.source_de(type_, valeur)
+
+    def bot_connu(self, login: str) -> str | None:
+        """Source qui liste ce compte, None sinon."""
+        return self._chercher("bot", login.lower())
+
+    def domaine_interdit(self, liens: list[str]) -> tuple[str, str] | None:
+        """(domaine, source) du premier lien listé, None sinon."""
+        for lien in liens:
+            hote, _ = analyser(lien)
+            for domaine in _suffixes(hote):
+                source = self._chercher("domaine", domaine)
+                if source:
+                    return domaine, source
+        return None
+
+    # ─────────────────────────── IMPORT ───────────────────────────
+
+    async def _boucle(self):
+        while True:
+            try:
+                await self.rafraichir()
+            except Exception as e:
+                print(f"[LISTE NOIRE] Erreur rafraîchissement: {e}")
+            await asyncio.sleep(BLOCKLIST_REFRESH_S)
+
+    async def rafraichir(self):
+        """Réimporte les fichiers nouveaux / modifiés, puis reconstruit les filtres concernés."""
+        connues = await asyncio.to_thread(self.base.sources)
+        vues = set()
+        modifies = set()
+        for type_, dossier in self.dossiers.items():
+            if not os.path.isdir(dossier):
+                continue
+            for fichier in sorted(os.listdir(dossier)):
+                chemin = os.path.join(dossier, fichier)
+                if not os.path.isfile(chemin):
+                    continue
+                nom = f"{type_}/{fichier}"
+                vues.add(nom)
+                mtime = os.path.getmtime(chemin)
+                if nom in connues and connues[nom][1] == mtime:
+                    continue
+                debut = time.perf_counter()
+                n = await asyncio.to_thread(self.base.importer, type_, nom, chemin, mtime)
+                modifies.add(type_)
+                print(f"[LISTE NOIRE] {nom} : {n} entrées importées en {time.perf_counter() - debut:.1f}s")
+        for nom, (type_, _, _) in connues.items():
+            if nom not in vues:
+                await asyncio.to_thread(self.base.retirer, nom)
+                modifies.add(type_)
+                print(f"[LISTE NOIRE] {nom} retirée")
+
+        for type_ in TYPES:
+            if type_ in modifies or type_ not in self.filtres:
+                debut = time.perf_counter()
+                filtre, n = await asyncio.to_thread(self.base.construire_filtre, type_)
+                # Remplacement en une affectation : les vérifications en cours gardent l'ancien
+                self.filtres[type_] = filtre
+                self.tailles[type_] = n
+                print(f"[LISTE NOIRE] Filtre {type_} : {self.tailles[type_]} entrées, "
+                      f"{len(filtre.bits) / 1024:.0f} Ko, {time.perf_counter() - debut:.1f}s")
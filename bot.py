@@ -11,73 +11,149 @@ Structure:
   - bot.py         : Point d'entrée principal
 """
 
-import aiohttp
 from twitchio.ext import commands
 
-from config import TWITCH_TOKEN, TWITCH_CHANNEL, TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET, TWITCH_BOT_ID, TWITCH_NICK, DISCORD_WEBHOOK_URL
-from announcer import StreamAnnouncer
+from config import TWITCH_CHANNEL, TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET, TWITCH_BOT_ID, TWITCH_NICK
+# Uniquement ce qu'il faut pour la connexion IRC et la modération : le reste
+# (annonces, archive, points, clips...) est importé dans _demarrer_modules
 from moderation import Moderator
-from chat_alerts import ChatAlerter
+from chat_analytics import ChatAnalytics
+from live_state import EtatLive
+from raid_shield import RaidShield
+from mod_actions import ModerationAPI
+from token_manager import TokenManager
+from http_client import HttpClient
+from event_bus import EventBus
+from custom_commands import CommandManager
+from startup import PhaseTimer
+import state_snapshot
 import asyncio
-import aiohttp
-import datetime
 
 class Bot(commands.Bot):
     """Bot principal RyosaChii."""
     
-    def __init__(self):
+    def __init__(self, http_client: HttpClient | None = None, bus: EventBus | None = None,
+                 cmd_manager: CommandManager | None = None, timer: PhaseTimer | None = None,
+                 etat: dict | None = None):
+        # Le token persisté (déjà rafraîchi) est prioritaire sur celui du .env
+        self.token_manager = TokenManager(self)
         super().__init__(
-            token=TWITCH_TOKEN,
+            token=self.token_manager.token_irc,
             client_id=TWITCH_CLIENT_ID,
             client_secret=TWITCH_CLIENT_SECRET,
             bot_id=TWITCH_BOT_ID,
             prefix="!",
             initial_channels=[TWITCH_CHANNEL],
         )
-        self.http_session: aiohttp.ClientSession | None = None
-        self.announcer = StreamAnnouncer(self)
+        # Client HTTP partagé (injecté par run.py, sinon créé au démarrage)
+        self.http_client = http_client
+        self._http_client_owned = http_client is None
+        # Session aiohttp de http_client, renseignée au démarrage (utilisée par TokenManager)
+        self.http_session = None
+        # Bus partagé avec le bot Discord (lié par run.py)
+        self.bus = bus or EventBus()
+        self.discord_bot = None
+        # Commandes personnalisées (écrites par le dashboard), partagées avec le bot Discord
+        self.cmd_manager = cmd_manager or CommandManager()
+        # En ligne / hors ligne (alimenté par l'announcer, publié sur le bus)
+        self.etat_live = EtatLive(self.bus)
         self.moderator = Moderator(self)
+        self.mod_api = ModerationAPI(self)
         # Dashboard retiré du thread principal pour être standalone
-        self.chat_alerter = ChatAlerter(self)
-        self._modules_loaded = False
+        self.analytics = ChatAnalytics()
+        self.raid_shield = RaidShield(self)
+        # Modules non essentiels : créés par _demarrer_modules (None jusque-là)
+        self.liens_comptes = None
+        self.announcer = None
+        self.sessions = None
+        self.communaute = None
+        self.fidelite = None
+        self.chat_alerter = None
+        self.chat_archive = None
+        self.clips = None
+        # État en mémoire (flood, warns...) : celui de l'instance précédente, sinon la sauvegarde disque
+        self.snapshots = state_snapshot.Snapshotter(self)
+        duree = state_snapshot.restaurer(self, etat if etat is not None else state_snapshot.charger())
+        if duree:
+            print(f"[ETAT] ♻️ État restauré en {duree:.1f}ms")
+        # Démarrage : IRC d'abord, modules non essentiels ensuite (voir _demarrer_modules)
+        self.timer = timer or PhaseTimer()
+        self.pret = asyncio.Event()
+        self._demarrage = None
         self._heartbeat_task = None
 
     # ─────────────────────────── LIFECYCLE ───────────────────────────
 
+    async def start(self):
+        """Connexion IRC, précédée de la validation du token (TwitchIO le vérifie dans _connect)."""
+        await self._avant_connexion()
+        await super().start()
+
+    async def _avant_connexion(self):
+        """Session HTTP + token valide (refresh si le token stocké a expiré)."""
+        if self.http_client is None:
+            self.http_client = HttpClient()
+        await self.http_client.start()
+        self.http_session = self.http_client.session
+        with self.timer.phase("token"):
+            await self.token_manager.start()
+
     async def event_ready(self):
-        """Appelé quand le bot est connecté."""
+        """Appelé quand le bot est connecté (IRC) : la modération est active dès maintenant."""
         print(f"✅ Connecté en tant que {TWITCH_NICK} | sur #{TWITCH_CHANNEL}")
         
-        if self.http_session is None:
-            self.http_session = aiohttp.ClientSession()
+        await self.analytics.start()
+        await self.raid_shield.start()
+        await self.moderator.regles.start()
+        await self.moderator.liste_noire.start()
+        await self.snapshots.start()
+        if not self.pret.is_set():
+            print(f"[STARTUP] 🛡️ Modération active {self.timer.depuis_lancement_ms():.0f}ms après le lancement")
+        self.pret.set()
 
-        # Chargement des modules (une seule fois)
-        if not self._modules_loaded:
-            try:
-                await self.load_module("viewer_stats")
-                await self.load_module("general_commands")
-                # Custom commands (managed by files, verified dynamically)
-                await self.load_module("custom_commands") 
-                # Note: custom_commands.py usually has a setup function if it's an extension,
-                # but if it just provides a class, we might need to handle it.
-                # Checking `bot.py` original import: it didn't import custom_commands as module?
-                # Ah, wait. `dashboard.py` used `CommandManager`. `bot.py` lines 92-97 handled it manually.
-                # So we need to keep that logic or create a manager here.
-                # We will instantiate CommandManager here.
-                
-                self._modules_loaded = True
-                print("📦 Modules chargés avec succès")
-            except Exception as e:
-                # Si module déjà chargé ou erreur
-                # On ignore custom_commands erreur car on va le gérer manuellement si besoin
-                pass
-        
-        # Initialisation CommandManager (pour lire ce que le dashboard écrit)
-        from custom_commands import CommandManager
-        self.cmd_manager = CommandManager()
+        # Le reste (cogs, annonces, archive, clips...) se charge en arrière-plan
+        if self._demarrage is None:
+            self._demarrage = asyncio.create_task(self._demarrer_modules())
 
-        await self.announcer.start()
-        await self.chat_alerter.start()
+    async def _demarrer_modules(self):
+        """Modules non essentiels à la modération, chargés après la connexion IRC."""
+        with self.timer.phase("imports"):
+            from account_links import LiensComptes
+            from announcer import StreamAnnouncer
+            from stream_sessions import SessionsStream
+            from follower_sync import SyncCommunaute
+            from loyalty import Fidelite
+            from chat_alerts import ChatAlerter
+            from chat_archive import ChatArchive
+            from clips import ClipPipeline
+            self.liens_comptes = LiensComptes()
+            self.announcer = StreamAnnouncer(self)
+            self.sessions = SessionsStream(self)
+            self.communaute = SyncCommunaute(self)
+            self.fidelite = Fidelite(self)
+            self.chat_alerter = ChatAlerter(self)
+            self.chat_archive = ChatArchive()
+            self.clips = ClipPipeline(self)
+
+        # Chargement des cogs (import paresseux via load_module, après les services qu'ils utilisent)
+        with self.timer.phase("cogs"):
+            for module in ("viewer_stats", "general_commands"):
+                try:
+                    self.load_module(module)
+                except Exception as e:
+                    print(f"[BOT] Erreur chargement {module}: {e}")
+
+        with self.timer.phase("services"):
+            await self.sessions.start()
+            await self.communaute.start()
+            await self.fidelite.start()
+            await self.announcer.start()
+            await self.chat_alerter.start()
+            await self.chat_archive.start()
+            await self.clips.start()
+            await self.moderator.ombre.start()
+
+        self.timer.rapport("Bot Twitch")
         self.moderator._log_background(f"✅ **Bot RyosaChii démarré** sur #{TWITCH_CHANNEL}")
 
         # Démarrage Heartbeat
@@ -97,14 +173,28 @@ class Bot(commands.Bot):
 
     async def close(self):
         """Fermeture propre du bot."""
-        await self.announcer.stop()
-        await self.chat_alerter.stop()
+        if self._demarrage and not self._demarrage.done():
+            self._demarrage.cancel()
+        await self.snapshots.stop()
+        # Modules non essentiels : absents si l'arrêt survient avant _demarrer_modules
+        for module in (self.announcer, self.chat_alerter, self.chat_archive, self.sessions,
+                       self.communaute, self.fidelite, self.clips):
+            if module is not None:
+                await module.stop()
+        await self.raid_shield.stop()
+        await self.analytics.stop()
+        await self.moderator.regles.stop()
+        await self.moderator.liste_noire.stop()
+        await self.moderator.ombre.stop()
+        await self.token_manager.stop()
+        self.etat_live.fermer()
         if self._heartbeat_task:
             self._heartbeat_task.cancel()
             
         if self.http_session:
             await self.moderator._log("🛑 **Bot RyosaChii arrêté.**")
-            await self.http_session.close()
+            if self._http_client_owned:
+                await self.http_client.close()
         await super().close()
 
     # ─────────────────────────── EVENTS ───────────────────────────
@@ -114,13 +204,22 @@ class Bot(commands.Bot):
         if message.echo:
             return
         
-        # Compteur pour alertes auto
-        self.chat_alerter.compter_message()
+        # Débits du chat (alertes auto, bouclier, dashboard), viewer identifié par son ID Twitch
+        if message.author:
+            self.analytics.compter_message(str(getattr(message.author, "id", None) or message.author.name.lower()))
+        # Archive (simple ajout en mémoire, l'écriture se fait en arrière-plan ; pas encore chargée au tout début)
+        if self.chat_archive is not None:
+            self.chat_archive.archiver(message)
         
         # 1. Modération
         if await self.moderator.check_message(message):
             return
         
+        # Pas de préfixe : ce n'est pas une commande
+        if not message.content.startswith("!"):
+            return
+        self.analytics.compter_commande(message.content.split(maxsplit=1)[0].lower())
+
         # 2. Commandes Personnalisées (Dashboard)
         # On vérifie si le message correspond à une commande enregistrée
         response = self.cmd_manager.get_response(message.content)
@@ -129,11 +228,22 @@ class Bot(commands.Bot):
             return
         
         # 3. Commandes Hardcodées (!ping, etc.)
-        if message.content.startswith("!"):
-            print(f"[CMD] {message.author.name}: {message.content}")
-        
+        print(f"[CMD] {message.author.name}: {message.content}")
         await self.handle_commands(message)
 
+    async def event_join(self, channel, user):
+        """Compte les arrivées dans le chat (détection de vagues de bots)."""
+        self.raid_shield.compter_join()
+
+    async def event_raw_usernotice(self, channel, tags: dict):
+        """Raid Twitch entrant : on prévient le bouclier que le pic est légitime."""
+        if tags.get("msg-id") == "raid":
+            try:
+                nb = int(tags.get("msg-param-viewerCount", 0))
+            except ValueError:
+                nb = 0
+            self.raid_shield.raid_legitime(nb)
+
     # ─────────────────────────── COMMANDES ───────────────────────────
 
     @commands.command()
@@ -143,47 +253,16 @@ class Bot(commands.Bot):
 
     @commands.command(name="clip")
     async def clip_command(self, ctx: commands.Context):
-        """Commande !clip pour créer un clip."""
+        """Commande !clip : création en arrière-plan, les demandes rapprochées sont regroupées."""
+        if self.clips is None:
+            return  # Modules encore en chargement (voir _demarrer_modules)
         print(f"[CLIP] Création demandée par {ctx.author.name}")
-        try:
-            # 1. Récupérer le broadcaster
-            users = await self.fetch_users(names=[TWITCH_CHANNEL])
-            if not users:
-                await ctx.send("❌ Erreur : Diffuseur introuvable.")
-                return
-            
-            broadcaster = users[0]
-            
-            # 2. Créer le clip
-            # Utilisation du token dynamique du bot (qui se refresh auto)
-            clip = await broadcaster.create_clip(token=self._http.token)
-            
-            # 3. Réponse Chat
-            # create_clip peut retourner un dict ou un objet selon la version
-            if isinstance(clip, dict):
-                clip_id = clip.get('id')
-                clip_url = clip.get('edit_url') # Souvent l'url d'édition, mais on peut construire l'url publique
-                if not clip_url:
-                     clip_url = f"https://clips.twitch.tv/{clip_id}"
-            else:
-                clip_id = clip.id
-                clip_url = f"https://clips.twitch.tv/{clip.id}"
-                
-            await ctx.send(f"🎬 Clip créé par @{ctx.author.name} ! lien : {clip_url}")
-            
-            # 4. Log Discord
-            self.moderator._log_background(f"🎬 CLIP | Créé par @{ctx.author.name} | {clip_url}")
-
-        except Exception as e:
-            # Gestion d'erreur (ex: Stream offline)
-            err_msg = str(e)
-            if "offline" in err_msg.lower():
-                await ctx.send("❌ Impossible de créer un clip : Le stream est hors ligne.")
-            else:
-                await ctx.send(f"❌ Erreur lors de la création du clip.")
-                print(f"[CLIP] Erreur : {e}")
-            
-            self.moderator._log_background(f"❌ CLIP ERROR | @{ctx.author.name} | {e}")
+        etat = self.clips.demander(ctx.author.name, ctx.channel)
+        if etat == "nouveau":
+            await ctx.send(f"🎬 Clip en cours de création par @{ctx.author.name}...")
+        elif etat == "plein":
+            await ctx.send("⏳ Trop de clips en attente, réessaie dans un instant.")
+        # "groupe" : déjà en cours, l'auteur sera crédité sans spammer le chat
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -191,4 +270,8 @@ class Bot(commands.Bot):
 # ══════════════════════════════════════════════════════════════════════════════
 
 if __name__ == "__main__":
+    from config import verifier_config
+    erreurs = verifier_config()
+    if erreurs:
+        raise SystemExit("❌ " + " / ".join(erreurs))
     Bot().run()
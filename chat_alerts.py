@@ -10,7 +10,6 @@ class ChatAlerter:
 
     def __init__(self, bot):
         self.bot = bot
-        self.compteur_messages = 0
         self._tache = None
         
         # Valeurs par défaut (chargées depuis config.py ou le JSON)
@@ -49,16 +48,14 @@ class ChatAlerter:
                 pass
             self._tache = None
 
-    def compter_message(self):
-        """Incrémente le compteur à chaque message user."""
-        self.compteur_messages += 1
-
     async def _boucle_alertes(self):
         """Boucle principale."""
         # Premier délai pour ne pas spammer
         await asyncio.sleep(10) 
         
         while True:
+            # Pas de messages automatiques hors live : on attend le début du stream
+            await self.bot.etat_live.attendre_live()
             # Recharger la config à chaque itération (ou presque)
             self.load_config()
             
@@ -73,25 +70,31 @@ class ChatAlerter:
                 step = min(10, wait_time)
                 await asyncio.sleep(step)
                 wait_time -= step
-                # Si désactivé entre temps
+                # Si désactivé entre temps (ou fin du live)
                 self.load_config()
-                if not self.enabled:
+                if not self.enabled or not self.bot.etat_live.en_live:
                     break
             
-            if not self.enabled:
+            if not self.enabled or not self.bot.etat_live.en_live:
+                continue
+
+            # Pas de pub pendant une vague de bots
+            bouclier = getattr(self.bot, "raid_shield", None)
+            if bouclier and bouclier.actif:
                 continue
 
-            if self.compteur_messages >= self.threshold:
-                await self._envoyer_alerte()
-                self.compteur_messages = 0
+            # Messages reçus pendant l'intervalle écoulé (donc depuis la dernière alerte)
+            nb_messages = self.bot.analytics.messages(self.interval)
+            if nb_messages >= self.threshold:
+                await self._envoyer_alerte(nb_messages)
 
-    async def _envoyer_alerte(self):
+    async def _envoyer_alerte(self, nb_messages: int):
         """Envoie le message."""
         try:
             channel = self.bot.get_channel(config.TWITCH_CHANNEL)
             if channel:
                 await channel.send(self.text)
-                print(f"[ALERT] Message auto envoyé ({self.compteur_messages} msgs)")
+                print(f"[ALERT] Message auto envoyé ({nb_messages} msgs)")
             else:
                 # Si bot pas encore prêt ou channel pas trouvé
                 pass
@@ -0,0 +1,315 @@
+"""
+Statistiques d'activité du chat (débits, viewers actifs, commandes, heatmap)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Les compteurs sont des anneaux de taille fixe (un compartiment par seconde
+ou par minute) : ajouter un message coûte O(1) et la mémoire ne grossit
+jamais, quel que soit le débit. Le bot publie les séries pour le dashboard
+(data/chat_analytics.json) et garde un résumé par stream.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from config import (
+    ANALYTICS_FILE, ANALYTICS_EXPORT_S, ANALYTICS_SECONDES, ANALYTICS_MINUTES,
+    ANALYTICS_UNIQUES_MINUTES, ANALYTICS_RESUMES_MAX, ANALYTICS_TOP_COMMANDES
+)
+
+
+class Anneau:
+    """Compteurs par compartiment de `pas` secondes, sur les `taille` derniers compartiments."""
+    __slots__ = ("pas", "valeurs", "_indice")
+
+    def __init__(self, taille: int, pas: int):
+        self.pas = pas
+        self.valeurs = [0] * taille
+        self._indice = None  # Dernier compartiment (absolu)
+
+    def _avancer(self, indice: int):
+        """Remet à zéro les compartiments écoulés (au plus `taille` : O(1) amorti)."""
+        if self._indice is None:
+            self._indice = indice
+            return
+        ecart = indice - self._indice
+        if ecart <= 0:
+            return
+        taille = len(self.valeurs)
+        for i in range(1, min(ecart, taille) + 1):
+            self.valeurs[(self._indice + i) % taille] = 0
+        self._indice = indice
+
+    def ajouter(self, t: float, n: int = 1):
+        indice = int(t // self.pas)
+        self._avancer(indice)
+        if indice > self._indice - len(self.valeurs):
+            self.valeurs[indice % len(self.valeurs)] += n
+
+    def somme(self, secondes: float, t: float, depuis: float | None = None) -> int:
+        """Total sur les `secondes` dernières secondes (et après `depuis` si fourni)."""
+        self._avancer(int(t // self.pas))
+        taille = len(self.valeurs)
+        nb = min(taille, max(1, -(-int(secondes) // self.pas)))
+        premier = self._indice - nb + 1
+        if depuis is not None:
+            premier = max(premier, int(depuis // self.pas))
+        return sum(self.valeurs[i % taille] for i in range(premier, self._indice + 1))
+
+    def maximum(self, depuis: float, t: float) -> int:
+        self._avancer(int(t // self.pas))
+        taille = len(self.valeurs)
+        premier = max(self._indice - taille + 1, int(depuis // self.pas))
+        return max((self.valeurs[i % taille] for i in range(premier, self._indice + 1)), default=0)
+
+    def serie(self, t: float) -> list[list]:
+        """[[timestamp, valeur], ...] du plus ancien au plus récent."""
+        self._avancer(int(t // self.pas))
+        taille = len(self.valeurs)
+        return [[i * self.pas, self.valeurs[i % taille]]
+                for i in range(self._indice - taille + 1, self._indice + 1)]
+
+    def exporter(self) -> tuple:
+        return self._indice, list(self.valeurs)
+
+    def restaurer(self, donnees: tuple):
+        indice, valeurs = donnees
+        if len(valeurs) == len(self.valeurs):
+            self._indice, self.valeurs = indice, list(valeurs)
+
+
+class AnneauEnsembles:
+    """Viewers distincts par minute ; l'union n'est calculée qu'à la lecture."""
+    __slots__ = ("ensembles", "_indice")
+
+    def __init__(self, taille: int):
+        self.ensembles = [set() for _ in range(taille)]
+        self._indice = None
+
+    def _avancer(self, indice: int):
+        if self._indice is None:
+            self._indice = indice
+            return
+        taille = len(self.ensembles)
+        for i in range(1, min(indice - self._indice, taille) + 1):
+            self.ensembles[(self._indice + i) % taille] = set()
+        self._indice = max(self._indice, indice)
+
+    def ajouter(self, t: float, cle: str):
+        self._avancer(int(t // 60))
+        self.ensembles[self._indice % len(self.ensembles)].add(cle)
+
+    def union(self, minutes: int, t: float) -> set:
+        self._avancer(int(t // 60))
+        taille = len(self.ensembles)
+        nb = min(taille, minutes)
+        return set().union(*(self.ensembles[i % taille] for i in range(self._indice - nb + 1, self._indice + 1)))
+
+    def distincts(self, minutes: int, t: float) -> int:
+        return len(self.union(minutes, t))
+
+
+class SessionStream:
+    """Compteurs d'un stream, résumés à la fin du live."""
+    __slots__ = ("debut", "titre", "categorie", "messages", "chatters", "commandes")
+
+    def __init__(self, debut: float, titre: str = "", categorie: str = ""):
+        self.debut = debut
+        self.titre = titre
+        self.categorie = categorie
+        self.messages = 0
+        self.chatters = set()
+        self.commandes = Counter()
+
+
+class ChatAnalytics:
+    """Débits de messages (par seconde / minute), viewers actifs, commandes, heatmap jour x heure."""
+
+    def __init__(self, fichier: str = ANALYTICS_FILE):
+        self.fichier = fichier
+        self.par_seconde = Anneau(ANALYTICS_SECONDES, 1)
+        self.par_minute = Anneau(ANALYTICS_MINUTES, 60)
+        self.commandes_par_minute = Anneau(ANALYTICS_MINUTES, 60)
+        self.chatters = AnneauEnsembles(ANALYTICS_UNIQUES_MINUTES)
+        # Messages par jour de la semaine (0 = lundi) et par heure locale
+        self.heatmap = [[0] * 24 for _ in range(7)]
+        self._heure = (None, 0, 0)  # (heure absolue, jour, heure) : localtime une fois par heure
+        self.session = None
+        self.resumes = []
+        self._modifie = False  # Activité depuis la dernière publication
+        self._tache = None
+        self._charger()
+
+    # ─────────────────────────── COMPTEURS ───────────────────────────
+
+    def compter_message(self, cle: str, t: float | None = None):
+        """Un message de viewer (cle = ID Twitch, ou pseudo à défaut)."""
+        t = time.time() if t is None else t
+        self._modifie = True
+        self.par_seconde.ajouter(t)
+        self.par_minute.ajouter(t)
+        self.chatters.ajouter(t, cle)
+        heure_abs = int(t // 3600)
+        if self._heure[0] != heure_abs:
+            local = time.localtime(t)
+            self._heure = (heure_abs, local.tm_wday, local.tm_hour)
+        self.heatmap[self._heure[1]][self._heure[2]] += 1
+        if self.session is not None:
+            self.session.messages += 1
+            self.session.chatters.add(cle)
+
+    def compter_commande(self, nom: str, t: float | None = None):
+        t = time.time() if t is None else t
+        self._modifie = True
+        self.commandes_par_minute.ajouter(t)
+        if self.session is not None:
+            self.session.commandes[nom] += 1
+
+    # ─────────────────────────── LECTURE ───────────────────────────
+
+    def messages(self, secondes: float, depuis: float | None = None) -> int:
+        """Messages sur les `secondes` dernières secondes (seconde par seconde si possible)."""
+        anneau = self.par_seconde if secondes <= ANALYTICS_SECONDES else self.par_minute
+        return anneau.somme(secondes, time.time(), depuis)
+
+    def taux_par_minute(self, secondes: float, depuis: float | None = None) -> float:
+        return self.messages(secondes, depuis) * 60 / secondes
+
+    def chatters_actifs(self, minutes: int = 5) -> int:
+        return self.chatters.distincts(minutes, time.time())
+
+    def actifs(self, minutes: int) -> set:
+        """Clés (ID Twitch) des viewers qui ont parlé sur les `minutes` dernières minutes."""
+        return self.chatters.union(minutes, time.time())
+
+    def series(self) -> dict:
+        """Séries pour le dashboard."""
+        t = time.time()
+        return {
+            "date": t,
+            "par_seconde": self.par_seconde.serie(t),
+            "par_minute": self.par_minute.serie(t),
+            "commandes_par_minute": self.commandes_par_minute.serie(t),
+            "chatters_5min": self.chatters.distincts(5, t),
+            "chatters_60min": self.chatters.distincts(ANALYTICS_UNIQUES_MINUTES, t),
+            "heatmap": [list(jour) for jour in self.heatmap],
+            "session": self._resumer(self.session, t) if self.session else None,
+            "resumes": list(self.resumes),
+        }
+
+    # ─────────────────────────── STREAMS ───────────────────────────
+
+    def debut_stream(self, debut: float, titre: str = "", categorie: str = ""):
+        if self.session is not None and abs(self.session.debut - debut) < 60:
+            return  # Même stream (ex: redémarrage du bot en plein live)
+        self.session = SessionStream(debut, titre, categorie)
+
+    def fin_stream(self) -> dict | None:
+        """Clôt le stream en cours et retourne son résumé (gardé aussi pour le dashboard)."""
+        if self.session is None:
+            return None
+        resume = self._resumer(self.session, time.time())
+        self.session = None
+        self.resumes.append(resume)
+        del self.resumes[:-ANALYTICS_RESUMES_MAX]
+        print(f"[ANALYTICS] Stream terminé : {resume['messages']} messages, {resume['chatters']} chatters")
+        self._sauver_background()
+        return resume
+
+    def _resumer(self, session: SessionStream, t: float) -> dict:
+        duree_min = max(1.0, (t - session.debut) / 60)
+        return {
+            "debut": session.debut,
+            "fin": t,
+            "titre": session.titre,
+            "categorie": session.categorie,
+            "messages": session.messages,
+            "chatters": len(session.chatters),
+            "messages_par_minute": round(session.messages / duree_min, 2),
+            "pic_par_minute": self.par_minute.maximum(session.debut, t),
+            "commandes": dict(session.commandes.most_common(ANALYTICS_TOP_COMMANDES)),
+        }
+
+    # ─────────────────────────── ÉTAT (voir state_snapshot) ───────────────────────────
+
+    def exporter_etat(self) -> dict:
+        session = None
+        if self.session is not None:
+            s = self.session
+            session = (s.debut, s.titre, s.categorie, s.messages, tuple(s.chatters), dict(s.commandes))
+        return {
+            "par_seconde": self.par_seconde.exporter(),
+            "par_minute": self.par_minute.exporter(),
+            "commandes_par_minute": self.commandes_par_minute.exporter(),
+            "session": session,
+        }
+
+    def restaurer_etat(self, etat: dict):
+        self.par_seconde.restaurer(etat["par_seconde"])
+        self.par_minute.restaurer(etat["par_minute"])
+        self.commandes_par_minute.restaurer(etat["commandes_par_minute"])
+        if etat.get("session") and self.session is None:
+            debut, titre, categorie, messages, chatters, commandes = etat["session"]
+            self.session = SessionStream(debut, titre, categorie)
+            self.session.messages = messages
+            self.session.chatters.update(chatters)
+            self.session.commandes.update(commandes)
+
+    # ─────────────────────────── FICHIER ───────────────────────────
+
+    def _charger(self):
+        """Heatmap et résumés persistants (le reste se reconstruit vite)."""
+        if not os.path.exists(self.fichier):
+            return
+        try:
+            with open(self.fichier, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            heatmap = data.get("heatmap")
+            if isinstance(heatmap, list) and len(heatmap) == 7 and all(len(j) == 24 for j in heatmap):
+                self.heatmap = heatmap
+            self.resumes = data.get("resumes", [])[-ANALYTICS_RESUMES_MAX:]
+        except Exception as e:
+            print(f"[ANALYTICS] Erreur lecture {self.fichier}: {e}")
+
+    def _ecrire(self, donnees: dict):
+        os.makedirs(os.path.dirname(self.fichier) or ".", exist_ok=True)
+        tmp = self.fichier + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(donnees, f, ensure_ascii=False)
+        os.replace(tmp, self.fichier)
+
+    async def sauver(self):
+        try:
+            # Photo dans la boucle (cohérente), écriture hors boucle
+            await asyncio.to_thread(self._ecrire, self.series())
+        except Exception as e:
+            print(f"[ANALYTICS] Erreur écriture: {e}")
+
+    def _sauver_background(self):
+        try:
+            asyncio.get_running_loop().create_task(self.sauver())
+        except RuntimeError:
+            pass
+
+    async def start(self):
+        if self._tache is None:
+            self._tache = asyncio.create_task(self._boucle())
+
+    async def stop(self):
+        if self._tache:
+            self._tache.cancel()
+            try:
+                await self._tache
+            except asyncio.CancelledError:
+                pass
+            self._tache = None
+            await self.sauver()
+
+    async def _boucle(self):
+        while True:
+            await asyncio.sleep(ANALYTICS_EXPORT_S)
+            # Chat silencieux (souvent hors live) : rien à réécrire
+            if self._modifie:
+                self._modifie = False
+                await self.sauver()
@@ -0,0 +1,381 @@
+"""
+Archive des messages du chat (segments compressés + index)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Les messages sont accumulés en mémoire puis écrits par lots dans des
+segments compressés (zlib) au format colonnes. Un index (par pseudo et par
+plage de temps) permet de ne décompresser que les segments utiles.
+
+Le segment ouvert est un journal JSON-lines (.part) auquel chaque lot est
+ajouté ; il n'est encodé et compressé qu'une fois, quand il est scellé.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict, deque
+from config import (
+    CHAT_ARCHIVE_DIR, CHAT_ARCHIVE_BATCH_SIZE, CHAT_ARCHIVE_FLUSH_S,
+    CHAT_ARCHIVE_SEGMENT_MAX_MSG, CHAT_ARCHIVE_SEGMENT_MAX_S,
+    CHAT_ARCHIVE_RETENTION_DAYS, CHAT_ARCHIVE_MAX_BUFFER
+)
+
+INDEX_FILE = "index.json"
+PARTIEL = ".part"  # suffixe du journal du segment ouvert
+COLONNES = ("ts", "user_id", "login", "text", "msg_id")
+
+
+class Segment:
+    """Segment en colonnes (une liste par champ)."""
+
+    def __init__(self, nom: str, debut: float):
+        self.nom = nom
+        self.debut = debut
+        self.fin = debut
+        self.colonnes = {c: [] for c in COLONNES}
+        self.logins = {}  # {login: nb de messages}
+        self.ouvert = True
+        self.ecrits = 0   # lignes déjà ajoutées au journal .part
+
+    def __len__(self):
+        return len(self.colonnes["ts"])
+
+    def ajouter(self, ligne: tuple):
+        for nom, valeur in zip(COLONNES, ligne):
+            self.colonnes[nom].append(valeur)
+        self.fin = ligne[0]
+        login = ligne[2]
+        self.logins[login] = self.logins.get(login, 0) + 1
+
+    def entree_index(self) -> dict:
+        return {"nom": self.nom, "debut": self.debut, "fin": self.fin,
+                "n": len(self), "logins": dict(self.logins), "ouvert": self.ouvert}
+
+    def encoder(self) -> bytes:
+        """Sérialise en colonnes. Les timestamps sont stockés en deltas (ms)."""
+        ts_ms = [int(t * 1000) for t in self.colonnes["ts"]]
+        deltas = [b - a for a, b in zip([0] + ts_ms, ts_ms)]
+        data = dict(self.colonnes, ts=deltas)
+        return zlib.compress(json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), 6)
+
+    @staticmethod
+    def decoder(brut: bytes) -> dict:
+        data = json.loads(zlib.decompress(brut))
+        total, ts = 0, []
+        for d in data["ts"]:
+            total += d
+            ts.append(total / 1000)
+        data["ts"] = ts
+        return data
+
+
+class ChatArchive:
+    """Archive du chat : écriture par lots en arrière-plan et recherche indexée."""
+
+    def __init__(self, dossier: str = CHAT_ARCHIVE_DIR, lecture_seule: bool = False):
+        self.dossier = dossier
+        # lecture_seule : utilisé par le dashboard, qui relit l'index écrit par le bot
+        self.lecture_seule = lecture_seule
+        self._tampon = deque(maxlen=CHAT_ARCHIVE_MAX_BUFFER)
+        self._segment = None
+        self._index = []        # entrées des segments scellés, triées par début
+        self._index_mtime = 0
+        self._cache = OrderedDict()  # segments décodés récemment {nom: ((n, fin), colonnes)}
+        self._signal = asyncio.Event()
+        self._verrou = asyncio.Lock()  # un seul flush à la fois (boucle, stop)
+        self._arret = False
+        self._tache = None
+        self.messages_perdus = 0
+        os.makedirs(self.dossier, exist_ok=True)
+        self._charger_index()
+
+    # ─────────────────────────── ÉCRITURE ───────────────────────────
+
+    async def start(self):
+        """Démarre la boucle d'écriture."""
+        if self._tache is None:
+            if await asyncio.to_thread(self._sceller_partiels):
+                await asyncio.to_thread(self._sauver_index, self._entrees_index())
+            self._appliquer_retention()
+            self._arret = False
+            self._tache = asyncio.create_task(self._boucle_ecriture())
+            print(f"🗄️ Archive du chat activée ({self.dossier})")
+
+    async def stop(self):
+        """Arrête la boucle, écrit ce qui reste en mémoire et scelle le segment ouvert."""
+        if self._tache:
+            # Pas de cancel() : une écriture en cours dans un thread continuerait
+            # pendant le flush final. On laisse la boucle finir son tour.
+            self._arret = True
+            self._signal.set()
+            await self._tache
+            self._tache = None
+        await self.flush(sceller=True)
+
+    def archiver(self, message):
+        """Ajoute un message au tampon. O(1), ne fait jamais d'I/O."""
+        auteur = message.author
+        ligne = (
+            time.time(),
+            str(getattr(auteur, "id", "") or ""),
+            auteur.name.lower() if auteur and auteur.name else "unknown",
+            message.content or "",
+            str(getattr(message, "id", "") or ""),
+        )
+        if len(self._tampon) == self._tampon.maxlen:
+            # Disque bloqué : on sacrifie les plus vieux plutôt que la RAM (la deque retire le premier)
+            self.messages_perdus += 1
+        self._tampon.append(ligne)
+        if len(self._tampon) >= CHAT_ARCHIVE_BATCH_SIZE:
+            self._signal.set()
+
+    async def _boucle_ecriture(self):
+        """Écrit le tampon toutes les CHAT_ARCHIVE_FLUSH_S ou dès qu'un lot est plein."""
+        while not self._arret:
+            try:
+                await asyncio.wait_for(self._signal.wait(), timeout=CHAT_ARCHIVE_FLUSH_S)
+            except asyncio.TimeoutError:
+                pass
+            self._signal.clear()
+            if self._arret:
+                break
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[ARCHIVE] Erreur écriture: {e}")
+
+    async def flush(self, sceller: bool = False):
+        """Transfère le tampon dans le segment ouvert et l'écrit sur disque (hors event loop).
+        sceller=True ferme aussi le segment ouvert (arrêt du bot)."""
+        async with self._verrou:
+            await self._flush(sceller)
+
+    async def _flush(self, sceller: bool):
+        if not self._tampon and not (sceller and self._segment):
+            return
+        lignes, self._tampon = self._tampon, deque(maxlen=CHAT_ARCHIVE_MAX_BUFFER)
+
+        scelles = []
+        for ligne in lignes:
+            seg = self._segment
+            if seg is None:
+                seg = self._segment = Segment(f"seg_{int(ligne[0] * 1000)}.zlib", ligne[0])
+            seg.ajouter(ligne)
+            if len(seg) >= CHAT_ARCHIVE_SEGMENT_MAX_MSG or ligne[0] - seg.debut >= CHAT_ARCHIVE_SEGMENT_MAX_S:
+                seg.ouvert = False
+                scelles.append(seg)
+                self._segment = None
+        if sceller and self._segment:
+            self._segment.ouvert = False
+            scelles.append(self._segment)
+            self._segment = None
+
+        a_ecrire = scelles + ([self._segment] if self._segment else [])
+        # Écriture dans un thread : zlib et le disque ne bloquent pas le chat
+        await asyncio.to_thread(self._ecrire_segments, a_ecrire)
+        for seg in a_ecrire:
+            self._cache.pop(seg.nom, None)
+
+        if scelles:
+            self._index.extend(s.entree_index() for s in scelles)
+            self._appliquer_retention()
+        await asyncio.to_thread(self._sauver_index, self._entrees_index())
+
+    def _ecrire_segments(self, segments: list):
+        """Ajoute les nouvelles lignes au journal du segment ouvert (coût proportionnel
+        au lot) ; un segment scellé est compressé une seule fois et son journal supprimé."""
+        for seg in segments:
+            chemin = os.path.join(self.dossier, seg.nom)
+            if seg.ecrits < len(seg):
+                nouvelles = zip(*(seg.colonnes[c][seg.ecrits:] for c in COLONNES))
+                with open(chemin + PARTIEL, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(l, ensure_ascii=False) + "\n" for l in nouvelles)
+                seg.ecrits = len(seg)
+            if not seg.ouvert:
+                with open(chemin + ".tmp", "wb") as f:
+                    f.write(seg.encoder())
+                os.replace(chemin + ".tmp", chemin)
+                try:
+                    os.remove(chemin + PARTIEL)
+                except OSError:
+                    pass
+
+    def _sceller_partiels(self) -> bool:
+        """Scelle les journaux laissés par un arrêt brutal. Retourne True si l'index a changé."""
+        entrees = {e["nom"]: e for e in self._index}
+        modifie = False
+        for fichier in os.listdir(self.dossier):
+            if not fichier.endswith(PARTIEL):
+                continue
+            nom = fichier[:-len(PARTIEL)]
+            colonnes = self._lire_partiel(nom)
+            if not colonnes or not colonnes["ts"]:
+                os.remove(os.path.join(self.dossier, fichier))
+                continue
+            seg = Segment(nom, colonnes["ts"][0])
+            for ligne in zip(*(colonnes[c] for c in COLONNES)):
+                seg.ajouter(ligne)
+            seg.ecrits, seg.ouvert = len(seg), False
+            self._ecrire_segments([seg])
+            entrees[nom] = seg.entree_index()
+            modifie = True
+        for entree in entrees.values():
+            # Journal déjà compressé mais index pas encore sauvé au moment de l'arrêt
+            if entree.get("ouvert"):
+                entree["ouvert"] = False
+                modifie = True
+        if modifie:
+            self._index = sorted(entrees.values(), key=lambda e: e["debut"])
+        return modifie
+
+    def _appliquer_retention(self):
+        """Supprime les segments plus vieux que CHAT_ARCHIVE_RETENTION_DAYS."""
+        limite = time.time() - CHAT_ARCHIVE_RETENTION_DAYS * 86400
+        garder = []
+        for entree in self._index:
+            if entree["fin"] < limite:
+                try:
+                    os.remove(os.path.join(self.dossier, entree["nom"]))
+                except OSError:
+                    pass
+            else:
+                garder.append(entree)
+        self._index = garder
+
+    # ─────────────────────────── INDEX ───────────────────────────
+
+    def _entrees_index(self) -> list:
+        entrees = list(self._index)
+        if self._segment is not None:
+            entrees.append(self._segment.entree_index())
+        return entrees
+
+    def _sauver_index(self, entrees: list):
+        chemin = os.path.join(self.dossier, INDEX_FILE)
+        try:
+            with open(chemin + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(entrees, f, ensure_ascii=False)
+            os.replace(chemin + ".tmp", chemin)
+        except Exception as e:
+            print(f"[ARCHIVE] Erreur sauvegarde index: {e}")
+
+    def _charger_index(self):
+        """Charge l'index depuis le disque (le dashboard le relit quand le bot l'a modifié)."""
+        chemin = os.path.join(self.dossier, INDEX_FILE)
+        if not os.path.exists(chemin):
+            return
+        try:
+            mtime = os.path.getmtime(chemin)
+            if mtime <= self._index_mtime:
+                return
+            with open(chemin, "r", encoding="utf-8") as f:
+                self._index = sorted(json.load(f), key=lambda e: e["debut"])
+            self._index_mtime = mtime
+        except Exception as e:
+            print(f"[ARCHIVE] Erreur lecture index: {e}")
+
+    def _lire_partiel(self, nom: str) -> dict | None:
+        """Colonnes du journal d'un segment ouvert (None s'il a été scellé entre-temps)."""
+        colonnes = {c: [] for c in COLONNES}
+        try:
+            with open(os.path.join(self.dossier, nom + PARTIEL), "r", encoding="utf-8") as f:
+                for texte in f:
+                    try:
+                        ligne = json.loads(texte)
+                    except ValueError:
+                        continue  # dernière ligne en cours d'écriture par le bot
+                    for c, valeur in zip(COLONNES, ligne):
+                        colonnes[c].append(valeur)
+        except FileNotFoundError:
+            return None
+        return colonnes
+
+    def _lire_segment(self, entree: dict) -> dict | None:
+        """Colonnes d'un segment. Le cache est validé par (n, fin) : le segment ouvert
+        grossit à chaque flush, le dashboard doit relire le fichier quand l'index change."""
+        nom = entree["nom"]
+        version = (entree["n"], entree["fin"])
+        if nom in self._cache and self._cache[nom][0] == version:
+            self._cache.move_to_end(nom)
+            return self._cache[nom][1]
+        try:
+            data = self._lire_partiel(nom) if entree.get("ouvert") else None
+            if data is None:
+                with open(os.path.join(self.dossier, nom), "rb") as f:
+                    data = Segment.decoder(f.read())
+        except Exception as e:
+            print(f"[ARCHIVE] Erreur lecture {nom}: {e}")
+            return None
+        self._cache[nom] = (version, data)
+        self._cache.move_to_end(nom)
+        if len(self._cache) > 8:
+            self._cache.popitem(last=False)
+        return data
+
+    # ─────────────────────────── RECHERCHE ───────────────────────────
+
+    def _segments_recents(self, depuis: float = 0):
+        """Segments (colonnes) du plus récent au plus ancien, mémoire comprise."""
+        if self._tampon:
+            yield None, {c: [l[i] for l in self._tampon] for i, c in enumerate(COLONNES)}
+        if self._segment is not None:
+            yield self._segment.entree_index(), self._segment.colonnes
+        for entree in reversed(self._index):
+            if self._segment is not None and entree["nom"] == self._segment.nom:
+                continue
+            if entree["fin"] < depuis:
+                break
+            yield entree, None
+
+    def derniers_messages(self, login: str, n: int = 50) -> list[dict]:
+        """Retourne les n derniers messages d'un pseudo (plus récent en premier)."""
+        if self.lecture_seule:
+            self._charger_index()
+        login = login.lower().lstrip("@")
+        resultats = []
+        for entree, colonnes in self._segments_recents():
+            if entree is not None and login not in entree["logins"]:
+                continue
+            if colonnes is None:
+                colonnes = self._lire_segment(entree)
+                if colonnes is None:
+                    continue
+            for i in range(len(colonnes["ts"]) - 1, -1, -1):
+                if colonnes["login"][i] == login:
+                    resultats.append(self._ligne(colonnes, i))
+                    if len(resultats) >= n:
+                        return resultats
+        return resultats
+
+    def rechercher(self, motif: str, depuis_s: int = 3600, login: str | None = None, limite: int = 200) -> list[dict]:
+        """Messages correspondant à une regex sur les `depuis_s` dernières secondes."""
+        if self.lecture_seule:
+            self._charger_index()
+        regex = re.compile(motif, re.IGNORECASE)
+        depuis = time.time() - depuis_s
+        login = login.lower().lstrip("@") if login else None
+        resultats = []
+        for entree, colonnes in self._segments_recents(depuis):
+            if entree is not None and login and login not in entree["logins"]:
+                continue
+            if colonnes is None:
+                colonnes = self._lire_segment(entree)
+                if colonnes is None:
+                    continue
+            for i in range(len(colonnes["ts"]) - 1, -1, -1):
+                if colonnes["ts"][i] < depuis:
+                    break
+                if login and colonnes["login"][i] != login:
+                    continue
+                if regex.search(colonnes["text"][i]):
+                    resultats.append(self._ligne(colonnes, i))
+                    if len(resultats) >= limite:
+                        return resultats
+        return resultats
+
+    @staticmethod
+    def _ligne(colonnes: dict, i: int) -> dict:
+        return {c: colonnes[c][i] for c in COLONNES}
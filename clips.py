@@ -0,0 +1,232 @@
+"""
+Création de clips (!clip) : regroupement, file de travail, historique
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Les !clip tapés dans une courte fenêtre rejoignent le même clip (crédité à
+tous les demandeurs). Les créations passent par une file traitée par un
+nombre limité de workers : création via Helix, attente du traitement par
+Twitch, puis publication de l'URL publique et de la miniature (chat + Discord).
+Tous les clips sont enregistrés dans un historique SQLite indexé.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from config import (
+    TWITCH_CHANNEL, TWITCH_CLIENT_ID, CLIP_COALESCE_S, CLIP_CONCURRENCY,
+    CLIP_QUEUE_SIZE, CLIP_PROCESS_TIMEOUT_S, CLIPS_DB_FILE
+)
+from event_bus import ClipCree
+
+HELIX_CLIPS_URL = "https://api.twitch.tv/helix/clips"
+
+
+class DemandeClip:
+    """Un clip en cours, et tous ceux qui l'ont demandé."""
+    __slots__ = ("debut", "demandeurs", "channel")
+
+    def __init__(self, demandeur: str, channel):
+        self.debut = time.monotonic()
+        self.demandeurs = [demandeur]
+        self.channel = channel
+
+
+class HistoriqueClips:
+    """Historique SQLite (appelé depuis un thread : ne bloque pas la boucle)."""
+
+    def __init__(self, chemin: str = CLIPS_DB_FILE):
+        self.chemin = chemin
+        self._conn = None
+        self._verrou = threading.Lock()
+
+    def ouvrir(self):
+        os.makedirs(os.path.dirname(self.chemin) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.chemin, check_same_thread=False)
+        with self._verrou, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS clips (
+                    id TEXT PRIMARY KEY,
+                    cree_le REAL NOT NULL,
+                    url TEXT NOT NULL,
+                    thumbnail_url TEXT,
+                    titre TEXT,
+                    statut TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_clips_date ON clips(cree_le);
+                CREATE TABLE IF NOT EXISTS clip_demandeurs (
+                    clip_id TEXT NOT NULL REFERENCES clips(id),
+                    login TEXT NOT NULL,
+                    PRIMARY KEY (clip_id, login)
+                );
+                CREATE INDEX IF NOT EXISTS idx_demandeurs_login ON clip_demandeurs(login);
+            """)
+
+    def fermer(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def enregistrer(self, clip_id: str, url: str, thumbnail_url: str, titre: str,
+                    statut: str, demandeurs: list[str]):
+        with self._verrou, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?)",
+                (clip_id, time.time(), url, thumbnail_url, titre, statut)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO clip_demandeurs VALUES (?, ?)",
+                [(clip_id, login.lower()) for login in demandeurs]
+            )
+
+    def derniers(self, n: int = 20, login: str | None = None) -> list[dict]:
+        """Derniers clips (éventuellement d'un demandeur)."""
+        requete = "SELECT c.id, c.cree_le, c.url, c.thumbnail_url, c.titre, c.statut FROM clips c"
+        params = []
+        if login:
+            requete += " JOIN clip_demandeurs d ON d.clip_id = c.id WHERE d.login = ?"
+            params.append(login.lower())
+        requete += " ORDER BY c.cree_le DESC LIMIT ?"
+        params.append(n)
+        with self._verrou:
+            lignes = self._conn.execute(requete, params).fetchall()
+        cles = ("id", "cree_le", "url", "thumbnail_url", "titre", "statut")
+        return [dict(zip(cles, ligne)) for ligne in lignes]
+
+
+class ClipPipeline:
+    """File de création de clips avec regroupement des demandes."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.historique = HistoriqueClips()
+        self._file = asyncio.Queue(maxsize=CLIP_QUEUE_SIZE)
+        self._courante: DemandeClip | None = None
+        self._workers = []
+        self._broadcaster_id = None
+
+    async def start(self):
+        if self._workers:
+            return
+        await asyncio.to_thread(self.historique.ouvrir)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(CLIP_CONCURRENCY)]
+        print(f"🎬 File de clips démarrée ({CLIP_CONCURRENCY} workers)")
+
+    async def stop(self):
+        for tache in self._workers:
+            tache.cancel()
+        for tache in self._workers:
+            try:
+                await tache
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self.historique.fermer()
+
+    def demander(self, demandeur: str, channel) -> str:
+        """
+        Enregistre un !clip. Retourne "nouveau" (clip lancé), "groupe" (rejoint
+        le clip en cours) ou "plein" (trop de clips en attente).
+        """
+        courante = self._courante
+        if courante and time.monotonic() - courante.debut < CLIP_COALESCE_S:
+            if demandeur not in courante.demandeurs:
+                courante.demandeurs.append(demandeur)
+            return "groupe"
+        demande = DemandeClip(demandeur, channel)
+        try:
+            self._file.put_nowait(demande)
+        except asyncio.QueueFull:
+            return "plein"
+        self._courante = demande
+        return "nouveau"
+
+    # ─────────────────────────── HELIX ───────────────────────────
+
+    async def _headers(self) -> dict:
+        token = await self.bot.token_manager.get_token()
+        return {"Authorization": f"Bearer {token}", "Client-Id": TWITCH_CLIENT_ID or ""}
+
+    async def _broadcaster(self) -> str:
+        if self._broadcaster_id is None:
+            users = await self.bot.fetch_users(names=[TWITCH_CHANNEL])
+            if not users:
+                raise RuntimeError("diffuseur introuvable")
+            self._broadcaster_id = str(users[0].id)
+        return self._broadcaster_id
+
+    async def _creer(self) -> str:
+        """Crée le clip, retourne son ID."""
+        resp = await self.bot.http_client.request(
+            "POST", HELIX_CLIPS_URL, params={"broadcaster_id": await self._broadcaster()},
+            headers=await self._headers(), retries=0
+        )
+        if resp.status == 404:
+            raise RuntimeError("offline")
+        if not resp.ok or not isinstance(resp.data, dict) or not resp.data.get("data"):
+            raise RuntimeError(f"Helix {resp.status}: {resp.data}")
+        return resp.data["data"][0]["id"]
+
+    async def _attendre_traitement(self, clip_id: str) -> dict | None:
+        """Interroge Get Clips jusqu'à ce que le clip soit publié (None si délai dépassé)."""
+        limite = time.monotonic() + CLIP_PROCESS_TIMEOUT_S
+        attente = 1.0
+        while time.monotonic() < limite:
+            await asyncio.sleep(attente)
+            resp = await self.bot.http_client.request(
+                "GET", HELIX_CLIPS_URL, params={"id": clip_id}, headers=await self._headers()
+            )
+            if resp.ok and isinstance(resp.data, dict) and resp.data.get("data"):
+                return resp.data["data"][0]
+            attente = min(attente * 1.5, 5.0)
+        return None
+
+    # ─────────────────────────── WORKER ───────────────────────────
+
+    async def _worker(self):
+        while True:
+            demande = await self._file.get()
+            try:
+                await self._traiter(demande)
+            except Exception as e:
+                print(f"[CLIP] Erreur worker: {e}")
+
+    async def _traiter(self, demande: DemandeClip):
+        try:
+            await self._creer_et_publier(demande)
+        finally:
+            # Les demandes arrivées pendant le traitement sont aussi créditées ; ensuite
+            # (succès ou échec) un nouveau !clip lance un nouveau clip
+            if self._courante is demande:
+                self._courante = None
+
+    async def _creer_et_publier(self, demande: DemandeClip):
+        try:
+            clip_id = await self._creer()
+        except Exception as e:
+            # Échec : plus aucun !clip ne rejoint cette demande, et tous ceux qui l'ont rejointe sont prévenus
+            if self._courante is demande:
+                self._courante = None
+            mentions = " ".join(f"@{a}" for a in demande.demandeurs)
+            if "offline" in str(e).lower():
+                await demande.channel.send(f"{mentions} ❌ Impossible de créer un clip : Le stream est hors ligne.")
+            else:
+                await demande.channel.send(f"{mentions} ❌ Erreur lors de la création du clip.")
+                print(f"[CLIP] Erreur : {e}")
+            self.bot.moderator._log_background(f"❌ CLIP ERROR | {mentions} | {e}")
+            return
+
+        clip = await self._attendre_traitement(clip_id)
+        auteurs = tuple(demande.demandeurs)
+        if clip:
+            url, miniature, titre, statut = clip["url"], clip.get("thumbnail_url", ""), clip.get("title", ""), "publie"
+        else:
+            # Pas encore traité : le lien fonctionnera dès que Twitch aura fini
+            url, miniature, titre, statut = f"https://clips.twitch.tv/{clip_id}", "", "", "en_traitement"
+
+        await asyncio.to_thread(self.historique.enregistrer, clip_id, url, miniature, titre, statut, list(auteurs))
+        credits = ", ".join(f"@{a}" for a in auteurs)
+        await demande.channel.send(f"🎬 Clip créé par {credits} ! lien : {url}")
+        self.bot.moderator._log_background(f"🎬 CLIP | Créé par {credits} | {url}")
+        self.bot.bus.publish(ClipCree(url=url, auteurs=auteurs, titre=titre, thumbnail_url=miniature))
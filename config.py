@@ -20,9 +20,6 @@ TWITCH_TOKEN = os.getenv("TWITCH_TOKEN")
 TWITCH_NICK = os.getenv("TWITCH_NICK")
 TWITCH_CHANNEL = os.getenv("TWITCH_CHANNEL")
 
-if not TWITCH_TOKEN or not TWITCH_NICK or not TWITCH_CHANNEL:
-    raise SystemExit("❌ Manque TWITCH_TOKEN / TWITCH_NICK / TWITCH_CHANNEL dans .env")
-
 TWITCH_CLIENT_ID = os.getenv("TWITCH_CLIENT_ID")
 TWITCH_CLIENT_SECRET = os.getenv("TWITCH_CLIENT_SECRET")
 TWITCH_BOT_ID = os.getenv("TWITCH_BOT_ID")
@@ -30,6 +27,34 @@ TWITCH_REFRESH_TOKEN = os.getenv("TWITCH_REFRESH_TOKEN")
 
 # Fichier de persistance des tokens
 TOKEN_STORE_FILE = "token_store.json"
+TOKEN_REFRESH_MARGIN_S = 15 * 60       # Refresh 15 min avant expiration
+TOKEN_VALIDATE_INTERVAL_S = 60 * 60    # Validation horaire (exigée par Twitch)
+TOKEN_RETRY_MIN_S = 30                 # Refresh raté : réessai après 30 s, puis 1 min, 2 min...
+TOKEN_RETRY_MAX_S = 30 * 60            # ... jusqu'à 30 min entre deux essais
+TOKEN_ERROR_LOG_S = 60 * 60            # Au plus un log Discord d'échec par heure
+
+# Scopes vérifiés au démarrage (!clip, !title, modération via API, followers)
+TWITCH_REQUIRED_SCOPES = [
+    "clips:edit",
+    "channel:manage:broadcast",
+    "moderator:manage:banned_users",
+    "moderator:manage:chat_messages",
+    "moderator:manage:chat_settings",
+    "moderator:read:followers",
+    "moderator:read:chatters",
+]
+# Optionnel (token du diffuseur) : copie locale des abonnés, voir follower_sync
+# "channel:read:subscriptions"
+
+
+def verifier_config() -> list[str]:
+    """Erreurs de configuration bloquantes (vérifiées au lancement, pas à l'import)."""
+    erreurs = []
+    manquants = [nom for nom in ("TWITCH_TOKEN", "TWITCH_NICK", "TWITCH_CHANNEL") if not os.getenv(nom)]
+    if manquants:
+        erreurs.append(f"Manque {' / '.join(manquants)} dans .env")
+    return erreurs
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 #                              DISCORD
@@ -37,9 +62,39 @@ TOKEN_STORE_FILE = "token_store.json"
 
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")      # Logs modération
 DISCORD_ANNOUNCE_URL = os.getenv("DISCORD_ANNOUNCE_URL")    # Annonces stream
+# Destinations d'annonce supplémentaires (séparées par des virgules)
+DISCORD_ANNOUNCE_URLS = [DISCORD_ANNOUNCE_URL] if DISCORD_ANNOUNCE_URL else []
+DISCORD_ANNOUNCE_URLS += [u.strip() for u in os.getenv("DISCORD_ANNOUNCE_EXTRA_URLS", "").split(",") if u.strip()]
+# Salons où le bot Discord poste lui-même (via sa connexion, sans webhook)
+DISCORD_ANNOUNCE_CHANNEL_IDS = [int(c) for c in os.getenv("DISCORD_ANNOUNCE_CHANNEL_IDS", "").split(",") if c.strip()]
+DISCORD_LOG_CHANNEL_ID = int(os.getenv("DISCORD_LOG_CHANNEL_ID") or 0)      # Logs (sinon DISCORD_WEBHOOK_URL)
+DISCORD_CLIPS_CHANNEL_ID = int(os.getenv("DISCORD_CLIPS_CHANNEL_ID") or 0)  # Clips créés depuis le chat
 DISCORD_ROLE_ID = os.getenv("DISCORD_ROLE_ID")              # ID du rôle @Membre
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")                  # Token du Bot Discord (Requis pour bot interactif)
 DISCORD_CLIENT_ID = os.getenv("DISCORD_CLIENT_ID")          # ID Client Discord
+DISCORD_GUILD_ID = int(os.getenv("DISCORD_GUILD_ID") or 0)  # Serveur pour la synchro immédiate des commandes slash
+
+# Liaison Discord <-> Twitch (!link)
+ACCOUNT_LINKS_FILE = "data/discord_links.json"
+ACCOUNT_LINK_CODE_TTL_S = 600  # Durée de validité d'un code de liaison
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                              HTTP (session partagée)
+# ══════════════════════════════════════════════════════════════════════════════
+
+HTTP_POOL_LIMIT = 100          # Connexions simultanées max (tous hôtes)
+HTTP_POOL_PER_HOST = 20        # ... par hôte (api.twitch.tv, discord.com...)
+HTTP_DNS_TTL_S = 300           # Cache DNS
+HTTP_KEEPALIVE_S = 60          # Garde les connexions TLS ouvertes entre deux requêtes
+HTTP_TIMEOUT_S = 10            # Timeout total par défaut
+HTTP_CONNECT_TIMEOUT_S = 5
+HTTP_RETRIES = 2               # Réessais (429, et 5xx/réseau si idempotent)
+HTTP_METRICS_LOG_S = 15 * 60   # Affiche les métriques par hôte (0 = jamais)
+
+
+# Bus d'événements Twitch <-> Discord
+EVENT_BUS_QUEUE_SIZE = 500     # File max par abonné (les plus anciens sont abandonnés)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -50,6 +105,9 @@ STREAM_URL = "https://www.twitch.tv/lacabanevirtuelle"
 POLL_INTERVAL_S = 60  # Vérifie toutes les 60 secondes
 DISCORD_ANNOUNCE_COOLDOWN_S = 2 * 60 * 60 + 30 * 60  # 2h30 en secondes
 ANNOUNCE_STATE_FILE = "announce_state.json"
+ANNOUNCE_RETRIES = 3  # Réessais par destination
+ANNOUNCE_BUS_TIMEOUT_S = 15  # Attente max de l'accusé du bot Discord
+ANNOUNCE_PREFETCH_S = 10 * 60  # Hors live : rafraîchissement des infos de la chaîne (titre, catégorie)
 
 # 👇 MODIFIE TES MESSAGES ICI 👇
 # Variables : {title} = titre du stream, {category} = catégorie Twitch
@@ -80,6 +138,17 @@ STREAMER_TAG_REGEX = re.compile(r'\[(?:TOSA&ICHI|ICHI&TOSA|TOSA|ICHI)\]\s*', re.
 FLOOD_MAX_MSG = 5       # Nombre max de messages
 FLOOD_WINDOW_S = 7      # Dans cette fenêtre (secondes)
 
+# État de modération par viewer (flood, warns, âge du compte) gardé en mémoire
+VIEWERS_ETAT_MAX = 50000  # Au-delà, le viewer actif le moins récemment est oublié (LRU)
+
+# Anti-copypasta (même message posté par plusieurs comptes = vague de bots)
+DUPLICATE_WINDOW_S = 30          # Fenêtre glissante (secondes)
+DUPLICATE_MIN_USERS = 4          # Nb de comptes différents pour déclencher
+DUPLICATE_SIMILARITY = 0.6       # Similarité min. (0-1) pour les quasi-doublons
+DUPLICATE_MIN_LENGTH = 20        # Ignore les messages courts ("gg", emotes...)
+DUPLICATE_MIN_UNIQUE_CHARS = 10  # Ignore les messages trop répétitifs (KEKW KEKW KEKW)
+DUPLICATE_MAX_ENTRIES = 5000     # Taille max de la fenêtre
+
 # Anti-liens - TLDs reconnus
 COMMON_TLDS = (
     "com", "org", "net", "fr", "tv", "gg", "io", "co", "me", "be", "ly",
@@ -94,15 +163,33 @@ LINK_REGEX = re.compile(
     re.IGNORECASE
 )
     
-# Domaines autorisés (décommenter pour activer)
+# Liens autorisés / interdits : "domaine.tld" (sous-domaines inclus) ou "domaine.tld/chemin"
+# La règle la plus précise gagne. Lien hors whitelist = supprimé + escalade ;
+# lien en blacklist (domaines de scam) = ban direct.
 LINK_WHITELIST = [
-    # r"twitch\.tv/lacabanevirtuelle",
-    # r"youtube\.com",
+    # "twitch.tv/lacabanevirtuelle",
+    # "youtube.com",
 ]
+LINK_BLACKLIST = [
+    "streamboo.com",
+]
+# Listes longues : une entrée par ligne (optionnel)
+LINK_WHITELIST_FILE = "data/links_allow.txt"
+LINK_BLACKLIST_FILE = "data/links_deny.txt"
+
+# Liste noire communautaire (bots connus, domaines de scam) : ban direct
+# Un fichier = une source (une entrée par ligne, CSV ou format hosts acceptés),
+# réimportée quand il change. Voir blocklist.py
+BLOCKLIST_DB_FILE = "data/blocklist.db"
+BLOCKLIST_DIRS = {
+    "bot": "data/blocklists/bots",
+    "domaine": "data/blocklists/domaines",
+}
+BLOCKLIST_REFRESH_S = 15 * 60       # Vérification des fichiers
+BLOCKLIST_FAUX_POSITIFS = 0.001     # Filtre de Bloom : ~1,8 Mo pour 1 million d'entrées
 
-# Mots interdits
+# Mots interdits (version initiale des règles : compilés par rules.py, sur le message normalisé)
 BANNED_WORDS = ["viagra", "crypto", "follow4follow"]
-BANNED_WORDS_REGEX = re.compile(r"|".join(re.escape(w) for w in BANNED_WORDS), re.IGNORECASE)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -111,14 +198,15 @@ BANNED_WORDS_REGEX = re.compile(r"|".join(re.escape(w) for w in BANNED_WORDS), r
 
 SAFE_MODE = False  # False = Ban réel activé !
 
-# Mots-clés SCAM (déclenchent un BAN si lien ou compte récent)
+# Mots-clés SCAM (déclenchent un BAN si lien ou compte récent ; compilés par rules.py comme BANNED_WORDS)
 SCAM_KEYWORDS = [
     "buy viewers", "big follows", "cheap viewers", "best viewers",
     "fame", "followers", "promotion", "twitch services", "best prices",
-    "streamboo", "remove the space", "doge", "viewers for cheap",
+    "remove the space", "doge", "viewers for cheap",
     "viewers on", "follows on", "prices on", "quality viewers"
 ]
-SCAM_REGEX = re.compile(r"|".join(re.escape(w) for w in SCAM_KEYWORDS), re.IGNORECASE)
+# Mots-clés cherchés dans l'hôte des liens (extraits ou déguisés), jamais dans le texte libre : BAN DIRECT
+SCAM_HOST_KEYWORDS = ["streamboo"]
 
 # Regex pour détecter les liens "cachés" (ex: streamboo .com, discord .gg)
 LINK_OBFUSCATION_REGEX = re.compile(
@@ -127,6 +215,29 @@ LINK_OBFUSCATION_REGEX = re.compile(
     re.IGNORECASE
 )
 
+# Règles modifiables depuis le dashboard (les valeurs ci-dessus servent de version initiale)
+RULES_FILE = "data/rules.json"                # Version active
+RULES_HISTORY_DIR = "data/rules_history"      # Toutes les versions (rollback)
+RULES_STATS_FILE = "data/rules_stats.json"    # Coût par règle, lu par le dashboard
+RULES_RELOAD_S = 5                            # Vérification des modifications
+RULES_STATS_S = 60                            # Publication des statistiques
+VERDICTS_MAX = 500                            # Décisions gardées en mémoire
+
+# Évaluation fantôme : règles candidates testées sur le chat réel, sans sanction
+SHADOW_CANDIDATE_FILE = "data/rules_candidate.json"  # Écrit par le dashboard (absent = désactivé)
+SHADOW_REPORT_FILE = "data/shadow_report.json"       # Divergences + coût, lu par le dashboard
+SHADOW_WORKERS = 2            # Workers d'évaluation (un viewer = toujours le même worker)
+SHADOW_QUEUE_SIZE = 1000      # Messages en attente par worker (au-delà : non évalués)
+SHADOW_BATCH = 50             # Messages évalués par lot (hors boucle asyncio)
+SHADOW_VIEWERS_MAX = 5000     # Historiques de flood gardés par worker avant nettoyage
+SHADOW_REPORT_S = 30          # Écriture du rapport / vérification de la candidate
+SHADOW_EXAMPLES_MAX = 200     # Divergences gardées dans le rapport
+
+# Actions via l'API Helix (fallback IRC si l'appel échoue)
+MOD_API_CONCURRENCY = 8     # Appels simultanés max
+MOD_API_RETRIES = 3         # Réessais (429 / erreurs serveur)
+MOD_API_TIMEOUT_S = 5
+
 # Seuil d'âge du compte pour être considéré comme "suspect" (jours)
 ACCOUNT_AGE_THRESHOLD_DAYS = 7
 
@@ -140,10 +251,119 @@ WARNING_LEVELS = [
 ]
 
 
+# ══════════════════════════════════════════════════════════════════════════════
+#                          BOUCLIER ANTI-RAID (VAGUES DE BOTS)
+# ══════════════════════════════════════════════════════════════════════════════
+
+# Déclenchement : débit > max(plancher, moyenne habituelle x SHIELD_SPIKE_FACTOR)
+SHIELD_WINDOW_S = 30                  # Fenêtre de mesure des débits
+SHIELD_CHECK_S = 5                    # Fréquence de vérification
+SHIELD_MIN_MSG_RATE = 120             # Plancher messages / minute
+SHIELD_MIN_JOIN_RATE = 60             # Plancher JOIN / minute
+SHIELD_SPIKE_FACTOR = 4               # Multiple de la moyenne habituelle
+SHIELD_NEW_ACCOUNT_RATIO = 0.5        # ... ou plus de 50% de comptes récents
+SHIELD_NEW_ACCOUNT_MIN_SAMPLES = 5    # (sur au moins 5 comptes vérifiés)
+SHIELD_CALM_S = 120                   # Calme requis avant de désactiver
+SHIELD_RAID_GRACE_S = 120             # JOIN et débit de messages ignorés après un raid légitime
+
+# Actions en mode bouclier (0 = désactivé)
+SHIELD_FOLLOWER_ONLY_MIN = 10         # Follower-only : follow depuis 10 min
+SHIELD_SLOW_MODE_S = 5                # Slow mode 5s
+SHIELD_BAN_BATCH_S = 2                # Bans envoyés par lots toutes les 2s
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                          ARCHIVE DU CHAT
+# ══════════════════════════════════════════════════════════════════════════════
+
+CHAT_ARCHIVE_DIR = "data/chat_archive"
+CHAT_ARCHIVE_BATCH_SIZE = 500          # Écriture dès que ce nombre de messages est en attente
+CHAT_ARCHIVE_FLUSH_S = 30              # ... ou au moins toutes les 30 secondes
+CHAT_ARCHIVE_SEGMENT_MAX_MSG = 5000    # Rotation du segment après N messages
+CHAT_ARCHIVE_SEGMENT_MAX_S = 3600      # ... ou après 1h
+CHAT_ARCHIVE_RETENTION_DAYS = 30       # Suppression des segments plus vieux
+CHAT_ARCHIVE_MAX_BUFFER = 50000        # Tampon max en mémoire si le disque ne suit pas
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                          SUPERVISION & SAUVEGARDE D'ÉTAT
+# ══════════════════════════════════════════════════════════════════════════════
+
+SUPERVISOR_BACKOFF_MIN_S = 1       # Premier délai avant redémarrage d'un composant planté
+SUPERVISOR_BACKOFF_MAX_S = 60      # Délai max (doublé à chaque plantage)
+SUPERVISOR_STABLE_S = 300          # Backoff remis à zéro après 5 min sans plantage
+
+STATE_SNAPSHOT_FILE = "data/state.pickle"
+STATE_SNAPSHOT_S = 30              # Sauvegarde de l'état toutes les 30s
+STATE_SNAPSHOT_MAX_AGE_S = 6 * 3600  # Au-delà, l'état est jugé périmé au démarrage
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                          CLIPS
+# ══════════════════════════════════════════════════════════════════════════════
+
+CLIP_COALESCE_S = 20        # Les !clip dans cette fenêtre rejoignent le même clip
+CLIP_CONCURRENCY = 2        # Créations de clips en parallèle
+CLIP_QUEUE_SIZE = 10        # Clips en attente max (au-delà, la demande est refusée)
+CLIP_PROCESS_TIMEOUT_S = 30 # Attente max du traitement par Twitch
+CLIPS_DB_FILE = "data/clips.db"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                          STATISTIQUES DU CHAT
+# ══════════════════════════════════════════════════════════════════════════════
+
+ANALYTICS_FILE = "data/chat_analytics.json"  # Séries + heatmap + résumés (lu par le dashboard)
+ANALYTICS_EXPORT_S = 10           # Publication des séries
+ANALYTICS_SECONDES = 300          # Historique seconde par seconde (5 min)
+ANALYTICS_MINUTES = 1440          # Historique minute par minute (24 h)
+ANALYTICS_UNIQUES_MINUTES = 60    # Fenêtre max pour compter les chatters distincts
+ANALYTICS_RESUMES_MAX = 200       # Résumés de streams gardés
+ANALYTICS_TOP_COMMANDES = 10      # Commandes les plus utilisées dans un résumé
+
+# Historique des streams (sessions + échantillons viewers/catégorie à chaque poll)
+STREAMS_DB_FILE = "data/streams.db"
+
+# Copie locale des followers / abonnés (!mytime sans appel API)
+COMMUNITY_DB_FILE = "data/community.db"
+FOLLOWERS_SYNC_S = 10 * 60            # Synchro incrémentale (nouveaux followers)
+FOLLOWERS_FULL_SYNC_S = 24 * 60 * 60  # Passage complet (retire les unfollows)
+
+# Présence des viewers (Helix Get Chatters, repli sur la liste IRC)
+PRESENCE_PAGE_SIZE = 1000             # Max autorisé par Twitch
+PRESENCE_PAGES_MAX = 100              # Garde-fou : 100 000 viewers par relevé
+PRESENCE_IDS_LOT = 100                # Repli IRC : IDs manquants demandés par lots (max Get Users)
+# Bots connus (jamais comptés : ni temps de visionnage, ni points)
+PRESENCE_BOTS = frozenset({
+    "nightbot", "streamelements", "streamlabs", "moobot", "fossabot", "wizebot",
+    "soundalerts", "sery_bot", "commanderroot", "anotherttvviewer", "streamholics",
+    "lurxx", "aliceydra", "drapsnatt", "kattah", "v_and_k", "0ax2",
+})
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                          POINTS DE FIDÉLITÉ
+# ══════════════════════════════════════════════════════════════════════════════
+
+LOYALTY_DB_FILE = "data/loyalty.db"
+LOYALTY_ANCIEN_TEMPS_FILE = "data/viewers.json"  # Ancien temps de visionnage, repris une fois dans la base
+LOYALTY_NOM = "cabanes"               # Nom de la monnaie affiché dans le chat
+LOYALTY_POINTS_PAR_TICK = 10          # Par minute de présence (live uniquement)
+LOYALTY_MULT_ABONNE = {"1000": 1.5, "2000": 2, "3000": 3}  # Par tier d'abonnement
+LOYALTY_MULT_CHAT = 1.5               # A parlé dans le chat récemment...
+LOYALTY_CHAT_MINUTES = 10             # ... sur les 10 dernières minutes
+# Récompenses (!redeem <nom>) : coût et message annoncé dans le chat
+LOYALTY_REWARDS = {
+    "hydrate": {"cout": 500, "message": "💧 @{pseudo} ordonne au streamer de boire un verre d'eau !"},
+    "emote": {"cout": 1000, "message": "🎉 @{pseudo} lance une pluie d'emotes !"},
+    "chanson": {"cout": 3000, "message": "🎵 @{pseudo} choisit la prochaine musique !"},
+}
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #                          AUTO MESSAGES (CHAT)
 # ══════════════════════════════════════════════════════════════════════════════
 
 AUTO_MSG_INTERVAL = 600  # 10 minutes en secondes
-AUTO_MSG_THRESHOLD = 10   # Nombre de messages min. entre deux alertes
+AUTO_MSG_THRESHOLD = 10   # Nombre de messages min. sur l'intervalle pour envoyer une alerte
 AUTO_MSG_TEXT = "📢 Rejoignez notre Discord : https://discord.gg/WjBfgXmEdU !\n\n📢 Le planning, les actus et si tu veux trouver des mates tout est dessus !!!"
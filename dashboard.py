@@ -3,16 +3,29 @@ Serveur Web pour le Dashboard RyosaChii (Mode Autonome)
 """
 
 import os
+import re
 import json
+import time
 import socket
+import asyncio
 from aiohttp import web
 from custom_commands import CommandManager
+from chat_archive import ChatArchive
+from stream_sessions import HistoriqueStreams
+from loyalty import BaseFidelite
+from config import RULES_STATS_FILE, SHADOW_CANDIDATE_FILE, SHADOW_REPORT_FILE, ANALYTICS_FILE
+from rules import RuleStore, compiler
+from shadow import VERSION_CANDIDATE
 
 CONFIG_FILE = "dashboard_config.json"
 
 class DashboardApp:
     def __init__(self):
         self.cmd_manager = CommandManager()
+        self.chat_archive = ChatArchive(lecture_seule=True)
+        self.rule_store = RuleStore()
+        self.historique_streams = HistoriqueStreams()
+        self.fidelite = BaseFidelite()
         self.app = web.Application()
         self.runner = None
         self.site = None
@@ -25,9 +38,28 @@ class DashboardApp:
         # Routes pour les alertes
         self.app.router.add_get('/api/alerts', self.handle_get_alerts)
         self.app.router.add_post('/api/alerts', self.handle_update_alerts)
+        # Archive du chat
+        self.app.router.add_get('/api/chatlog', self.handle_chatlog)
+        # Statistiques du chat (séries publiées par le bot)
+        self.app.router.add_get('/api/analytics', self.handle_analytics)
+        self.app.router.add_get('/api/streams', self.handle_streams)
+        # Points de fidélité (même base que le bot)
+        self.app.router.add_get('/api/loyalty', self.handle_get_loyalty)
+        self.app.router.add_post('/api/loyalty', self.handle_adjust_loyalty)
+        # Règles de modération (le bot recharge data/rules.json à chaud)
+        self.app.router.add_get('/api/rules', self.handle_get_rules)
+        self.app.router.add_post('/api/rules', self.handle_publish_rules)
+        self.app.router.add_post('/api/rules/rollback', self.handle_rollback_rules)
+        # Évaluation fantôme des règles candidates
+        self.app.router.add_get('/api/shadow', self.handle_get_shadow)
+        self.app.router.add_post('/api/shadow', self.handle_set_shadow)
+        self.app.router.add_delete('/api/shadow', self.handle_stop_shadow)
+        self.app.router.add_post('/api/shadow/promote', self.handle_promote_shadow)
 
     async def start(self):
         """Démarre le serveur web."""
+        await asyncio.to_thread(self.historique_streams.ouvrir)
+        await asyncio.to_thread(self.fidelite.ouvrir)
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
         self.site = web.TCPSite(self.runner, '0.0.0.0', 8080)
@@ -116,8 +148,192 @@ class DashboardApp:
         await self.save_config(current_config)
         return web.json_response({'status': 'ok'})
 
+    async def handle_chatlog(self, request):
+        """API: Recherche dans l'archive du chat.
+
+        ?user=pseudo&n=50            -> derniers messages d'un viewer
+        ?pattern=regex&minutes=60    -> messages correspondant sur la période
+        """
+        user = request.query.get('user')
+        pattern = request.query.get('pattern')
+        try:
+            if pattern:
+                minutes = int(request.query.get('minutes', 60))
+                messages = await asyncio.to_thread(
+                    self.chat_archive.rechercher, pattern, minutes * 60, user
+                )
+            elif user:
+                n = int(request.query.get('n', 50))
+                messages = await asyncio.to_thread(self.chat_archive.derniers_messages, user, n)
+            else:
+                return web.json_response({'error': 'missing user or pattern'}, status=400)
+        except (ValueError, re.error) as e:
+            return web.json_response({'error': str(e)}, status=400)
+        return web.json_response(messages)
+
+    async def handle_get_rules(self, request):
+        """API: Règles actives, versions disponibles et statistiques publiées par le bot."""
+        regles = await asyncio.to_thread(self.rule_store.recharger)
+        stats = {}
+        if os.path.exists(RULES_STATS_FILE):
+            try:
+                with open(RULES_STATS_FILE, 'r', encoding='utf-8') as f:
+                    stats = json.load(f)
+            except (OSError, ValueError):
+                pass
+        return web.json_response({
+            'version': regles.version,
+            'regles': regles.source,
+            'versions': self.rule_store.versions(),
+            'stats': stats,
+        })
+
+    async def handle_publish_rules(self, request):
+        """API: Publie une nouvelle version des règles (validée avant activation)."""
+        try:
+            data = await request.json()
+            if not isinstance(data, dict):
+                raise ValueError("objet JSON attendu")
+            await asyncio.to_thread(self.rule_store.recharger)
+            regles = await self.rule_store.publier(data)
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        return web.json_response({'status': 'ok', 'version': regles.version})
+
+    async def handle_rollback_rules(self, request):
+        """API: Réactive une version précédente ({"version": N}, par défaut la précédente)."""
+        try:
+            data = await request.json() if request.can_read_body else {}
+            version = data.get('version')
+            await asyncio.to_thread(self.rule_store.recharger)
+            regles = await self.rule_store.rollback(int(version) if version is not None else None)
+        except (ValueError, TypeError) as e:
+            return web.json_response({'error': str(e)}, status=400)
+        return web.json_response({'status': 'ok', 'version': regles.version})
+
+    def _lire_json(self, chemin):
+        if not os.path.exists(chemin):
+            return None
+        try:
+            with open(chemin, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _ecrire_json(self, chemin, donnees):
+        # Écriture atomique : le bot ne doit jamais relire un fichier à moitié écrit
+        os.makedirs(os.path.dirname(chemin) or '.', exist_ok=True)
+        tmp = chemin + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(donnees, f, indent=4, ensure_ascii=False)
+        os.replace(tmp, chemin)
+
+    async def handle_analytics(self, request):
+        """API: Débits du chat (par seconde / minute), chatters, heatmap jour x heure, résumés des streams.
+
+        ?partie=heatmap|resumes|par_minute|...  -> une seule partie
+        """
+        data = await asyncio.to_thread(self._lire_json, ANALYTICS_FILE)
+        if data is None:
+            return web.json_response({'error': 'aucune donnée'}, status=404)
+        partie = request.query.get('partie')
+        if partie:
+            if partie not in data:
+                return web.json_response({'error': f'partie inconnue: {partie}'}, status=400)
+            return web.json_response(data[partie])
+        return web.json_response(data)
+
+    async def handle_streams(self, request):
+        """API: Historique des streams.
+
+        ?n=20       -> dernières sessions
+        ?jours=30   -> viewers moyens par catégorie sur la période
+        """
+        try:
+            n = int(request.query.get('n', 20))
+            jours = int(request.query.get('jours', 30))
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        sessions, categories = await asyncio.gather(
+            asyncio.to_thread(self.historique_streams.dernieres, n),
+            asyncio.to_thread(self.historique_streams.moyenne_par_categorie, jours),
+        )
+        return web.json_response({'sessions': sessions, 'categories': categories})
+
+    async def handle_get_loyalty(self, request):
+        """API: Classement et dernières transactions (?user_id=... pour un viewer)."""
+        user_id = request.query.get('user_id')
+        try:
+            n = int(request.query.get('n', 20))
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        if user_id:
+            solde, transactions = await asyncio.gather(
+                asyncio.to_thread(self.fidelite.solde, user_id),
+                asyncio.to_thread(self.fidelite.transactions, n, user_id),
+            )
+            return web.json_response({'solde': solde, 'transactions': transactions})
+        classement, transactions = await asyncio.gather(
+            asyncio.to_thread(self.fidelite.classement, n),
+            asyncio.to_thread(self.fidelite.transactions, n),
+        )
+        return web.json_response({'classement': classement, 'transactions': transactions})
+
+    async def handle_adjust_loyalty(self, request):
+        """API: Ajoute / retire des points ({"user_id", "login", "delta", "motif"})."""
+        try:
+            data = await request.json()
+            user_id, login, delta = str(data['user_id']), str(data['login']), int(data['delta'])
+        except (ValueError, KeyError, TypeError) as e:
+            return web.json_response({'error': f'paramètre invalide: {e}'}, status=400)
+        solde = await asyncio.to_thread(
+            self.fidelite.ajuster, user_id, login, delta, data.get('motif') or 'dashboard'
+        )
+        return web.json_response({'status': 'ok', 'points': solde})
+
+    async def handle_get_shadow(self, request):
+        """API: Règles candidates + rapport de divergences publié par le bot."""
+        candidat = await asyncio.to_thread(self._lire_json, SHADOW_CANDIDATE_FILE)
+        rapport = await asyncio.to_thread(self._lire_json, SHADOW_REPORT_FILE) if candidat else None
+        return web.json_response({
+            'regles': candidat['regles'] if candidat else None,
+            'rapport': rapport,
+        })
+
+    async def handle_set_shadow(self, request):
+        """API: Lance l'évaluation fantôme d'une version candidate (aucune sanction)."""
+        try:
+            data = await request.json()
+            if not isinstance(data, dict):
+                raise ValueError("objet JSON attendu")
+            regles = await asyncio.to_thread(compiler, data, VERSION_CANDIDATE)
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        await asyncio.to_thread(
+            self._ecrire_json, SHADOW_CANDIDATE_FILE, {'date': time.time(), 'regles': regles.source}
+        )
+        return web.json_response({'status': 'ok'})
+
+    async def handle_stop_shadow(self, request):
+        """API: Arrête l'évaluation fantôme."""
+        if os.path.exists(SHADOW_CANDIDATE_FILE):
+            os.remove(SHADOW_CANDIDATE_FILE)
+        return web.json_response({'status': 'ok'})
+
+    async def handle_promote_shadow(self, request):
+        """API: Publie la candidate comme nouvelle version active et arrête l'évaluation."""
+        candidat = await asyncio.to_thread(self._lire_json, SHADOW_CANDIDATE_FILE)
+        if not candidat:
+            return web.json_response({'error': 'aucune règle candidate'}, status=400)
+        try:
+            await asyncio.to_thread(self.rule_store.recharger)
+            regles = await self.rule_store.publier(candidat['regles'])
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        os.remove(SHADOW_CANDIDATE_FILE)
+        return web.json_response({'status': 'ok', 'version': regles.version})
+
 if __name__ == '__main__':
-    import asyncio
     dashboard = DashboardApp()
     loop = asyncio.get_event_loop()
     try:
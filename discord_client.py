@@ -3,34 +3,229 @@ Client Discord pour RyosaChii.
 Gère les interactions chat et l'hébergement du bot Discord.
 """
 import discord
+from discord import app_commands
+import aiohttp
 import asyncio
-from config import DISCORD_ROLE_ID
+from config import (
+    DISCORD_ROLE_ID, DISCORD_WEBHOOK_URL, DISCORD_LOG_CHANNEL_ID, DISCORD_GUILD_ID,
+    DISCORD_CLIPS_CHANNEL_ID, DISCORD_ANNOUNCE_CHANNEL_IDS, ACCOUNT_LINK_CODE_TTL_S
+)
+from event_bus import LogModeration, AnnonceLive, ClipCree
+from announce_pipeline import EchecNonDelivre
+
+PREFIXE = "!"
 
 class RyosaDiscordBot(discord.Client):
-    def __init__(self):
+    def __init__(self, http_client=None, bus=None, twitch_bot=None, cmd_manager=None):
         # Les "intents" sont les permissions d'événements
         intents = discord.Intents.default()
         intents.message_content = True  # Nécessaire pour lire les messages
         intents.members = True          # Nécessaire pour voir les membres
         
         super().__init__(intents=intents)
+        # Client HTTP partagé avec le bot Twitch (discord.py garde son propre pool pour la gateway)
+        self.http_client = http_client
+        self.twitch_bot = twitch_bot
+        # Commandes personnalisées : même CommandManager que le bot Twitch
+        self.cmd_manager = cmd_manager
+        self.tree = app_commands.CommandTree(self)
+
+        # Commandes intégrées : {nom: (handler, description, réponse privée)}
+        self.commandes = {
+            "!ping": (self._cmd_ping, "Latence du bot", False),
+            "!statut": (self._cmd_statut, "État du stream et du bot Twitch", False),
+            "!link": (self._cmd_link, "Lier ton compte Twitch", True),
+            "!mytime": (self._cmd_mytime, "Ton temps de visionnage sur Twitch", False),
+            "!scoretime": (self._cmd_scoretime, "Top 5 des viewers les plus fidèles", False),
+            "!commandes": (self._cmd_commandes, "Liste des commandes", False),
+        }
+
+        # Abonnements au bus (seulement pour les salons configurés)
+        self.bus = bus
+        self._abonnements = []
+        if bus is not None:
+            if DISCORD_LOG_CHANNEL_ID:
+                self._abonnements.append(bus.subscribe(LogModeration, self._on_log))
+            if DISCORD_ANNOUNCE_CHANNEL_IDS:
+                self._abonnements.append(bus.subscribe(AnnonceLive, self._on_annonce))
+            if DISCORD_CLIPS_CHANNEL_ID:
+                self._abonnements.append(bus.subscribe(ClipCree, self._on_clip))
+
+    async def setup_hook(self):
+        """Enregistre les commandes slash (même registre que les commandes !)."""
+        for nom, (handler, description, prive) in self.commandes.items():
+            self.tree.add_command(self._commande_slash(nom[1:], handler, description, prive))
+        self.tree.add_command(self._commande_slash_personnalisee())
+        try:
+            if DISCORD_GUILD_ID:
+                serveur = discord.Object(id=DISCORD_GUILD_ID)
+                self.tree.copy_global_to(guild=serveur)
+                await self.tree.sync(guild=serveur)
+            else:
+                await self.tree.sync()
+        except Exception as e:
+            print(f"[DISCORD] Erreur synchro commandes slash: {e}")
+
+    async def close(self):
+        # Désabonnement : une nouvelle instance (redémarrage) prendra le relais
+        for abonnement in self._abonnements:
+            self.bus.unsubscribe(abonnement)
+        self._abonnements = []
+        await super().close()
 
     async def on_ready(self):
         print(f"✅ [DISCORD] Connecté en tant que {self.user} (ID: {self.user.id})")
         print(f"   📊 Connecté à {len(self.guilds)} serveur(s)")
 
     async def on_message(self, message):
-        # Ne pas répondre à soi-même
-        if message.author == self.user:
+        # Test O(1) avant tout traitement : ni préfixe, ni mention du bot -> rien à faire
+        content = message.content
+        if not content.startswith(PREFIXE) and not message.mentions:
             return
 
-        # Simple réponse "coucou" si on mentionne Ryosa
-        content = message.content.lower()
-        if "ryosa" in content and ("coucou" in content or "salut" in content or "hello" in content):
-            await message.channel.send(f"Coucou {message.author.mention} ! Ravie de te voir 🌸")
-        
-        # Commande !ping spécifique Discord
-        if message.content == "!ping":
-            await message.channel.send(f"Pong ! 🏓 ({round(self.latency * 1000)}ms)")
+        # Ne pas répondre à soi-même ni aux autres bots (pas de boucles bot <-> bot)
+        if message.author.bot:
+            return
+
+        if not content.startswith(PREFIXE):
+            # Petit coucou quand on mentionne Ryosa
+            if self.user in message.mentions:
+                await message.channel.send(f"Coucou {message.author.mention} ! Ravie de te voir 🌸")
+            return
+
+        nom = content.split(maxsplit=1)[0].lower()
+        commande = self.commandes.get(nom)
+        if commande is not None:
+            handler, _, prive = commande
+            reponse = await handler(message.author)
+            if prive:
+                try:
+                    await message.author.send(reponse)
+                    await message.add_reaction("📩")
+                    return
+                except discord.HTTPException:
+                    pass  # MP fermés : on répond dans le salon
+            await message.channel.send(reponse)
+            return
+
+        # Commandes personnalisées du dashboard (registre partagé avec Twitch)
+        if self.cmd_manager is not None:
+            reponse = self.cmd_manager.get_response(content)
+            if reponse:
+                await message.channel.send(reponse, allowed_mentions=discord.AllowedMentions.none())
+
+    # ─────────────────────────── COMMANDES ───────────────────────────
+
+    def _commande_slash(self, nom: str, handler, description: str, prive: bool) -> app_commands.Command:
+        async def callback(interaction: discord.Interaction):
+            await interaction.response.send_message(await handler(interaction.user), ephemeral=prive)
+        return app_commands.Command(name=nom, description=description, callback=callback)
+
+    def _commande_slash_personnalisee(self) -> app_commands.Command:
+        """/cmd <nom> : commandes du dashboard."""
+        async def callback(interaction: discord.Interaction, nom: str):
+            reponse = self.cmd_manager.get_response("!" + nom.lstrip("!")) if self.cmd_manager else None
+            await interaction.response.send_message(
+                reponse or "❌ Commande inconnue.", ephemeral=not reponse,
+                allowed_mentions=discord.AllowedMentions.none()
+            )
+        return app_commands.Command(name="cmd", description="Commande personnalisée du stream", callback=callback)
+
+    async def _cmd_ping(self, auteur) -> str:
+        return f"Pong ! 🏓 ({round(self.latency * 1000)}ms)"
+
+    async def _cmd_statut(self, auteur) -> str:
+        # État du bot Twitch (même process, pas d'appel réseau)
+        bot = self.twitch_bot
+        if bot is None:
+            return "Bot Twitch non connecté."
+        # État partagé tenu par l'announcer (None tant que le premier poll n'a pas eu lieu)
+        en_live = bot.etat_live.en_live
+        bouclier = getattr(bot, "raid_shield", None)
+        statut = "❔ inconnu (démarrage)" if en_live is None else ("🔴 en live" if en_live else "⚫ hors ligne")
+        lignes = [f"📺 Stream : {statut}"]
+        if bouclier is not None:
+            etat = "🛡️ actif" if bouclier.actif else "inactif"
+            lignes.append(f"Bouclier : {etat} ({bouclier.taux()['messages']:.0f} msg/min)")
+        return "\n".join(lignes)
+
+    async def _cmd_link(self, auteur) -> str:
+        if self.twitch_bot is None or self.twitch_bot.liens_comptes is None:
+            return "Bot Twitch non connecté."
+        code = self.twitch_bot.liens_comptes.demander(auteur.id)
+        return (f"🔗 Tape `!link {code}` dans le chat Twitch pour lier ton compte "
+                f"(valable {ACCOUNT_LINK_CODE_TTL_S // 60} min).")
+
+    async def _cmd_mytime(self, auteur) -> str:
+        if self.twitch_bot is None or self.twitch_bot.liens_comptes is None:
+            return "Bot Twitch non connecté."
+        lien = self.twitch_bot.liens_comptes.twitch_de(auteur.id)
+        if not lien:
+            return "Ton compte n'est pas lié à Twitch : tape `!link` pour le lier 🔗"
+        stats = self.twitch_bot.get_cog("ViewerStats")
+        if stats is None:
+            return "Statistiques indisponibles."
+        return f"⏳ {lien['twitch_login']} a regardé le stream pendant **{await stats.temps_regarde(lien['twitch_id'])}** !"
+
+    async def _cmd_scoretime(self, auteur) -> str:
+        stats = self.twitch_bot.get_cog("ViewerStats") if self.twitch_bot else None
+        if stats is None:
+            return "Statistiques indisponibles."
+        lignes = ["🏆 **Top 5 Fidélité** 🏆"]
+        for i, (pseudo, mins) in enumerate(await stats.top(5), 1):
+            lignes.append(f"{i}. **{pseudo}** : {mins // 60}h{mins % 60:02d}")
+        return "\n".join(lignes)
+
+    async def _cmd_commandes(self, auteur) -> str:
+        noms = list(self.commandes)
+        if self.cmd_manager is not None:
+            noms += self.cmd_manager.get_all()
+        return "📜 **Commandes dispo** : " + ", ".join(sorted(noms))
+
+    # ─────────────────────────── BUS D'ÉVÉNEMENTS ───────────────────────────
+
+    async def _salon(self, channel_id: int):
+        await self.wait_until_ready()
+        return self.get_channel(channel_id) or await self.fetch_channel(channel_id)
+
+    async def _on_log(self, evt: LogModeration):
+        try:
+            salon = await self._salon(DISCORD_LOG_CHANNEL_ID)
+            await salon.send(evt.texte[:2000], allowed_mentions=discord.AllowedMentions.none())
+        except Exception as e:
+            print(f"[DISCORD] Erreur log: {e}")
+            # Repli sur le webhook pour ne pas perdre le log
+            if DISCORD_WEBHOOK_URL and self.http_client:
+                await self.http_client.request("POST", DISCORD_WEBHOOK_URL, json={"content": evt.texte})
+
+    async def _on_annonce(self, evt: AnnonceLive):
+        embed = discord.Embed.from_dict(evt.embed)
+        resultats = {}
+        for channel_id in evt.salons or DISCORD_ANNOUNCE_CHANNEL_IDS:
+            try:
+                salon = await self._salon(channel_id)
+                await salon.send(
+                    content=evt.mention, embed=embed,
+                    allowed_mentions=discord.AllowedMentions(roles=True, everyone=False, users=False)
+                )
+                resultats[channel_id] = None
+            except (discord.HTTPException, aiohttp.ClientConnectorError) as e:
+                status = getattr(e, "status", None)
+                if status is None or status == 429 or status >= 500:
+                    # Rien n'a été posté : le pipeline peut réessayer ce salon
+                    resultats[channel_id] = EchecNonDelivre(str(e))
+                else:
+                    resultats[channel_id] = e
+            except Exception as e:
+                resultats[channel_id] = e
+        if evt.accuse and not evt.accuse.done():
+            evt.accuse.set_result(resultats)
 
-    # Tu pourras ajouter plein d'autres événements ici !
+    async def _on_clip(self, evt: ClipCree):
+        salon = await self._salon(DISCORD_CLIPS_CHANNEL_ID)
+        auteurs = ", ".join(evt.auteurs)
+        embed = discord.Embed(title=evt.titre or "Nouveau clip", url=evt.url, color=0x9146FF)
+        embed.set_footer(text=f"Demandé par {auteurs}")
+        if evt.thumbnail_url:
+            embed.set_image(url=evt.thumbnail_url)
+        await salon.send(f"🎬 Nouveau clip par {auteurs} : {evt.url}", embed=embed)
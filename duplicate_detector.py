@@ -0,0 +1,150 @@
+"""
+Détection de copypasta / vagues de bots (messages identiques entre comptes)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Chaque message (forme normalisée) reçoit une empreinte :
+  - un hash exact
+  - une signature MinHash "one permutation" (NB_BINS minimums) pour les
+    quasi-doublons, découpée en bandes (LSH) pour retrouver les candidats
+
+Les messages proches sont regroupés ; un groupe qui rassemble assez d'auteurs
+différents dans la fenêtre glissante est signalé. Toutes les structures sont
+bornées, le coût par message ne dépend pas de la taille de la fenêtre.
+"""
+
+import time
+from collections import deque
+from config import (
+    DUPLICATE_WINDOW_S, DUPLICATE_MAX_ENTRIES, DUPLICATE_MIN_USERS,
+    DUPLICATE_MIN_LENGTH, DUPLICATE_MIN_UNIQUE_CHARS, DUPLICATE_SIMILARITY
+)
+
+NB_BINS = 16
+NB_BANDES = 4
+TAILLE_BANDE = NB_BINS // NB_BANDES
+SHINGLE = 4
+MAX_GROUPES_PAR_BANDE = 8
+MAX_IDS_PAR_GROUPE = 100
+VIDE = -1
+
+
+class Groupe:
+    """Messages identiques ou quasi identiques dans la fenêtre."""
+    __slots__ = ("id", "signature", "cles", "auteurs", "message_ids")
+
+    def __init__(self, id_groupe: int, signature: tuple):
+        self.id = id_groupe
+        self.signature = signature
+        self.cles = ()           # clés de bandes (pour le nettoyage)
+        self.auteurs = {}        # {auteur: nb de messages dans la fenêtre}
+        self.message_ids = deque(maxlen=MAX_IDS_PAR_GROUPE)
+
+
+def signature_minhash(texte: str) -> tuple:
+    """MinHash à une permutation : un seul hash par shingle, NB_BINS minimums."""
+    mins = [VIDE] * NB_BINS
+    for i in range(max(1, len(texte) - SHINGLE + 1)):
+        h = hash(texte[i:i + SHINGLE]) & 0xFFFFFFFFFFFFFFFF
+        b = h % NB_BINS
+        v = h // NB_BINS
+        if mins[b] == VIDE or v < mins[b]:
+            mins[b] = v
+    return tuple(mins)
+
+
+def similarite(a: tuple, b: tuple) -> float:
+    """Estimation de Jaccard : proportion de bins identiques."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NB_BINS
+
+
+class DuplicateDetector:
+    """Fenêtre glissante d'empreintes, partagée par tous les viewers."""
+
+    def __init__(self):
+        self._fenetre = deque()   # (ts, groupe, auteur, hash exact)
+        self._exacts = {}         # hash exact -> [Groupe, nb d'entrées dans la fenêtre]
+        self._bandes = {}         # (n° bande, valeurs) -> [Groupe]
+        self._prochain_id = 0
+
+    def observer(self, auteur: str, normalise: str, message_id: str | None = None,
+                 maintenant: float | None = None) -> Groupe | None:
+        """
+        Enregistre un message. Retourne son groupe si celui-ci a atteint
+        DUPLICATE_MIN_USERS auteurs distincts (vague détectée), sinon None.
+        """
+        if len(normalise) < DUPLICATE_MIN_LENGTH or len(set(normalise)) < DUPLICATE_MIN_UNIQUE_CHARS:
+            # Trop court / trop répétitif (emotes, "gg") : pas pertinent
+            return None
+
+        maintenant = time.time() if maintenant is None else maintenant
+        self._expirer(maintenant)
+
+        cle_exacte = hash(normalise)
+        entree = self._exacts.get(cle_exacte)
+        if entree is None:
+            signature = signature_minhash(normalise)
+            cles = tuple((i, signature[i * TAILLE_BANDE:(i + 1) * TAILLE_BANDE]) for i in range(NB_BANDES))
+            groupe = self._chercher_proche(signature, cles)
+            if groupe is None:
+                groupe = self._creer_groupe(signature, cles)
+            entree = self._exacts[cle_exacte] = [groupe, 0]
+        groupe = entree[0]
+        entree[1] += 1
+
+        groupe.auteurs[auteur] = groupe.auteurs.get(auteur, 0) + 1
+        if message_id:
+            groupe.message_ids.append(message_id)
+        self._fenetre.append((maintenant, groupe, auteur, cle_exacte))
+
+        if len(self._fenetre) > DUPLICATE_MAX_ENTRIES:
+            self._retirer_plus_ancien()
+
+        if len(groupe.auteurs) >= DUPLICATE_MIN_USERS:
+            return groupe
+        return None
+
+    def _chercher_proche(self, signature: tuple, cles: tuple) -> Groupe | None:
+        for cle in cles:
+            for groupe in self._bandes.get(cle, ()):
+                if similarite(signature, groupe.signature) >= DUPLICATE_SIMILARITY:
+                    return groupe
+        return None
+
+    def _creer_groupe(self, signature: tuple, cles: tuple) -> Groupe:
+        groupe = Groupe(self._prochain_id, signature)
+        self._prochain_id += 1
+        groupe.cles = cles
+        for cle in cles:
+            seau = self._bandes.setdefault(cle, [])
+            seau.append(groupe)
+            if len(seau) > MAX_GROUPES_PAR_BANDE:
+                del seau[0]
+        return groupe
+
+    def _expirer(self, maintenant: float):
+        limite = maintenant - DUPLICATE_WINDOW_S
+        while self._fenetre and self._fenetre[0][0] < limite:
+            self._retirer_plus_ancien()
+
+    def _retirer_plus_ancien(self):
+        _, groupe, auteur, cle_exacte = self._fenetre.popleft()
+
+        entree = self._exacts.get(cle_exacte)
+        if entree is not None:
+            entree[1] -= 1
+            if entree[1] <= 0:
+                del self._exacts[cle_exacte]
+
+        reste = groupe.auteurs.get(auteur, 0) - 1
+        if reste > 0:
+            groupe.auteurs[auteur] = reste
+            return
+        groupe.auteurs.pop(auteur, None)
+        if not groupe.auteurs:
+            # Groupe vide : on le retire des bandes
+            for cle in groupe.cles:
+                seau = self._bandes.get(cle)
+                if seau and groupe in seau:
+                    seau.remove(groupe)
+                    if not seau:
+                        del self._bandes[cle]
@@ -0,0 +1,111 @@
+"""
+Bus d'événements interne (Twitch <-> Discord dans le même process)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Publication / abonnement typés : chaque abonné a sa propre file bornée et sa
+propre tâche, un abonné lent ne bloque ni l'émetteur ni les autres abonnés.
+Si la file est pleine, l'événement le plus ancien est abandonné.
+"""
+
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+from config import EVENT_BUS_QUEUE_SIZE
+
+
+# ─────────────────────────── ÉVÉNEMENTS ───────────────────────────
+
+@dataclass(frozen=True)
+class LogModeration:
+    """Ligne du journal de modération / système."""
+    texte: str
+
+
+@dataclass(frozen=True)
+class AnnonceLive:
+    """Annonce de début de live. `accuse` est résolu avec {salon: None si posté, sinon l'exception}."""
+    mention: str
+    embed: dict
+    accuse: asyncio.Future | None = field(default=None, compare=False)
+    salons: tuple = ()  # Vide = tous les salons configurés (sinon : réessai des salons en échec)
+
+
+@dataclass(frozen=True)
+class ClipCree:
+    """Clip créé depuis le chat."""
+    url: str
+    auteurs: tuple
+    titre: str = ""
+    thumbnail_url: str = ""
+
+
+@dataclass(frozen=True)
+class ChangementLive:
+    """Le stream passe en live (True) ou hors ligne (False), voir live_state."""
+    en_live: bool
+    depuis: float
+
+
+# ─────────────────────────── BUS ───────────────────────────
+
+class Abonnement:
+    """File + tâche de traitement d'un abonné."""
+
+    def __init__(self, handler, maxsize: int):
+        self.handler = handler
+        self.file = asyncio.Queue(maxsize=maxsize)
+        self.tache = None
+        self.perdus = 0
+
+    def deposer(self, evenement):
+        if self.file.full():
+            self.file.get_nowait()
+            self.perdus += 1
+        self.file.put_nowait(evenement)
+        if self.tache is None:
+            self.tache = asyncio.create_task(self._boucle())
+
+    async def _boucle(self):
+        while True:
+            evenement = await self.file.get()
+            try:
+                await self.handler(evenement)
+            except Exception as e:
+                print(f"[BUS] Erreur abonné {getattr(self.handler, '__qualname__', self.handler)}: {e}")
+
+
+class EventBus:
+    """Publication / abonnement par type d'événement."""
+
+    def __init__(self):
+        self._abonnes = defaultdict(list)
+
+    def subscribe(self, type_evenement: type, handler, maxsize: int = EVENT_BUS_QUEUE_SIZE) -> Abonnement:
+        """Abonne une coroutine `handler(evenement)` à un type d'événement."""
+        abonnement = Abonnement(handler, maxsize)
+        self._abonnes[type_evenement].append(abonnement)
+        return abonnement
+
+    def unsubscribe(self, abonnement: Abonnement):
+        for abonnes in self._abonnes.values():
+            if abonnement in abonnes:
+                abonnes.remove(abonnement)
+        if abonnement.tache:
+            abonnement.tache.cancel()
+
+    def a_des_abonnes(self, type_evenement: type) -> bool:
+        return bool(self._abonnes.get(type_evenement))
+
+    def publish(self, evenement) -> int:
+        """Publie sans attendre. Retourne le nombre d'abonnés qui vont le recevoir."""
+        abonnes = self._abonnes.get(type(evenement), ())
+        for abonnement in abonnes:
+            abonnement.deposer(evenement)
+        return len(abonnes)
+
+    async def close(self):
+        """Arrête toutes les tâches des abonnés."""
+        for abonnes in self._abonnes.values():
+            for abonnement in abonnes:
+                if abonnement.tache:
+                    abonnement.tache.cancel()
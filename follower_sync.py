@@ -0,0 +1,263 @@
+"""
+Copie locale des followers et abonnés de la chaîne (pour !mytime, rangs, fidélité)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Une tâche de fond parcourt les pages Helix (Get Channel Followers, et Get
+Broadcaster Subscriptions si le token a le scope) et range le résultat dans
+une table SQLite indexée par ID Twitch (data/community.db). Les lectures
+(!mytime, rang de follow...) sont locales : aucun appel API par commande.
+
+Synchronisation incrémentale : les followers arrivent du plus récent au plus
+ancien, on s'arrête dès qu'on retrouve un follower déjà connu. Un passage
+complet (moins fréquent) retire ceux qui ne suivent plus la chaîne.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from config import (
+    TWITCH_CHANNEL, TWITCH_CLIENT_ID, COMMUNITY_DB_FILE, FOLLOWERS_SYNC_S,
+    FOLLOWERS_FULL_SYNC_S
+)
+
+HELIX_URL = "https://api.twitch.tv/helix"
+SCOPE_ABONNES = "channel:read:subscriptions"
+
+
+def _timestamp(date_iso: str | None) -> float | None:
+    """'2024-05-01T12:34:56Z' -> timestamp."""
+    if not date_iso:
+        return None
+    return datetime.fromisoformat(date_iso.replace("Z", "+00:00")).timestamp()
+
+
+class BaseCommunaute:
+    """Followers / abonnés (appelée depuis un thread : ne bloque pas la boucle)."""
+
+    def __init__(self, chemin: str = COMMUNITY_DB_FILE):
+        self.chemin = chemin
+        self._conn = None
+        self._verrou = threading.Lock()
+
+    def ouvrir(self):
+        os.makedirs(os.path.dirname(self.chemin) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.chemin, check_same_thread=False)
+        with self._verrou, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS followers (
+                    user_id TEXT PRIMARY KEY,
+                    login TEXT NOT NULL,
+                    followed_at REAL NOT NULL,
+                    vu_le REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_followers_date ON followers(followed_at);
+                CREATE TABLE IF NOT EXISTS abonnes (
+                    user_id TEXT PRIMARY KEY,
+                    login TEXT NOT NULL,
+                    tier TEXT NOT NULL,
+                    cadeau INTEGER NOT NULL,
+                    vu_le REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS synchro (
+                    nom TEXT PRIMARY KEY,
+                    date REAL NOT NULL
+                );
+            """)
+
+    def fermer(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ─────────────────────────── ÉCRITURE ───────────────────────────
+
+    def enregistrer_followers(self, lignes: list[tuple], vu_le: float) -> int:
+        """Ajoute / met à jour une page [(user_id, login, followed_at)]. Retourne le nombre de nouveaux."""
+        with self._verrou, self._conn:
+            avant = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO followers VALUES (?, ?, ?, ?)",
+                [(uid, login, date, vu_le) for uid, login, date in lignes]
+            )
+            nouveaux = self._conn.total_changes - avant
+            self._conn.executemany(
+                "UPDATE followers SET login = ?, followed_at = ?, vu_le = ? WHERE user_id = ?",
+                [(login, date, vu_le, uid) for uid, login, date in lignes]
+            )
+        return nouveaux
+
+    def enregistrer_abonnes(self, lignes: list[tuple], vu_le: float):
+        """[(user_id, login, tier, cadeau)]"""
+        with self._verrou, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO abonnes VALUES (?, ?, ?, ?, ?)",
+                [(uid, login, tier, int(cadeau), vu_le) for uid, login, tier, cadeau in lignes]
+            )
+
+    def purger(self, table: str, avant: float) -> int:
+        """Retire les lignes absentes du dernier passage complet."""
+        if table not in ("followers", "abonnes"):
+            raise ValueError(table)
+        with self._verrou, self._conn:
+            return self._conn.execute(f"DELETE FROM {table} WHERE vu_le < ?", (avant,)).rowcount
+
+    def noter_synchro(self, nom: str, date: float):
+        with self._verrou, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO synchro VALUES (?, ?)", (nom, date))
+
+    # ─────────────────────────── LECTURE ───────────────────────────
+
+    def derniere_synchro(self, nom: str) -> float | None:
+        with self._verrou:
+            ligne = self._conn.execute("SELECT date FROM synchro WHERE nom = ?", (nom,)).fetchone()
+        return ligne[0] if ligne else None
+
+    def follow(self, user_id: str) -> dict | None:
+        """{'followed_at', 'rang'} (rang 1 = plus ancien follower), None si pas follower."""
+        with self._verrou:
+            ligne = self._conn.execute(
+                "SELECT followed_at FROM followers WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if ligne is None:
+                return None
+            # Compte sur l'index de date
+            rang = self._conn.execute(
+                "SELECT COUNT(*) FROM followers WHERE followed_at < ?", (ligne[0],)
+            ).fetchone()[0] + 1
+        return {"followed_at": ligne[0], "rang": rang}
+
+    def abonnement(self, user_id: str) -> dict | None:
+        with self._verrou:
+            ligne = self._conn.execute(
+                "SELECT tier, cadeau FROM abonnes WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return {"tier": ligne[0], "cadeau": bool(ligne[1])} if ligne else None
+
+    def tiers_abonnes(self) -> dict:
+        with self._verrou:
+            return dict(self._conn.execute("SELECT user_id, tier FROM abonnes").fetchall())
+
+    def totaux(self) -> dict:
+        with self._verrou:
+            followers = self._conn.execute("SELECT COUNT(*) FROM followers").fetchone()[0]
+            abonnes = self._conn.execute("SELECT COUNT(*) FROM abonnes").fetchone()[0]
+        return {"followers": followers, "abonnes": abonnes}
+
+
+class SyncCommunaute:
+    """Tâche de fond : followers (incrémental + complet) et abonnés."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.base = BaseCommunaute()
+        self.prete = False  # Au moins une synchro des followers réussie
+        self.abonnes = {}  # {user_id: tier} (en mémoire : lu à chaque tick de points)
+        self._broadcaster_id = None
+        self._tache = None
+
+    async def start(self):
+        if self._tache is None:
+            await asyncio.to_thread(self.base.ouvrir)
+            self.prete = await asyncio.to_thread(self.base.derniere_synchro, "followers") is not None
+            self.abonnes = await asyncio.to_thread(self.base.tiers_abonnes)
+            self._tache = asyncio.create_task(self._boucle())
+
+    async def stop(self):
+        if self._tache:
+            self._tache.cancel()
+            try:
+                await self._tache
+            except asyncio.CancelledError:
+                pass
+            self._tache = None
+            self.base.fermer()
+
+    # ─────────────────────────── LECTURE ───────────────────────────
+
+    async def follow(self, user_id: str) -> dict | None:
+        return await asyncio.to_thread(self.base.follow, str(user_id))
+
+    async def abonnement(self, user_id: str) -> dict | None:
+        return await asyncio.to_thread(self.base.abonnement, str(user_id))
+
+    # ─────────────────────────── HELIX ───────────────────────────
+
+    async def _headers(self) -> dict:
+        token = await self.bot.token_manager.get_token()
+        return {"Authorization": f"Bearer {token}", "Client-Id": TWITCH_CLIENT_ID or ""}
+
+    async def _broadcaster(self) -> str:
+        if self._broadcaster_id is None:
+            users = await self.bot.fetch_users(names=[TWITCH_CHANNEL])
+            if not users:
+                raise RuntimeError("diffuseur introuvable")
+            self._broadcaster_id = str(users[0].id)
+        return self._broadcaster_id
+
+    async def _pages(self, chemin: str):
+        """Pages Helix successives (liste `data` de chaque page)."""
+        params = {"broadcaster_id": await self._broadcaster(), "first": 100}
+        while True:
+            resp = await self.bot.http_client.request(
+                "GET", HELIX_URL + chemin, params=params, headers=await self._headers()
+            )
+            if not resp.ok or not isinstance(resp.data, dict):
+                raise RuntimeError(f"Helix {chemin} {resp.status}: {resp.data}")
+            yield resp.data.get("data", [])
+            curseur = resp.data.get("pagination", {}).get("cursor")
+            if not curseur:
+                return
+            params["after"] = curseur
+
+    # ─────────────────────────── SYNCHRO ───────────────────────────
+
+    async def _boucle(self):
+        while True:
+            try:
+                maintenant = time.time()
+                dernier_complet = await asyncio.to_thread(self.base.derniere_synchro, "followers_complet")
+                complet = dernier_complet is None or maintenant - dernier_complet >= FOLLOWERS_FULL_SYNC_S
+                await self.synchroniser_followers(complet)
+                if SCOPE_ABONNES in self.bot.token_manager.scopes:
+                    await self.synchroniser_abonnes()
+            except Exception as e:
+                print(f"[COMMU] Erreur synchro: {e}")
+            await asyncio.sleep(FOLLOWERS_SYNC_S)
+
+    async def synchroniser_followers(self, complet: bool = False):
+        """Incrémental : s'arrête à la première page sans nouveau follower. Complet : tout + purge."""
+        debut = time.time()
+        total = nouveaux = 0
+        async for page in self._pages("/channels/followers"):
+            lignes = [(f["user_id"], f["user_login"], _timestamp(f["followed_at"])) for f in page]
+            n = await asyncio.to_thread(self.base.enregistrer_followers, lignes, debut)
+            total += len(lignes)
+            nouveaux += n
+            if not complet and n < len(lignes):
+                break  # On a rejoint les followers déjà connus
+        partis = 0
+        if complet:
+            partis = await asyncio.to_thread(self.base.purger, "followers", debut)
+            await asyncio.to_thread(self.base.noter_synchro, "followers_complet", debut)
+        await asyncio.to_thread(self.base.noter_synchro, "followers", debut)
+        self.prete = True
+        if nouveaux or partis or complet:
+            print(f"[COMMU] Followers {'(complet) ' if complet else ''}: {total} lus, "
+                  f"+{nouveaux} / -{partis} en {time.time() - debut:.1f}s")
+
+    async def synchroniser_abonnes(self):
+        """Liste complète (rarement longue) puis purge des abonnements terminés."""
+        debut = time.time()
+        total = 0
+        async for page in self._pages("/subscriptions"):
+            lignes = [(s["user_id"], s["user_login"], s.get("tier", "1000"), s.get("is_gift", False))
+                      for s in page if s.get("user_id") != self._broadcaster_id]
+            await asyncio.to_thread(self.base.enregistrer_abonnes, lignes, debut)
+            total += len(lignes)
+        await asyncio.to_thread(self.base.purger, "abonnes", debut)
+        await asyncio.to_thread(self.base.noter_synchro, "abonnes", debut)
+        self.abonnes = await asyncio.to_thread(self.base.tiers_abonnes)
@@ -22,14 +22,22 @@ class GeneralCommands(commands.Cog):
     async def uptime(self, ctx: commands.Context):
         """Affiche depuis combien de temps le stream est lancé."""
         try:
-            streams = await self.bot.fetch_streams(user_logins=[TWITCH_CHANNEL])
-            if not streams:
-                await ctx.send("❌ Le stream est hors ligne !")
-                return
-
-            stream = streams[0]
-            # Twitch renvoie started_at en UTC
-            uptime = datetime.datetime.now(datetime.timezone.utc) - stream.started_at
+            sessions = self.bot.sessions
+            if sessions.verifie:
+                # Historique des streams, tenu à jour par l'announcer : pas d'appel Helix
+                secondes = sessions.uptime()
+                if secondes is None:
+                    await ctx.send("❌ Le stream est hors ligne !")
+                    return
+                uptime = datetime.timedelta(seconds=secondes)
+            else:
+                # Juste après le démarrage, avant le premier poll de l'announcer
+                streams = await self.bot.fetch_streams(user_logins=[TWITCH_CHANNEL])
+                if not streams:
+                    await ctx.send("❌ Le stream est hors ligne !")
+                    return
+                # Twitch renvoie started_at en UTC
+                uptime = datetime.datetime.now(datetime.timezone.utc) - streams[0].started_at
             
             heures = uptime.seconds // 3600
             minutes = (uptime.seconds % 3600) // 60
@@ -87,11 +95,8 @@ class GeneralCommands(commands.Cog):
             cmd_list.append(f"!{cmd.name}")
 
         # 2. Commandes personnalisées (Custom commands)
-        # On accède au manager via le bot (qui a été attaché dans bot.py -> self.dashboard.cmd_manager)
-        if hasattr(self.bot, 'dashboard') and self.bot.dashboard:
-            custom_cmds = self.bot.dashboard.cmd_manager.get_all()
-            for c in custom_cmds:
-                cmd_list.append(f"!{c['name']}")
+        # Registre partagé avec le bot Discord (clés déjà préfixées par "!")
+        cmd_list.extend(self.bot.cmd_manager.get_all())
 
         # Tri et affichage
         cmd_list.sort()
@@ -120,7 +125,7 @@ class GeneralCommands(commands.Cog):
             # On utilise le token du bot (qui doit être broadcaster ou modérateur avec token éditeur)
             # En V2 c'est un peu touchy, il faut modify_channel sur le broadcaster
             broadcaster = (await self.bot.fetch_users(names=[TWITCH_CHANNEL]))[0]
-            await self.bot.modify_channel(broadcaster.id, title=new_title, token=self.bot._http.token)
+            await self.bot.modify_channel(broadcaster.id, title=new_title, token=await self.bot.token_manager.get_token())
             await ctx.send(f"✅ Titre mis à jour : **{new_title}**")
         except Exception as e:
             await ctx.send(f"❌ Erreur modif titre : {e}")
@@ -146,7 +151,7 @@ class GeneralCommands(commands.Cog):
             real_name = games[0].name
             
             broadcaster = (await self.bot.fetch_users(names=[TWITCH_CHANNEL]))[0]
-            await self.bot.modify_channel(broadcaster.id, game_id=game_id, token=self.bot._http.token)
+            await self.bot.modify_channel(broadcaster.id, game_id=game_id, token=await self.bot.token_manager.get_token())
             await ctx.send(f"✅ Catégorie mise à jour : **{real_name}**")
         except Exception as e:
             await ctx.send(f"❌ Erreur modif jeu : {e}")
@@ -0,0 +1,182 @@
+"""
+Client HTTP partagé (Twitch Helix, webhooks Discord, OAuth...)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Une seule session aiohttp pour tout le process :
+  - pool de connexions keep-alive (pas de handshake TLS à chaque webhook)
+  - limite de connexions par hôte, cache DNS
+  - timeouts par défaut cohérents
+  - réessais (429 / 5xx / erreurs réseau) via `request()`
+  - métriques par hôte (nb requêtes, erreurs, latence)
+Créé une fois dans run.py et injecté dans les deux bots.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+import aiohttp
+from config import (
+    HTTP_POOL_LIMIT, HTTP_POOL_PER_HOST, HTTP_DNS_TTL_S, HTTP_KEEPALIVE_S,
+    HTTP_TIMEOUT_S, HTTP_CONNECT_TIMEOUT_S, HTTP_RETRIES, HTTP_METRICS_LOG_S
+)
+
+METHODES_IDEMPOTENTES = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+@dataclass
+class Reponse:
+    """Réponse déjà lue (la connexion est rendue au pool)."""
+    status: int
+    headers: dict
+    data: object  # JSON décodé si possible, sinon texte
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class StatsHote:
+    """Compteurs d'un hôte."""
+    __slots__ = ("requetes", "erreurs", "latence_totale", "latence_max")
+
+    def __init__(self):
+        self.requetes = 0
+        self.erreurs = 0
+        self.latence_totale = 0.0
+        self.latence_max = 0.0
+
+    def en_dict(self) -> dict:
+        moyenne = self.latence_totale / self.requetes if self.requetes else 0.0
+        return {
+            "requetes": self.requetes,
+            "erreurs": self.erreurs,
+            "latence_moy_ms": round(moyenne * 1000, 1),
+            "latence_max_ms": round(self.latence_max * 1000, 1),
+        }
+
+
+class HttpClient:
+    """Session HTTP partagée avec pool, réessais et métriques."""
+
+    def __init__(self):
+        self.session: aiohttp.ClientSession | None = None
+        self.stats = defaultdict(StatsHote)
+        self._tache_metriques = None
+
+    async def start(self):
+        """Crée la session (doit être appelé dans la boucle asyncio)."""
+        if self.session is not None:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_TTL_S,
+            keepalive_timeout=HTTP_KEEPALIVE_S,
+        )
+        timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT_S, connect=HTTP_CONNECT_TIMEOUT_S)
+        self.session = aiohttp.ClientSession(
+            connector=connector, timeout=timeout, trace_configs=[self._trace_config()]
+        )
+        if HTTP_METRICS_LOG_S and self._tache_metriques is None:
+            self._tache_metriques = asyncio.create_task(self._boucle_metriques())
+
+    async def close(self):
+        if self._tache_metriques:
+            self._tache_metriques.cancel()
+            self._tache_metriques = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    # ─────────────────────────── MÉTRIQUES ───────────────────────────
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Mesure toutes les requêtes de la session, y compris celles faites sans `request()`."""
+        trace = aiohttp.TraceConfig()
+
+        async def debut(session, ctx, params):
+            ctx.debut = time.perf_counter()
+
+        async def fin(session, ctx, params):
+            stats = self.stats[params.url.host]
+            duree = time.perf_counter() - ctx.debut
+            stats.requetes += 1
+            stats.latence_totale += duree
+            stats.latence_max = max(stats.latence_max, duree)
+            if params.response.status >= 500 or params.response.status == 429:
+                stats.erreurs += 1
+
+        async def exception(session, ctx, params):
+            stats = self.stats[params.url.host]
+            stats.requetes += 1
+            stats.erreurs += 1
+
+        trace.on_request_start.append(debut)
+        trace.on_request_end.append(fin)
+        trace.on_request_exception.append(exception)
+        return trace
+
+    def metriques(self) -> dict:
+        """Métriques par hôte."""
+        return {hote: stats.en_dict() for hote, stats in self.stats.items()}
+
+    async def _boucle_metriques(self):
+        while True:
+            await asyncio.sleep(HTTP_METRICS_LOG_S)
+            for hote, m in self.metriques().items():
+                print(f"[HTTP] {hote}: {m['requetes']} req, {m['erreurs']} err, "
+                      f"{m['latence_moy_ms']}ms moy, {m['latence_max_ms']}ms max")
+
+    # ─────────────────────────── REQUÊTES ───────────────────────────
+
+    async def request(self, methode: str, url: str, *, retries: int | None = None,
+                      idempotent: bool | None = None, **kwargs) -> Reponse:
+        """
+        Requête avec réessais. Les 429 sont toujours réessayés (après Retry-After) ;
+        les 5xx et erreurs réseau seulement si la requête est idempotente
+        (pour ne pas poster deux fois le même message Discord).
+        Lève aiohttp.ClientError si tous les essais échouent sur une erreur réseau.
+        """
+        if self.session is None:
+            await self.start()
+        retries = HTTP_RETRIES if retries is None else retries
+        if idempotent is None:
+            idempotent = methode.upper() in METHODES_IDEMPOTENTES
+
+        for essai in range(retries + 1):
+            dernier = essai == retries
+            try:
+                async with self.session.request(methode, url, **kwargs) as resp:
+                    if resp.content_type == "application/json":
+                        data = await resp.json()
+                    else:
+                        data = await resp.text()
+                    reponse = Reponse(resp.status, dict(resp.headers), data)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if dernier or not idempotent:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** essai)
+                continue
+
+            if dernier:
+                return reponse
+            if reponse.status == 429:
+                await asyncio.sleep(self._delai_429(reponse))
+            elif reponse.status >= 500 and idempotent:
+                await asyncio.sleep(0.5 * 2 ** essai)
+            else:
+                return reponse
+        return reponse
+
+    @staticmethod
+    def _delai_429(reponse: Reponse) -> float:
+        """Délai avant réessai : Retry-After (Discord) ou Ratelimit-Reset (Twitch)."""
+        try:
+            if "Retry-After" in reponse.headers:
+                return min(float(reponse.headers["Retry-After"]), 30)
+            if "Ratelimit-Reset" in reponse.headers:
+                return min(max(0.5, float(reponse.headers["Ratelimit-Reset"]) - time.time()), 30)
+        except ValueError:
+            pass
+        return 1.0
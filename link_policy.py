@@ -0,0 +1,142 @@
+"""
+Politique des liens : listes autorisées / interdites par domaine et chemin
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Chaque lien est découpé une seule fois en (hôte, chemin), puis l'hôte est
+cherché dans un arbre de domaines indexé par labels inversés
+(tv -> twitch -> ...) : le coût dépend de la longueur du lien, pas du nombre
+d'entrées. Une entrée couvre aussi les sous-domaines ("youtube.com" autorise
+"m.youtube.com") et peut être limitée à un préfixe de chemin
+("twitch.tv/lacabanevirtuelle"). La règle la plus précise gagne ; à précision
+égale, l'interdiction l'emporte.
+"""
+
+import os
+from config import LINK_REGEX, SCAM_HOST_KEYWORDS
+from text_normalizer import compacter
+
+
+def extraire_liens(texte: str) -> list[str]:
+    """Tous les liens du message (une seule passe de LINK_REGEX)."""
+    return LINK_REGEX.findall(texte)
+
+
+def hotes_caches(texte: str, liens: list[str]) -> list[str]:
+    """Hôtes de liens déguisés ("streamboo .com", "stream boo(.)com"), hors liens déjà extraits.
+
+    Cherchés sur la forme compacte du message : l'hôte peut donc contenir les mots
+    qui le précèdent ("regardestreamboo.com"), il sert uniquement aux mots-clés d'hôte
+    et à la liste des domaines interdits.
+    """
+    compact = compacter(texte)
+    if "." not in compact:
+        return []
+    visibles = [compacter(analyser(lien)[0]) for lien in liens]
+    caches = []
+    for lien in LINK_REGEX.findall(compact):
+        hote = analyser(lien)[0]
+        if hote and not any(v and hote.endswith(v) for v in visibles):
+            caches.append(hote)
+    return caches
+
+
+def hote_suspect(liens: list[str], caches: list[str]) -> str | None:
+    """Premier hôte (lien extrait ou déguisé) contenant un mot-clé de scam (SCAM_HOST_KEYWORDS)."""
+    for hote in [analyser(lien)[0] for lien in liens] + caches:
+        for mot in SCAM_HOST_KEYWORDS:
+            if mot in hote:
+                return hote
+    return None
+
+
+def analyser(lien: str) -> tuple[str, str]:
+    """'https://www.Twitch.tv/foo?x=1' -> ('www.twitch.tv', '/foo')."""
+    lien = lien.lower()
+    debut = lien.find("://")
+    if debut != -1:
+        lien = lien[debut + 3:]
+    fin = len(lien)
+    for sep in "/?#":
+        i = lien.find(sep)
+        if i != -1 and i < fin:
+            fin = i
+    hote, reste = lien[:fin], lien[fin:]
+    hote = hote.rpartition("@")[2].partition(":")[0].strip(".")
+    chemin = reste.split("?", 1)[0].split("#", 1)[0] or "/"
+    return hote, chemin
+
+
+def _prefixe_correspond(prefixe: str, chemin: str) -> bool:
+    """Préfixe par segments : '/abc' couvre '/abc' et '/abc/x', pas '/abcd'."""
+    if prefixe == "/":
+        return True
+    return chemin == prefixe or chemin.startswith(prefixe + "/")
+
+
+class _Noeud:
+    __slots__ = ("enfants", "regles")
+
+    def __init__(self):
+        self.enfants = {}
+        self.regles = []  # [(préfixe de chemin, autorisé)]
+
+
+class PolitiqueLiens:
+    """Arbre de domaines (labels inversés) avec règles autoriser / interdire."""
+
+    def __init__(self, autorises=(), interdits=()):
+        self._racine = _Noeud()
+        self.taille = 0
+        for entree in autorises:
+            self.ajouter(entree, True)
+        for entree in interdits:
+            self.ajouter(entree, False)
+
+    def ajouter(self, entree: str, autorise: bool):
+        """Entrée 'domaine.tld' ou 'domaine.tld/chemin'."""
+        hote, chemin = analyser(entree.strip())
+        if not hote:
+            return
+        noeud = self._racine
+        for label in reversed(hote.split(".")):
+            noeud = noeud.enfants.setdefault(label, _Noeud())
+        noeud.regles.append((chemin.rstrip("/") or "/", autorise))
+        self.taille += 1
+
+    def verdict(self, lien: str) -> bool | None:
+        """True = autorisé, False = interdit, None = aucune règle."""
+        hote, chemin = analyser(lien)
+        noeud = self._racine
+        meilleure = None  # (profondeur, longueur du préfixe, interdit)
+        for profondeur, label in enumerate(reversed(hote.split("."))):
+            noeud = noeud.enfants.get(label)
+            if noeud is None:
+                break
+            for prefixe, autorise in noeud.regles:
+                if _prefixe_correspond(prefixe, chemin):
+                    cle = (profondeur, len(prefixe), not autorise)
+                    if meilleure is None or cle > meilleure:
+                        meilleure = cle
+        if meilleure is None:
+            return None
+        return not meilleure[2]
+
+    def tous_autorises(self, liens: list[str]) -> bool:
+        """Vrai si chaque lien est explicitement autorisé."""
+        return all(self.verdict(lien) is True for lien in liens)
+
+    def un_interdit(self, liens: list[str]) -> bool:
+        """Vrai si au moins un lien est explicitement interdit."""
+        return any(self.verdict(lien) is False for lien in liens)
+
+
+def lire_liste(chemin: str | None) -> list[str]:
+    """Fichier de liste optionnel (une entrée par ligne, # = commentaire) ; [] s'il est absent."""
+    if not chemin or not os.path.exists(chemin):
+        return []
+    try:
+        with open(chemin, "r", encoding="utf-8") as f:
+            return [ligne.strip() for ligne in f if ligne.strip() and not ligne.lstrip().startswith("#")]
+    except Exception as e:
+        print(f"[LIENS] Erreur lecture {chemin}: {e}")
+        return []
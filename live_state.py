@@ -0,0 +1,73 @@
+"""
+État du live partagé (en ligne / hors ligne), alimenté par l'announcer
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+L'announcer interroge déjà Helix à chaque POLL_INTERVAL_S : il transmet le
+résultat ici, et chaque changement est publié sur le bus (ChangementLive).
+Les tâches périodiques qui n'ont de sens que pendant le live (présence des
+viewers, messages automatiques...) s'arrêtent hors ligne au lieu de tourner
+pour rien, et reprennent dès que le stream démarre.
+"""
+
+import asyncio
+import time
+from event_bus import ChangementLive
+
+
+class EtatLive:
+    """En ligne / hors ligne (None tant que l'announcer n'a pas encore vérifié)."""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.en_live = None
+        self.depuis = time.time()
+        self._live = asyncio.Event()
+        self._abonnements = []
+
+    def mettre_a_jour(self, en_live: bool):
+        """Résultat d'un poll de l'announcer (publié seulement s'il change)."""
+        if en_live == self.en_live:
+            return
+        self.en_live = en_live
+        self.depuis = time.time()
+        if en_live:
+            self._live.set()
+        else:
+            self._live.clear()
+        print(f"[LIVE] État : {'en ligne' if en_live else 'hors ligne'}")
+        self.bus.publish(ChangementLive(en_live, self.depuis))
+
+    async def attendre_live(self):
+        """Retourne immédiatement si le stream est en ligne, sinon attend qu'il le soit."""
+        await self._live.wait()
+
+    def piloter_routine(self, routine, reinitialiser=None):
+        """Routine TwitchIO lancée pendant le live et arrêtée hors ligne.
+
+        `reinitialiser` (optionnel) est appelé à chaque changement d'état, une fois la
+        routine annulée : l'état propre à un live ne déborde pas sur le suivant.
+        """
+        async def changement(evenement: ChangementLive):
+            self._appliquer(routine, evenement.en_live)
+            if reinitialiser is not None:
+                reinitialiser()
+
+        self._abonnements.append(self.bus.subscribe(ChangementLive, changement))
+        if self.en_live:
+            self._appliquer(routine, True)
+
+    @staticmethod
+    def _appliquer(routine, en_live: bool):
+        try:
+            if en_live:
+                routine.start()
+            else:
+                # cancel() plutôt que stop() : stop() n'agit qu'après la prochaine itération
+                routine.cancel()
+        except RuntimeError:
+            pass  # Déjà lancée
+
+    def fermer(self):
+        for abonnement in self._abonnements:
+            self.bus.unsubscribe(abonnement)
+        self._abonnements.clear()
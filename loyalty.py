@@ -0,0 +1,258 @@
+"""
+Points de fidélité : gain pendant le live, dépenses, journal des transactions
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Chaque tick de présence (ViewerStats, live uniquement) crédite tous les
+viewers présents en une seule transaction SQLite (UPSERT groupé) : quelques
+millisecondes pour des milliers de viewers, sans réécrire de fichier. Le temps
+de visionnage (!mytime, !ScoreTime) est compté dans la même transaction.
+Multiplicateurs : abonnés (par tier, voir follower_sync) et viewers qui ont
+parlé récemment (voir chat_analytics).
+
+Les dépenses sont atomiques (UPDATE ... WHERE points >= coût) : deux
+commandes simultanées ne peuvent pas dépenser deux fois le même solde, y
+compris entre le bot et le dashboard (base partagée en mode WAL).
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import (
+    LOYALTY_DB_FILE, LOYALTY_ANCIEN_TEMPS_FILE, LOYALTY_POINTS_PAR_TICK, LOYALTY_MULT_ABONNE,
+    LOYALTY_MULT_CHAT, LOYALTY_CHAT_MINUTES
+)
+
+
+class BaseFidelite:
+    """Soldes + journal (appelée depuis un thread : ne bloque pas la boucle)."""
+
+    def __init__(self, chemin: str = LOYALTY_DB_FILE):
+        self.chemin = chemin
+        self._conn = None
+        self._verrou = threading.Lock()
+
+    def ouvrir(self):
+        os.makedirs(os.path.dirname(self.chemin) or ".", exist_ok=True)
+        # timeout : attend le verrou si le dashboard écrit en même temps
+        self._conn = sqlite3.connect(self.chemin, check_same_thread=False, timeout=5)
+        with self._verrou, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS soldes (
+                    user_id TEXT PRIMARY KEY,
+                    login TEXT NOT NULL,
+                    points INTEGER NOT NULL DEFAULT 0,
+                    cumul INTEGER NOT NULL DEFAULT 0,
+                    maj REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_soldes_points ON soldes(points DESC);
+                CREATE TABLE IF NOT EXISTS transactions (
+                    id INTEGER PRIMARY KEY,
+                    date REAL NOT NULL,
+                    user_id TEXT NOT NULL,
+                    delta INTEGER NOT NULL,
+                    motif TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id, date);
+                CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);
+                -- Un enregistrement par tick de présence (pas une ligne par viewer)
+                CREATE TABLE IF NOT EXISTS credits (
+                    date REAL NOT NULL,
+                    viewers INTEGER NOT NULL,
+                    points INTEGER NOT NULL
+                );
+                -- Temps de visionnage (anciennement data/viewers.json)
+                CREATE TABLE IF NOT EXISTS visionnage (
+                    user_id TEXT PRIMARY KEY,
+                    login TEXT NOT NULL,
+                    minutes INTEGER NOT NULL DEFAULT 0,
+                    premiere REAL NOT NULL,
+                    derniere REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_visionnage_minutes ON visionnage(minutes DESC);
+            """)
+
+    def fermer(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ─────────────────────────── ÉCRITURE ───────────────────────────
+
+    def crediter_lot(self, lignes: list[tuple], minutes: int = 1) -> int:
+        """Crédite [(user_id, login, points)] et `minutes` de visionnage en une transaction. Retourne le total crédité."""
+        maintenant = time.time()
+        total = sum(points for _, _, points in lignes)
+        with self._verrou, self._conn:
+            self._conn.executemany("""
+                INSERT INTO soldes (user_id, login, points, cumul, maj) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    points = points + excluded.points,
+                    cumul = cumul + excluded.points,
+                    login = excluded.login,
+                    maj = excluded.maj
+            """, [(uid, login, points, points, maintenant) for uid, login, points in lignes])
+            self._conn.executemany("""
+                INSERT INTO visionnage (user_id, login, minutes, premiere, derniere) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    minutes = minutes + excluded.minutes,
+                    login = excluded.login,
+                    derniere = excluded.derniere
+            """, [(uid, login, minutes, maintenant, maintenant) for uid, login, _ in lignes])
+            self._conn.execute("INSERT INTO credits VALUES (?, ?, ?)", (maintenant, len(lignes), total))
+        return total
+
+    def reprendre_ancien_temps(self, chemin: str = LOYALTY_ANCIEN_TEMPS_FILE) -> int:
+        """Reprise unique de l'ancien fichier JSON ({user_id: {...}}), renommé ensuite en .importe."""
+        if not os.path.exists(chemin):
+            return 0
+        with open(chemin, "r", encoding="utf-8") as f:
+            stats = json.load(f)
+        with self._verrou, self._conn:
+            curseur = self._conn.executemany(
+                "INSERT OR IGNORE INTO visionnage VALUES (?, ?, ?, ?, ?)",
+                [(uid, v.get("username", "Inconnu"), v.get("total_minutes", 0),
+                  v.get("first_seen", 0.0), v.get("last_seen", 0.0)) for uid, v in stats.items()]
+            )
+        os.replace(chemin, chemin + ".importe")
+        return curseur.rowcount
+
+    def depenser(self, user_id: str, montant: int, motif: str) -> int | None:
+        """Retire `montant` si le solde suffit. Retourne le nouveau solde, None si insuffisant."""
+        if montant <= 0:
+            raise ValueError("montant invalide")
+        with self._verrou, self._conn:
+            curseur = self._conn.execute(
+                "UPDATE soldes SET points = points - ?, maj = ? WHERE user_id = ? AND points >= ?",
+                (montant, time.time(), user_id, montant)
+            )
+            if curseur.rowcount == 0:
+                return None
+            self._conn.execute("INSERT INTO transactions (date, user_id, delta, motif) VALUES (?, ?, ?, ?)",
+                               (time.time(), user_id, -montant, motif))
+            return self._conn.execute("SELECT points FROM soldes WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def ajuster(self, user_id: str, login: str, delta: int, motif: str) -> int:
+        """Ajout / retrait manuel (modérateurs, dashboard). Le solde ne descend pas sous 0."""
+        maintenant = time.time()
+        with self._verrou, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO soldes VALUES (?, ?, 0, 0, ?)", (user_id, login, maintenant))
+            self._conn.execute(
+                "UPDATE soldes SET points = MAX(points + ?, 0), cumul = cumul + MAX(?, 0), maj = ? WHERE user_id = ?",
+                (delta, delta, maintenant, user_id)
+            )
+            self._conn.execute("INSERT INTO transactions (date, user_id, delta, motif) VALUES (?, ?, ?, ?)",
+                               (maintenant, user_id, delta, motif))
+            return self._conn.execute("SELECT points FROM soldes WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    # ─────────────────────────── LECTURE ───────────────────────────
+
+    def solde(self, user_id: str) -> dict | None:
+        """{'points', 'cumul', 'rang'} (rang par points, 1 = premier)."""
+        with self._verrou:
+            ligne = self._conn.execute(
+                "SELECT points, cumul FROM soldes WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if ligne is None:
+                return None
+            rang = self._conn.execute(
+                "SELECT COUNT(*) FROM soldes WHERE points > ?", (ligne[0],)
+            ).fetchone()[0] + 1
+        return {"points": ligne[0], "cumul": ligne[1], "rang": rang}
+
+    def classement(self, n: int = 10) -> list[dict]:
+        with self._verrou:
+            lignes = self._conn.execute(
+                "SELECT user_id, login, points FROM soldes ORDER BY points DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [{"user_id": uid, "login": login, "points": points} for uid, login, points in lignes]
+
+    def minutes(self, user_id: str) -> int:
+        with self._verrou:
+            ligne = self._conn.execute("SELECT minutes FROM visionnage WHERE user_id = ?", (user_id,)).fetchone()
+        return ligne[0] if ligne else 0
+
+    def classement_temps(self, n: int = 10) -> list[dict]:
+        with self._verrou:
+            lignes = self._conn.execute(
+                "SELECT user_id, login, minutes FROM visionnage ORDER BY minutes DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [{"user_id": uid, "login": login, "minutes": minutes} for uid, login, minutes in lignes]
+
+    def transactions(self, n: int = 50, user_id: str | None = None) -> list[dict]:
+        requete = "SELECT date, user_id, delta, motif FROM transactions"
+        params = []
+        if user_id:
+            requete += " WHERE user_id = ?"
+            params.append(user_id)
+        requete += " ORDER BY date DESC LIMIT ?"
+        params.append(n)
+        with self._verrou:
+            lignes = self._conn.execute(requete, params).fetchall()
+        return [dict(zip(("date", "user_id", "delta", "motif"), ligne)) for ligne in lignes]
+
+
+class Fidelite:
+    """Moteur de points du bot (calcul des gains, accès asynchrone à la base)."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.base = BaseFidelite()
+        self._ouvert = False
+
+    async def start(self):
+        if not self._ouvert:
+            await asyncio.to_thread(self.base.ouvrir)
+            self._ouvert = True
+            try:
+                repris = await asyncio.to_thread(self.base.reprendre_ancien_temps)
+                if repris:
+                    print(f"[POINTS] Temps de visionnage repris de {LOYALTY_ANCIEN_TEMPS_FILE} ({repris} viewers)")
+            except Exception as e:
+                print(f"[POINTS] Erreur reprise {LOYALTY_ANCIEN_TEMPS_FILE}: {e}")
+
+    async def stop(self):
+        if self._ouvert:
+            self.base.fermer()
+            self._ouvert = False
+
+    def _points(self, user_id: str, abonnes: dict, actifs: set) -> int:
+        points = LOYALTY_POINTS_PAR_TICK
+        tier = abonnes.get(user_id)
+        if tier:
+            points *= LOYALTY_MULT_ABONNE.get(tier, 1)
+        if user_id in actifs:
+            points *= LOYALTY_MULT_CHAT
+        return int(points)
+
+    async def crediter_presence(self, presents: list[tuple[str, str]]):
+        """Tick de présence : [(user_id, login)] des viewers présents (live uniquement)."""
+        if not self._ouvert or not presents:
+            return
+        abonnes = self.bot.communaute.abonnes
+        actifs = self.bot.analytics.actifs(LOYALTY_CHAT_MINUTES)
+        lignes = [(uid, login, self._points(uid, abonnes, actifs)) for uid, login in presents]
+        debut = time.perf_counter()
+        total = await asyncio.to_thread(self.base.crediter_lot, lignes)
+        print(f"[POINTS] +{total} pour {len(lignes)} viewers en {(time.perf_counter() - debut) * 1000:.0f}ms")
+
+    async def solde(self, user_id: str) -> dict | None:
+        return await asyncio.to_thread(self.base.solde, str(user_id))
+
+    async def depenser(self, user_id: str, montant: int, motif: str) -> int | None:
+        return await asyncio.to_thread(self.base.depenser, str(user_id), montant, motif)
+
+    async def ajuster(self, user_id: str, login: str, delta: int, motif: str) -> int:
+        return await asyncio.to_thread(self.base.ajuster, str(user_id), login, delta, motif)
+
+    async def classement(self, n: int = 10) -> list[dict]:
+        return await asyncio.to_thread(self.base.classement, n)
+
+    async def minutes(self, user_id: str) -> int:
+        return await asyncio.to_thread(self.base.minutes, str(user_id))
+
+    async def classement_temps(self, n: int = 10) -> list[dict]:
+        return await asyncio.to_thread(self.base.classement_temps, n)
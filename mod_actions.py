@@ -0,0 +1,135 @@
+"""
+Actions de modération via l'API Helix (ban, timeout, suppression, réglages du chat)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Remplace les commandes IRC /ban, /timeout, /delete (dépréciées par Twitch et
+qui consomment le quota de messages du chat). Les appels partagent la session
+HTTP du bot (http_client.request : réessais 429 / 5xx et métriques par hôte)
+et sont limités en concurrence.
+Chaque méthode retourne False en cas d'échec : l'appelant peut alors
+retomber sur la commande IRC.
+"""
+
+import asyncio
+import aiohttp
+from config import (
+    TWITCH_CHANNEL, TWITCH_NICK, TWITCH_BOT_ID, TWITCH_CLIENT_ID,
+    MOD_API_CONCURRENCY, MOD_API_RETRIES, MOD_API_TIMEOUT_S
+)
+
+HELIX_URL = "https://api.twitch.tv/helix"
+
+
+class ModerationAPI:
+    """Client Helix pour les actions de modération."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._semaphore = asyncio.Semaphore(MOD_API_CONCURRENCY)
+        self._broadcaster_id = None
+        self._moderator_id = None
+        self._timeout = aiohttp.ClientTimeout(total=MOD_API_TIMEOUT_S)
+
+    # ─────────────────────────── INTERNE ───────────────────────────
+
+    async def _ids(self) -> tuple[str, str] | None:
+        """IDs du broadcaster et du modérateur (le bot), résolus une seule fois."""
+        if self._broadcaster_id and self._moderator_id:
+            return self._broadcaster_id, self._moderator_id
+        try:
+            noms = [TWITCH_CHANNEL] if TWITCH_BOT_ID else [TWITCH_CHANNEL, TWITCH_NICK]
+            users = {u.name.lower(): str(u.id) for u in await self.bot.fetch_users(names=noms)}
+            self._broadcaster_id = users.get(TWITCH_CHANNEL.lower())
+            self._moderator_id = str(TWITCH_BOT_ID) if TWITCH_BOT_ID else users.get(TWITCH_NICK.lower())
+        except Exception as e:
+            print(f"[MODAPI] Erreur résolution des IDs: {e}")
+            return None
+        if not (self._broadcaster_id and self._moderator_id):
+            return None
+        return self._broadcaster_id, self._moderator_id
+
+    async def _headers(self) -> dict:
+        token = await self.bot.token_manager.get_token()
+        return {"Authorization": f"Bearer {token}", "Client-Id": TWITCH_CLIENT_ID or ""}
+
+    async def _requete(self, methode: str, chemin: str, params: dict | None = None,
+                       json: dict | None = None) -> dict | None:
+        """
+        Appel Helix avec limite de concurrence, via le client HTTP partagé (réessais 429 / 5xx).
+        Retourne le JSON (ou {} si pas de contenu), None en cas d'échec.
+        """
+        client = getattr(self.bot, "http_client", None)
+        ids = await self._ids()
+        if client is None or not ids:
+            return None
+        broadcaster_id, moderator_id = ids
+        params = {"broadcaster_id": broadcaster_id, "moderator_id": moderator_id, **(params or {})}
+
+        async with self._semaphore:
+            for essai in range(2):
+                try:
+                    # Ban / timeout / suppression / réglages : rejouer un appel ne sanctionne pas deux fois
+                    resp = await client.request(methode, HELIX_URL + chemin, params=params, json=json,
+                                                headers=await self._headers(), timeout=self._timeout,
+                                                retries=MOD_API_RETRIES, idempotent=True)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"[MODAPI] {methode} {chemin} erreur réseau: {e}")
+                    return None
+                if resp.status == 204:
+                    return {}
+                if resp.ok:
+                    return resp.data if isinstance(resp.data, dict) else {}
+                if resp.status == 400 and "already banned" in str(resp.data):
+                    return {}
+                if resp.status == 401 and essai == 0:
+                    # Token expiré entre deux validations : refresh puis nouvel essai
+                    await self.bot.token_manager.rafraichir()
+                    continue
+                print(f"[MODAPI] {methode} {chemin} -> {resp.status}: {resp.data}")
+                return None
+        return None
+
+    # ─────────────────────────── ACTIONS ───────────────────────────
+
+    async def ban(self, user_id: str, raison: str) -> bool:
+        """Ban définitif."""
+        data = {"data": {"user_id": str(user_id), "reason": raison[:500]}}
+        return await self._requete("POST", "/moderation/bans", json=data) is not None
+
+    async def timeout(self, user_id: str, duree: int, raison: str) -> bool:
+        """Timeout de `duree` secondes."""
+        data = {"data": {"user_id": str(user_id), "duration": int(duree), "reason": raison[:500]}}
+        return await self._requete("POST", "/moderation/bans", json=data) is not None
+
+    async def supprimer_message(self, message_id: str) -> bool:
+        """Supprime un message du chat."""
+        return await self._requete("DELETE", "/moderation/chat", params={"message_id": message_id}) is not None
+
+    async def ban_masse(self, user_ids: list[str], raison: str) -> list[str]:
+        """Bannit plusieurs comptes en parallèle (limité par MOD_API_CONCURRENCY). Retourne les échecs."""
+        user_ids = list(dict.fromkeys(str(u) for u in user_ids))
+        resultats = await asyncio.gather(*(self.ban(u, raison) for u in user_ids))
+        return [u for u, ok in zip(user_ids, resultats) if not ok]
+
+    async def supprimer_masse(self, message_ids: list[str]) -> int:
+        """Supprime plusieurs messages en parallèle. Retourne le nombre de suppressions réussies."""
+        resultats = await asyncio.gather(*(self.supprimer_message(m) for m in dict.fromkeys(message_ids)))
+        return sum(resultats)
+
+    async def page_chatters(self, apres: str | None = None, premier: int = 1000) -> dict | None:
+        """Une page de Get Chatters ({'data', 'pagination', 'total'}), None en cas d'échec."""
+        params = {"first": premier}
+        if apres:
+            params["after"] = apres
+        return await self._requete("GET", "/chat/chatters", params=params)
+
+    async def lire_reglages_chat(self) -> dict | None:
+        """Réglages actuels du chat (follower-only, slow mode...)."""
+        reponse = await self._requete("GET", "/chat/settings")
+        if reponse and reponse.get("data"):
+            return reponse["data"][0]
+        return None
+
+    async def modifier_reglages_chat(self, **reglages) -> bool:
+        """Modifie les réglages du chat (ex: follower_mode=True, slow_mode_wait_time=5)."""
+        return await self._requete("PATCH", "/chat/settings", json=reglages) is not None
@@ -5,15 +5,16 @@ Copyright (c) 2024 Tosachii et LaCabaneVirtuelle
 
 import time
 import asyncio
-from datetime import datetime, timezone
-from collections import defaultdict, deque
 from config import (
-    DISCORD_WEBHOOK_URL, FLOOD_MAX_MSG, FLOOD_WINDOW_S,
-    LINK_REGEX, BANNED_WORDS_REGEX,
-    SAFE_MODE, SCAM_REGEX, ACCOUNT_AGE_THRESHOLD_DAYS, WARNING_LEVELS,
-    LINK_OBFUSCATION_REGEX
+    DISCORD_WEBHOOK_URL, SAFE_MODE, ACCOUNT_AGE_THRESHOLD_DAYS,
+    DUPLICATE_MIN_USERS, SHIELD_BAN_BATCH_S
 )
-from utils import is_link_whitelisted
+from blocklist import ListeNoire
+from rules import RuleStore, RuleSet, Faits, evaluer
+from shadow import EvaluateurOmbre
+from duplicate_detector import DuplicateDetector
+from user_state import RegistreViewers, EtatViewer
+from event_bus import LogModeration
 
 
 class Moderator:
@@ -21,12 +22,29 @@ class Moderator:
     
     def __init__(self, bot):
         self.bot = bot
-        # Historique des messages par user pour détecter le flood
-        self.historique_flood = defaultdict(lambda: deque())
-        # Compteur de warns par user (pour l'escalade)
-        self.compteur_warns = defaultdict(int)
-        # Cache de la date de création des comptes
-        self.cache_date_creation = {}
+        # État par viewer (flood, warns, date de création du compte), indexé par ID Twitch
+        self.viewers = RegistreViewers()
+        # Règles versionnées (mots, liens, escalade, flood), rechargées à chaud
+        self.regles = RuleStore()
+        # Règles candidates évaluées en parallèle, sans sanction
+        self.ombre = EvaluateurOmbre(self)
+        # Bots connus et domaines de scam (listes communautaires importées)
+        self.liste_noire = ListeNoire()
+        # Empreintes des messages récents (tous viewers confondus)
+        self.detecteur_doublons = DuplicateDetector()
+        # Bans en attente (regroupés par lots en mode bouclier)
+        self._file_bans = []
+        self._tache_bans = None
+        # Âges de compte à vérifier (mode bouclier) : {clé viewer: (message, auteur, état, version des règles)}
+        self._file_ages = {}
+        self._tache_ages = None
+
+    def exporter_etat(self) -> dict:
+        """État à sauvegarder (voir state_snapshot)."""
+        return {"viewers": self.viewers.exporter()}
+
+    def restaurer_etat(self, etat: dict):
+        self.viewers.restaurer(etat.get("viewers", {}))
 
     async def check_message(self, message) -> bool:
         """
@@ -39,92 +57,179 @@ class Moderator:
         # Ignore les modérateurs et le broadcaster
         if message.author and (message.author.is_mod or message.author.is_broadcaster):
             return False
-        
-        if await self._verifier_scam(message, auteur, contenu):
+
+        # Forme normalisée et liens calculés une seule fois pour toutes les vérifications
+        faits = Faits.depuis(contenu)
+        # Une seule recherche pour tout l'état du viewer
+        user_id = self._user_id(message)
+        etat = self.viewers.obtenir(user_id, auteur)
+        # Copie pour l'évaluation fantôme (simple dépôt dans une file)
+        self.ombre.soumettre(user_id or auteur.lower(), auteur, faits)
+        # Une seule version des règles pour tout le message (même si elle change pendant un await)
+        regles = self.regles.actif
+
+        if await self._verifier_liste_noire(message, auteur, faits.liens, regles):
             return True
 
-        # Anti-flood
-        if await self._verifier_flood(message, auteur, contenu):
-            await self._escalader_sanction(message, auteur, "Flood/Spam")
+        # Règles versionnées (scam, flood, liens, mots interdits) : même fonction que l'évaluation fantôme
+        maintenant = time.time()
+        historique = etat.flood
+        historique.append(maintenant)
+        # Seuls les flood_max_msg + 1 derniers messages comptent
+        while len(historique) > regles.flood_max_msg + 1:
+            historique.popleft()
+        verdict = evaluer(regles, faits, historique, maintenant, self.regles.mesurer)
+
+        if verdict and verdict[0] == "scam":
+            self._noter_verdict(auteur, "scam", verdict[1], regles)
+            await self._appliquer_ban(message, auteur, verdict[1])
             return True
-        
-        # Anti-liens
-        if await self._verifier_liens(message, auteur, contenu):
-            await self._escalader_sanction(message, auteur, "Lien interdit")
+
+        # Lien (ou lien caché) + Compte très récent
+        if faits.a_un_lien and await self._verifier_age(message, auteur, etat, regles):
             return True
-        
-        # Mots interdits
-        if await self._verifier_mots_bannis(message, auteur, contenu):
-            await self._escalader_sanction(message, auteur, "Langage interdit")
+
+        # Anti-copypasta (même message depuis plusieurs comptes)
+        if await self._verifier_doublons(message, auteur, faits.normalise):
+            await self._sanctionner(message, auteur, "doublons", "Copypasta / vague de bots", etat, regles)
             return True
-        
-        return False
 
-    async def _verifier_scam(self, message, auteur: str, contenu: str) -> bool:
-        """Détection heuristique de scam/bot."""
-        # Critère 1: Lien (ou lien caché) + Mot clé scam
-        a_un_lien = bool(LINK_REGEX.search(contenu))
-        a_un_lien_cache = bool(LINK_OBFUSCATION_REGEX.search(contenu))
-        a_mot_cle_scam = bool(SCAM_REGEX.search(contenu))
+        if verdict is None:
+            return False
+        regle, raison = verdict
+        if regle in ("liens", "mots_bannis"):
+            await self._supprimer_message(message)
+        await self._sanctionner(message, auteur, regle, raison, etat, regles)
+        return True
+
+    def _noter_verdict(self, auteur: str, regle: str, raison: str, regles: RuleSet):
+        self.regles.noter(auteur, regle, raison, regles.version)
+        print(f"[MOD] {regle} -> @{auteur} ({raison}) [règles v{regles.version}]")
+
+    async def _sanctionner(self, message, auteur: str, regle: str, raison: str, etat: EtatViewer, regles: RuleSet):
+        self._noter_verdict(auteur, regle, raison, regles)
+        await self._escalader_sanction(message, auteur, raison, etat, regles)
 
-        # Si mot clé "streamboo" ou "remove the space" -> on considère que c'est un lien caché implicite
-        if (a_un_lien or a_un_lien_cache) and a_mot_cle_scam:
-            await self._appliquer_ban(message, auteur, "SCAM DETECTED (Lien/Obfuscation + Mot clé)")
+    async def _verifier_liste_noire(self, message, auteur: str, liens: list[str], regles: RuleSet) -> bool:
+        """Auteur ou domaine présent dans une liste noire importée -> BAN DIRECT."""
+        debut = time.perf_counter_ns()
+        raison = None
+        source = self.liste_noire.bot_connu(auteur)
+        if source:
+            raison = f"BOT CONNU (liste {source})"
+        elif liens:
+            trouve = self.liste_noire.domaine_interdit(liens)
+            if trouve:
+                raison = f"SCAM DETECTED (Domaine {trouve[0]}, liste {trouve[1]})"
+        self.regles.mesurer("liste_noire", debut, raison is not None)
+        if raison is None:
+            return False
+        self._noter_verdict(auteur, "liste_noire", raison, regles)
+        await self._appliquer_ban(message, auteur, raison)
+        return True
+
+    async def _verifier_age(self, message, auteur: str, etat: EtatViewer, regles: RuleSet) -> bool:
+        """Lien posté par un compte très récent -> BAN DIRECT."""
+        recent = await self._est_compte_recent(etat, self._user_id(message))
+        if recent is None:
+            # Bouclier : âge inconnu, vérifié par lot ; le message est retiré sans sanction en attendant
+            self._demander_age(message, auteur, etat, regles)
+            self._noter_verdict(auteur, "scam", "Lien pendant le bouclier (âge du compte en vérification)", regles)
+            await self._supprimer_message(message)
             return True
-        
-        # Cas spécial : Mot clé très fort seul (ex: streamboo) -> BAN DIRECT
-        if "streamboo" in contenu.lower():
-             await self._appliquer_ban(message, auteur, "SCAM DETECTED (Blacklisted Domain)")
-             return True
-        
-        # Critère 2: Lien (ou lien caché) + Compte très récent
-        if a_un_lien or a_un_lien_cache:
-            est_nouveau_compte = await self._est_compte_recent(auteur)
-            if est_nouveau_compte:
-                await self._appliquer_ban(message, auteur, f"SCAM DETECTED (Lien + Compte < {ACCOUNT_AGE_THRESHOLD_DAYS}j)")
-                return True
-            
-        return False
+        if not recent:
+            return False
+        raison = self._raison_compte_recent()
+        self._noter_verdict(auteur, "scam", raison, regles)
+        await self._appliquer_ban(message, auteur, raison)
+        return True
+
+    @staticmethod
+    def _raison_compte_recent() -> str:
+        return f"SCAM DETECTED (Lien + Compte < {ACCOUNT_AGE_THRESHOLD_DAYS}j)"
 
-    async def _est_compte_recent(self, username: str) -> bool:
-        """Vérifie l'âge du compte via API Twitch (avec cache)."""
-        maintenant = datetime.now(timezone.utc)
+    async def _est_compte_recent(self, etat: EtatViewer, user_id: str | None) -> bool | None:
+        """Vérifie l'âge du compte via API Twitch (avec cache). None = inconnu (bouclier actif)."""
+        bouclier = getattr(self.bot, "raid_shield", None)
         
         # 1. Check cache
-        if username in self.cache_date_creation:
-            date_creation = self.cache_date_creation[username]
+        if etat.date_creation is not None:
+            date_creation = etat.date_creation
+        elif bouclier and bouclier.actif:
+            # Mode bouclier : pas d'appel API par message, l'âge sera vérifié par lot
+            return None
         else:
             # 2. Fetch API
             try:
-                users = await self.bot.fetch_users(names=[username])
+                if user_id:
+                    users = await self.bot.fetch_users(ids=[int(user_id)])
+                else:
+                    users = await self.bot.fetch_users(names=[etat.login])
                 if not users:
                     return False  # Impossible de vérifier, on laisse le bénéfice du doute
                 
-                user = users[0]
-                date_creation = user.created_at  # datetime aware utc
-                self.cache_date_creation[username] = date_creation
+                date_creation = users[0].created_at.timestamp()
+                etat.date_creation = date_creation
             except Exception as e:
-                print(f"[MOD] Erreur fetch_users({username}): {e}")
+                print(f"[MOD] Erreur fetch_users({etat.login}): {e}")
                 return False
 
-        age_compte = maintenant - date_creation
-        return age_compte.days < ACCOUNT_AGE_THRESHOLD_DAYS
+        return self._noter_age(etat, date_creation)
 
-    async def _escalader_sanction(self, message, auteur: str, raison: str):
+    def _noter_age(self, etat: EtatViewer, date_creation: float) -> bool:
+        etat.date_creation = date_creation
+        est_recent = time.time() - date_creation < ACCOUNT_AGE_THRESHOLD_DAYS * 86400
+        bouclier = getattr(self.bot, "raid_shield", None)
+        if bouclier:
+            bouclier.noter_compte(est_recent)
+        return est_recent
+
+    def _demander_age(self, message, auteur: str, etat: EtatViewer, regles: RuleSet):
+        """Met le compte en file pour une vérification d'âge groupée (un appel Helix pour 100 comptes)."""
+        self._file_ages[self._user_id(message) or etat.login] = (message, auteur, etat, regles)
+        if self._tache_ages is None or self._tache_ages.done():
+            self._tache_ages = asyncio.create_task(self._verifier_ages())
+
+    async def _verifier_ages(self):
+        """Vérifie les âges en attente par lots ; compte récent -> ban (le lien a déjà été supprimé)."""
+        while self._file_ages:
+            await asyncio.sleep(SHIELD_BAN_BATCH_S)
+            lot, self._file_ages = self._file_ages, {}
+            ids = [cle for cle in lot if cle.isdigit()]
+            logins = [cle for cle in lot if not cle.isdigit()]
+            trouves = {}
+            try:
+                for i in range(0, len(ids), 100):
+                    for user in await self.bot.fetch_users(ids=[int(u) for u in ids[i:i + 100]]):
+                        trouves[str(user.id)] = user.created_at.timestamp()
+                for i in range(0, len(logins), 100):
+                    for user in await self.bot.fetch_users(names=logins[i:i + 100]):
+                        trouves[user.name.lower()] = user.created_at.timestamp()
+            except Exception as e:
+                print(f"[MOD] Erreur fetch_users (lot de {len(lot)}): {e}")
+
+            for cle, (message, auteur, etat, regles) in lot.items():
+                if cle in trouves and self._noter_age(etat, trouves[cle]):
+                    raison = self._raison_compte_recent()
+                    self._noter_verdict(auteur, "scam", raison, regles)
+                    await self._appliquer_ban(message, auteur, raison)
+
+    async def _escalader_sanction(self, message, auteur: str, raison: str, etat: EtatViewer, regles: RuleSet):
         """Applique l'escalade de sanction (Warn -> Timeout -> Ban)."""
-        niveau_actuel = self.compteur_warns[auteur]
+        niveau_actuel = etat.warns
+        niveaux = regles.warning_levels
         
         # On cap au niveau max configuré
-        if niveau_actuel >= len(WARNING_LEVELS):
-            config_sanction = WARNING_LEVELS[-1]
+        if niveau_actuel >= len(niveaux):
+            config_sanction = niveaux[-1]
         else:
-            config_sanction = WARNING_LEVELS[niveau_actuel]
+            config_sanction = niveaux[niveau_actuel]
         
         action = config_sanction["action"]
         duree = config_sanction["duration"]
         
         # Incrémenter pour la prochaine fois
-        self.compteur_warns[auteur] += 1
+        etat.warns += 1
         
         if action == "warn":
             await message.channel.send(f"@{auteur} ⚠️ Avertissement ({raison}). Prochaine fois : Timeout.")
@@ -136,7 +241,11 @@ class Moderator:
                 self._log_background(f"🚫 [SAFE MODE] TIMEOUT {duree}s | @{auteur} | {raison}")
             else:
                 try:
-                    await message.channel.send(f"/timeout {auteur} {duree} {raison}")
+                    user_id = self._user_id(message)
+                    api = getattr(self.bot, "mod_api", None)
+                    if not (api and user_id and await api.timeout(user_id, duree, raison)):
+                        # Fallback IRC
+                        await message.channel.send(f"/timeout {auteur} {duree} {raison}")
                     await message.channel.send(f"@{auteur} 🔇 Timeout {duree}s ({raison})")
                     self._log_background(f"🔇 TIMEOUT {duree}s | @{auteur} | {raison}")
                 except Exception as e:
@@ -145,46 +254,83 @@ class Moderator:
         elif action == "ban":
             await self._appliquer_ban(message, auteur, raison)
 
+    @staticmethod
+    def _user_id(message) -> str | None:
+        """ID Twitch de l'auteur (nécessaire pour l'API Helix)."""
+        user_id = getattr(message.author, "id", None) if message.author else None
+        return str(user_id) if user_id else None
+
     async def _appliquer_ban(self, message, auteur: str, raison: str):
         """Applique un ban définitif (ou simule en SAFE_MODE)."""
+        bouclier = getattr(self.bot, "raid_shield", None)
+        if bouclier and bouclier.actif:
+            # Vague en cours : bans regroupés, un seul log par lot
+            self._file_bans.append((message.channel, auteur, self._user_id(message), raison))
+            if self._tache_bans is None or self._tache_bans.done():
+                self._tache_bans = asyncio.create_task(self._vider_file_bans())
+            return
+
         if SAFE_MODE:
             await message.channel.send(f"@{auteur} [SAFE_MODE] Simulation BAN ({raison})")
             self._log_background(f"🚨 [SAFE MODE] BAN | @{auteur} | {raison}")
         else:
-            await message.channel.send(f"/ban {auteur} {raison}")
+            user_id = self._user_id(message)
+            api = getattr(self.bot, "mod_api", None)
+            if not (api and user_id and await api.ban(user_id, raison)):
+                # Fallback IRC
+                await message.channel.send(f"/ban {auteur} {raison}")
             self._log_background(f"🚨 BAN | @{auteur} | {raison}")
 
-    async def _verifier_flood(self, message, auteur: str, contenu: str) -> bool:
-        """Vérifie si l'utilisateur flood (trop de messages en peu de temps)."""
-        maintenant = time.time()
-        historique = self.historique_flood[auteur]
-        historique.append(maintenant)
-        
-        # On retire les messages trop vieux
-        while historique and maintenant - historique[0] > FLOOD_WINDOW_S:
-            historique.popleft()
-        
-        # Si trop de messages dans la fenêtre = flood
-        if len(historique) > FLOOD_MAX_MSG:
-            return True
-        return False
+    async def _vider_file_bans(self):
+        """Envoie les bans en attente par lots toutes les SHIELD_BAN_BATCH_S secondes."""
+        while self._file_bans:
+            await asyncio.sleep(SHIELD_BAN_BATCH_S)
+            lot, self._file_bans = self._file_bans, []
+            # Un seul ban par compte, même s'il a été signalé plusieurs fois
+            par_auteur = {auteur: (channel, user_id, raison) for channel, auteur, user_id, raison in lot}
+            bannis = list(par_auteur)
 
-    async def _verifier_liens(self, message, auteur: str, contenu: str) -> bool:
-        """Vérifie les liens non autorisés."""
-        if LINK_REGEX.search(contenu) and not is_link_whitelisted(contenu):
-            await self._supprimer_message(message)
-            return True
-        return False
+            if not SAFE_MODE:
+                api = getattr(self.bot, "mod_api", None)
+                ids = {user_id: auteur for auteur, (_, user_id, _) in par_auteur.items() if user_id}
+                echecs_api = set(par_auteur) - set(ids.values())
+                if api and ids:
+                    echecs = await api.ban_masse(list(ids), "Vague de bots (bouclier)")
+                    echecs_api |= {ids[u] for u in echecs}
+                else:
+                    echecs_api = set(par_auteur)
 
-    async def _verifier_mots_bannis(self, message, auteur: str, contenu: str) -> bool:
-        """Vérifie les mots interdits."""
-        if BANNED_WORDS_REGEX.search(contenu):
-            await self._supprimer_message(message)
-            return True
-        return False
+                # Fallback IRC pour ce que l'API n'a pas pu traiter
+                for auteur in echecs_api:
+                    channel, _, raison = par_auteur[auteur]
+                    try:
+                        await channel.send(f"/ban {auteur} {raison}")
+                    except Exception as e:
+                        print(f"[MOD] Ban error ({auteur}): {e}")
+                        bannis.remove(auteur)
+
+            if bannis:
+                prefixe = "[SAFE MODE] " if SAFE_MODE else ""
+                self._log_background(f"🚨 {prefixe}BAN x{len(bannis)} (bouclier) | " + ", ".join(f"@{a}" for a in bannis[:30]))
+
+    async def _verifier_doublons(self, message, auteur: str, normalise: str) -> bool:
+        """Vérifie si le message fait partie d'une vague de messages identiques."""
+        debut = time.perf_counter_ns()
+        groupe = self.detecteur_doublons.observer(auteur, normalise, getattr(message, "id", None))
+        self.regles.mesurer("doublons", debut, groupe is not None)
+        if groupe is None:
+            return False
+        if len(groupe.auteurs) == DUPLICATE_MIN_USERS:
+            self._log_background(f"🌊 COPYPASTA | {len(groupe.auteurs)} comptes | \"{(message.content or '')[:80]}\"")
+            # Seuil atteint : on purge aussi les copies déjà postées
+            api = getattr(self.bot, "mod_api", None)
+            if api and not SAFE_MODE:
+                asyncio.create_task(api.supprimer_masse(list(groupe.message_ids)))
+        await self._supprimer_message(message)
+        return True
 
     async def _supprimer_message(self, message) -> bool:
-        """Supprime un message via /delete <id>."""
+        """Supprime un message (API Helix, sinon /delete <id>)."""
         msg_id = getattr(message, "id", None)
         
         if not msg_id:
@@ -192,6 +338,9 @@ class Moderator:
             msg_id = tags.get("id") if isinstance(tags, dict) else None
         
         if msg_id:
+            api = getattr(self.bot, "mod_api", None)
+            if api and await api.supprimer_message(msg_id):
+                return True
             await message.channel.send(f"/delete {msg_id}")
             return True
         return False
@@ -201,18 +350,21 @@ class Moderator:
         asyncio.create_task(self._log(texte))
 
     async def _log(self, texte: str):
-        """Envoie un log dans le webhook Discord."""
+        """Envoie un log sur Discord (bot Discord via le bus, sinon webhook)."""
+        bus = getattr(self.bot, "bus", None)
+        if bus and bus.publish(LogModeration(texte)):
+            return
+
         if not DISCORD_WEBHOOK_URL:
             return
         
-        session = getattr(self.bot, "http_session", None)
-        if not session:
+        http = getattr(self.bot, "http_client", None)
+        if not http:
             return
 
         try:
-            async with session.post(DISCORD_WEBHOOK_URL, json={"content": texte}, timeout=5) as resp:
-                if not (200 <= resp.status < 300):
-                    err_text = await resp.text()
-                    print(f"[LOG] Erreur Discord {resp.status}: {err_text}")
+            resp = await http.request("POST", DISCORD_WEBHOOK_URL, json={"content": texte})
+            if not resp.ok:
+                print(f"[LOG] Erreur Discord {resp.status}: {resp.data}")
         except Exception as e:
             print(f"[LOG] Erreur: {e}")
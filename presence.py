@@ -0,0 +1,123 @@
+"""
+Viewers présents dans le chat (Helix Get Chatters)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+La liste IRC (channel.chatters, issue de NAMES / JOIN) est incomplète au-delà
+d'environ 1000 viewers et n'a pas toujours les IDs. Chaque relevé parcourt
+donc Get Chatters par pages de 1000 (appels limités en concurrence et
+réessayés par ModerationAPI), filtre les bots connus (lookup dans un
+frozenset) et compare le résultat au relevé précédent (arrivées / départs).
+Le coût de chaque relevé (pages, durée, arrivées / départs) est gardé et
+journalisé.
+
+En repli IRC, les IDs manquants sont repris du relevé précédent (par pseudo),
+puis demandés à Helix par lots : un passage Helix <-> IRC ne fait pas partir
+puis revenir tout le chat. Le relevé est remis à zéro à chaque changement
+d'état du live (voir reinitialiser).
+"""
+
+import asyncio
+import time
+from config import TWITCH_NICK, PRESENCE_PAGE_SIZE, PRESENCE_PAGES_MAX, PRESENCE_IDS_LOT, PRESENCE_BOTS
+
+
+class PresenceChat:
+    """Relevés successifs des viewers présents : {user_id: login}."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.presents = {}  # {user_id: login} du dernier relevé
+        self.cout = {}  # Dernier relevé : source, pages, durée, arrivées / départs
+        self._ignores = PRESENCE_BOTS | {(TWITCH_NICK or "").lower()}
+        self._verrou = asyncio.Lock()
+
+    def reinitialiser(self):
+        """Début / fin de live : le prochain relevé repart de zéro (pas de départs hérités du live précédent)."""
+        self.presents = {}
+
+    async def relever(self) -> dict | None:
+        """{user_id: login} des présents ; None si un relevé est déjà en cours."""
+        if self._verrou.locked():
+            return None  # Relevé précédent encore en cours (très gros chat / API lente)
+        async with self._verrou:
+            debut = time.perf_counter()
+            source = "helix"
+            vus, pages, total = await self._helix()
+            if vus is None:
+                source = "irc"
+                vus, pages, total = await self._irc(), 0, None
+            arrives = vus.keys() - self.presents.keys()
+            partis = self.presents.keys() - vus.keys()
+            self.presents = vus
+            self.cout = {
+                "source": source,
+                "pages": pages,
+                "total": total,
+                "presents": len(vus),
+                "arrives": len(arrives),
+                "partis": len(partis),
+                "duree_ms": round((time.perf_counter() - debut) * 1000, 1),
+            }
+            print(f"[PRESENCE] {len(vus)} viewers ({source}, {pages} page(s), "
+                  f"{self.cout['duree_ms']:.0f}ms) +{len(arrives)} / -{len(partis)}")
+            return vus
+
+    async def _helix(self) -> tuple[dict | None, int, int | None]:
+        """Toutes les pages de Get Chatters ; (None, ...) en cas d'échec (relevé partiel inutilisable)."""
+        api = getattr(self.bot, "mod_api", None)
+        if api is None:
+            return None, 0, None
+        vus = {}
+        pages = 0
+        total = None
+        apres = None
+        ignores = self._ignores
+        while pages < PRESENCE_PAGES_MAX:
+            page = await api.page_chatters(apres, PRESENCE_PAGE_SIZE)
+            if page is None:
+                # Scope moderator:read:chatters absent, bot non modérateur... : liste IRC
+                return None, pages, total
+            pages += 1
+            total = page.get("total", total)
+            for chatter in page.get("data", []):
+                if chatter["user_login"] not in ignores:
+                    vus[chatter["user_id"]] = chatter["user_login"]
+            apres = page.get("pagination", {}).get("cursor")
+            if not apres:
+                break
+        return vus, pages, total
+
+    async def _irc(self) -> dict:
+        """Repli : liste IRC des salons rejoints (IDs manquants repris du relevé précédent ou de Helix)."""
+        vus = {}
+        sans_id = set()
+        for channel in self.bot.connected_channels:
+            for chatter in channel.chatters or ():
+                nom = chatter.name.lower()
+                if nom in self._ignores:
+                    continue
+                if getattr(chatter, "id", None):
+                    vus[str(chatter.id)] = nom
+                else:
+                    sans_id.add(nom)
+        if sans_id:
+            connus = {login: uid for uid, login in self.presents.items()}
+            for nom in sans_id:
+                if nom in connus:
+                    vus[connus[nom]] = nom
+            vus.update(await self._ids(sans_id - connus.keys()))
+        return vus
+
+    async def _ids(self, logins: set) -> dict:
+        """{user_id: login} via Helix Get Users (lots de 100) ; les lots en échec sont ignorés ce tour-ci."""
+        trouves = {}
+        logins = sorted(logins)
+        for i in range(0, len(logins), PRESENCE_IDS_LOT):
+            try:
+                users = await self.bot.fetch_users(names=logins[i:i + PRESENCE_IDS_LOT])
+            except Exception as e:
+                print(f"[PRESENCE] Erreur résolution des IDs: {e}")
+                continue
+            for user in users:
+                trouves[str(user.id)] = user.name.lower()
+        return trouves
@@ -0,0 +1,223 @@
+"""
+Mode "bouclier" anti-raid / vague de bots
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Surveille le débit de messages (lu dans ChatAnalytics), de JOIN et la proportion de comptes récents.
+Quand un pic anormal est détecté (seuils adaptatifs : plancher fixe ou
+multiple de la moyenne habituelle), le bot passe en mode bouclier :
+  - plus d'appel API par message pour l'âge des comptes (vérification par lot,
+    lien d'un compte inconnu supprimé en attendant)
+  - bans regroupés par lots
+  - follower-only + slow mode via l'API
+  - messages automatiques suspendus
+Retour à la normale après SHIELD_CALM_S secondes de calme.
+"""
+
+import asyncio
+import time
+from collections import deque
+from config import (
+    SHIELD_WINDOW_S, SHIELD_CHECK_S, SHIELD_MIN_MSG_RATE, SHIELD_MIN_JOIN_RATE,
+    SHIELD_SPIKE_FACTOR, SHIELD_NEW_ACCOUNT_RATIO, SHIELD_NEW_ACCOUNT_MIN_SAMPLES,
+    SHIELD_CALM_S, SHIELD_FOLLOWER_ONLY_MIN, SHIELD_SLOW_MODE_S, SHIELD_RAID_GRACE_S
+)
+
+# Lissage de la moyenne habituelle (EWMA, à chaque vérification)
+ALPHA_BASE = 0.02
+
+
+class RaidShield:
+    """Détecte les vagues (bots, follow-bots, scam) et durcit la modération."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.actif = False
+        self.debut = None
+        self._joins = deque()
+        self._comptes = deque()       # (ts, est_nouveau)
+        self._base_messages = None    # msgs/min habituels
+        self._base_joins = None       # joins/min habituels
+        self._calme_depuis = None
+        self._messages_depuis = None  # Messages ignorés avant cette date (fin de vague)
+        self._raid_jusqua = 0         # période de grâce après un raid légitime
+        self._reglages_precedents = None
+        self._tache = None
+
+    async def start(self):
+        """Démarre la surveillance."""
+        if self._tache is None:
+            self._tache = asyncio.create_task(self._boucle())
+            print("🛡️ Bouclier anti-raid prêt")
+
+    async def stop(self):
+        """Arrête la surveillance (et rétablit le chat si besoin)."""
+        if self._tache:
+            self._tache.cancel()
+            try:
+                await self._tache
+            except asyncio.CancelledError:
+                pass
+            self._tache = None
+        if self.actif:
+            await self._desactiver()
+
+    # ─────────────────────────── COMPTEURS ───────────────────────────
+
+    def compter_join(self):
+        self._joins.append(time.time())
+
+    def noter_compte(self, est_nouveau: bool):
+        """Résultat d'une vérification d'âge de compte (pour le ratio de comptes récents)."""
+        self._comptes.append((time.time(), est_nouveau))
+
+    def raid_legitime(self, nb_viewers: int):
+        """Un raid Twitch arrive : le pic de JOIN et de messages attendu ne doit pas déclencher le bouclier."""
+        self._raid_jusqua = time.time() + SHIELD_RAID_GRACE_S
+        print(f"[SHIELD] Raid entrant ({nb_viewers} viewers) : JOIN et débit de messages ignorés {SHIELD_RAID_GRACE_S}s")
+
+    def exporter_etat(self) -> dict:
+        """Débits habituels appris (longs à réapprendre après un redémarrage)."""
+        return {"base_messages": self._base_messages, "base_joins": self._base_joins,
+                "raid_jusqua": self._raid_jusqua}
+
+    def restaurer_etat(self, etat: dict):
+        if self._base_messages is None:
+            self._base_messages = etat.get("base_messages")
+            self._base_joins = etat.get("base_joins")
+        self._raid_jusqua = max(self._raid_jusqua, etat.get("raid_jusqua", 0))
+
+    def _purger(self, maintenant: float):
+        limite = maintenant - SHIELD_WINDOW_S
+        while self._joins and self._joins[0] < limite:
+            self._joins.popleft()
+        while self._comptes and self._comptes[0][0] < limite:
+            self._comptes.popleft()
+
+    def taux(self) -> dict:
+        """Débits actuels (par minute) et ratio de comptes récents."""
+        maintenant = time.time()
+        self._purger(maintenant)
+        facteur = 60 / SHIELD_WINDOW_S
+        nouveaux = sum(1 for _, n in self._comptes if n)
+        return {
+            "messages": self.bot.analytics.taux_par_minute(SHIELD_WINDOW_S, self._messages_depuis),
+            "joins": len(self._joins) * facteur,
+            "comptes_verifies": len(self._comptes),
+            "ratio_nouveaux": nouveaux / len(self._comptes) if self._comptes else 0.0,
+        }
+
+    # ─────────────────────────── DÉCISION ───────────────────────────
+
+    def _seuil(self, plancher: float, base: float | None) -> float:
+        if base is None:
+            return plancher
+        return max(plancher, base * SHIELD_SPIKE_FACTOR)
+
+    def _detecter(self, t: dict) -> str | None:
+        """Retourne la raison du déclenchement, ou None si tout est normal."""
+        # Pendant la grâce d'un raid légitime, seuls les comptes récents peuvent déclencher
+        if time.time() >= self._raid_jusqua:
+            seuil_msg = self._seuil(SHIELD_MIN_MSG_RATE, self._base_messages)
+            if t["messages"] > seuil_msg:
+                return f"{t['messages']:.0f} msg/min (seuil {seuil_msg:.0f})"
+
+            seuil_join = self._seuil(SHIELD_MIN_JOIN_RATE, self._base_joins)
+            if t["joins"] > seuil_join:
+                return f"{t['joins']:.0f} join/min (seuil {seuil_join:.0f})"
+
+        if t["comptes_verifies"] >= SHIELD_NEW_ACCOUNT_MIN_SAMPLES and t["ratio_nouveaux"] > SHIELD_NEW_ACCOUNT_RATIO:
+            return f"{t['ratio_nouveaux']:.0%} de comptes récents"
+        return None
+
+    def _mettre_a_jour_base(self, t: dict):
+        if self._base_messages is None:
+            self._base_messages, self._base_joins = t["messages"], t["joins"]
+            return
+        self._base_messages += ALPHA_BASE * (t["messages"] - self._base_messages)
+        self._base_joins += ALPHA_BASE * (t["joins"] - self._base_joins)
+
+    async def _boucle(self):
+        while True:
+            await asyncio.sleep(SHIELD_CHECK_S)
+            try:
+                await self._evaluer()
+            except Exception as e:
+                print(f"[SHIELD] Erreur: {e}")
+
+    async def _evaluer(self):
+        t = self.taux()
+        raison = self._detecter(t)
+
+        if not self.actif:
+            if raison:
+                await self._activer(raison)
+            elif time.time() >= self._raid_jusqua:
+                # La moyenne habituelle n'apprend que hors vague (et hors raid)
+                self._mettre_a_jour_base(t)
+            return
+
+        if raison:
+            self._calme_depuis = None
+        elif self._calme_depuis is None:
+            self._calme_depuis = time.time()
+        elif time.time() - self._calme_depuis >= SHIELD_CALM_S:
+            await self._desactiver()
+
+    async def _activer(self, raison: str):
+        self.actif = True
+        self.debut = time.time()
+        self._calme_depuis = None
+        print(f"[SHIELD] 🛡️ Activé : {raison}")
+        self.bot.moderator._log_background(f"🛡️ **BOUCLIER ACTIVÉ** | {raison}")
+        await self._appliquer_reglages_chat(True)
+
+    async def _desactiver(self):
+        duree = int(time.time() - self.debut) if self.debut else 0
+        self.actif = False
+        self.debut = None
+        self._calme_depuis = None
+        # On vide les compteurs pour ne pas redéclencher sur la fin de la vague
+        self._messages_depuis = time.time()
+        self._joins.clear()
+        self._comptes.clear()
+        print(f"[SHIELD] Désactivé après {duree}s")
+        self.bot.moderator._log_background(f"✅ **Bouclier désactivé** | durée {duree}s")
+        await self._appliquer_reglages_chat(False)
+
+    # ─────────────────────────── CHAT SETTINGS ───────────────────────────
+
+    async def _appliquer_reglages_chat(self, actif: bool):
+        """Active follower-only + slow mode (ou restaure les réglages d'avant)."""
+        if not SHIELD_FOLLOWER_ONLY_MIN and not SHIELD_SLOW_MODE_S:
+            return
+        api = self.bot.mod_api
+        if actif:
+            self._reglages_precedents = await api.lire_reglages_chat()
+            reglages = {}
+            if SHIELD_FOLLOWER_ONLY_MIN:
+                reglages.update(follower_mode=True, follower_mode_duration=SHIELD_FOLLOWER_ONLY_MIN)
+            if SHIELD_SLOW_MODE_S:
+                reglages.update(slow_mode=True, slow_mode_wait_time=SHIELD_SLOW_MODE_S)
+        else:
+            avant = self._reglages_precedents
+            self._reglages_precedents = None
+            if avant is None:
+                # Lecture échouée à l'activation : remettre "désactivé" effacerait des modes
+                # choisis par le streamer, on laisse les réglages tels quels
+                print("[SHIELD] Réglages du chat d'avant inconnus : pas de restauration")
+                self.bot.moderator._log_background(
+                    "⚠️ Bouclier : réglages du chat d'avant inconnus, follower-only / slow mode "
+                    "laissés tels quels (à désactiver à la main si besoin)"
+                )
+                return
+            reglages = {
+                "follower_mode": bool(avant.get("follower_mode")),
+                "slow_mode": bool(avant.get("slow_mode")),
+            }
+            if reglages["follower_mode"]:
+                reglages["follower_mode_duration"] = avant.get("follower_mode_duration")
+            if reglages["slow_mode"]:
+                reglages["slow_mode_wait_time"] = avant.get("slow_mode_wait_time")
+
+        if not await api.modifier_reglages_chat(**reglages):
+            self.bot.moderator._log_background("⚠️ Bouclier : impossible de modifier les réglages du chat")
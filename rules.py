@@ -0,0 +1,388 @@
+"""
+Règles de modération versionnées, rechargeables à chaud
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Les règles (mots interdits, mots-clés scam, listes de liens, escalade, flood)
+sont décrites en JSON (data/rules.json). Chaque modification est validée et
+compilée hors de la boucle asyncio, enregistrée comme nouvelle version
+(data/rules_history/vN.json) puis remplace l'ancienne d'un bloc dans le
+Moderator : un message est toujours évalué par une seule version complète.
+Le dashboard écrit les fichiers, le bot les recharge (surveillance du mtime).
+Les listes de liens optionnelles (LINK_WHITELIST_FILE / LINK_BLACKLIST_FILE,
+une entrée par ligne) s'ajoutent à celles de rules.json à chaque compilation
+et sont surveillées de la même façon.
+
+evaluer() applique une version des règles à un message : c'est la seule
+implémentation des vérifications qui dépendent des règles, utilisée par le
+Moderator et par l'évaluation fantôme (shadow.py).
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from config import (
+    LINK_OBFUSCATION_REGEX, BANNED_WORDS, SCAM_KEYWORDS, LINK_WHITELIST, LINK_BLACKLIST, WARNING_LEVELS,
+    LINK_WHITELIST_FILE, LINK_BLACKLIST_FILE, FLOOD_MAX_MSG, FLOOD_WINDOW_S,
+    RULES_FILE, RULES_HISTORY_DIR, RULES_RELOAD_S, RULES_STATS_FILE, RULES_STATS_S, VERDICTS_MAX
+)
+from link_policy import PolitiqueLiens, extraire_liens, hotes_caches, hote_suspect, lire_liste
+from text_normalizer import normaliser, MotsCles
+
+ACTIONS = {"warn", "timeout", "ban"}
+# Règles évaluées par message (statistiques de coût)
+NOMS_REGLES = ("liste_noire", "scam", "doublons", "flood", "liens", "mots_bannis")
+
+
+def source_par_defaut() -> dict:
+    """Règles de config.py (utilisées si data/rules.json n'existe pas)."""
+    return {
+        "banned_words": list(BANNED_WORDS),
+        "scam_keywords": list(SCAM_KEYWORDS),
+        "link_whitelist": list(LINK_WHITELIST),
+        "link_blacklist": list(LINK_BLACKLIST),
+        "warning_levels": [dict(n) for n in WARNING_LEVELS],
+        "flood_max_msg": FLOOD_MAX_MSG,
+        "flood_window_s": FLOOD_WINDOW_S,
+    }
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """Version compilée et immuable des règles."""
+    version: int
+    source: dict
+    banned_words: MotsCles
+    scam_keywords: MotsCles
+    politique_liens: PolitiqueLiens
+    warning_levels: tuple
+    flood_max_msg: int
+    flood_window_s: float
+    compile_ms: float
+
+
+def _liste_de_textes(source: dict, cle: str) -> list[str]:
+    valeur = source.get(cle, [])
+    if not isinstance(valeur, list) or not all(isinstance(v, str) for v in valeur):
+        raise ValueError(f"{cle} : liste de textes attendue")
+    return valeur
+
+
+def mtime_listes_liens() -> tuple:
+    """mtime des fichiers de listes de liens (None si absent) : un changement impose de recompiler."""
+    return tuple(os.path.getmtime(f) if f and os.path.exists(f) else None
+                 for f in (LINK_WHITELIST_FILE, LINK_BLACKLIST_FILE))
+
+
+def compiler(source: dict, version: int) -> RuleSet:
+    """Valide et compile les règles. Lève ValueError si elles sont invalides."""
+    debut = time.perf_counter()
+    source = {**source_par_defaut(), **source}
+
+    niveaux = source["warning_levels"]
+    if not isinstance(niveaux, list) or not niveaux:
+        raise ValueError("warning_levels : liste non vide attendue")
+    for niveau in niveaux:
+        if not isinstance(niveau, dict) or niveau.get("action") not in ACTIONS:
+            raise ValueError(f"warning_levels : action invalide ({niveau})")
+        if not isinstance(niveau.get("duration", 0), int) or niveau.get("duration", 0) < 0:
+            raise ValueError(f"warning_levels : durée invalide ({niveau})")
+    flood_max = source["flood_max_msg"]
+    flood_fenetre = source["flood_window_s"]
+    if not isinstance(flood_max, int) or flood_max < 1:
+        raise ValueError("flood_max_msg : entier >= 1 attendu")
+    if not isinstance(flood_fenetre, (int, float)) or flood_fenetre <= 0:
+        raise ValueError("flood_window_s : nombre > 0 attendu")
+
+    # Listes de rules.json + fichiers optionnels (pas recopiés dans `source` : ils restent la référence)
+    politique = PolitiqueLiens(
+        _liste_de_textes(source, "link_whitelist") + lire_liste(LINK_WHITELIST_FILE),
+        _liste_de_textes(source, "link_blacklist") + lire_liste(LINK_BLACKLIST_FILE),
+    )
+    return RuleSet(
+        version=version,
+        source=source,
+        banned_words=MotsCles(_liste_de_textes(source, "banned_words")),
+        scam_keywords=MotsCles(_liste_de_textes(source, "scam_keywords")),
+        politique_liens=politique,
+        warning_levels=tuple(dict(n) for n in niveaux),
+        flood_max_msg=flood_max,
+        flood_window_s=float(flood_fenetre),
+        compile_ms=(time.perf_counter() - debut) * 1000,
+    )
+
+
+# ─────────────────────────── ÉVALUATION ───────────────────────────
+
+@dataclass(frozen=True)
+class Faits:
+    """Ce qui ne dépend pas des règles, calculé une seule fois par message."""
+    contenu: str
+    normalise: str       # Forme normalisée (text_normalizer)
+    mots: tuple          # Ses mots (recollés par MotsCles pour les mots coupés)
+    liens: list          # Liens extraits (LINK_REGEX)
+    caches: list         # Hôtes de liens déguisés (link_policy.hotes_caches)
+    lien_cache: bool     # Obfuscation typique ("domaine .com", "remove the space")
+
+    @classmethod
+    def depuis(cls, contenu: str) -> "Faits":
+        liens = extraire_liens(contenu)
+        normalise = normaliser(contenu)
+        return cls(contenu, normalise, tuple(normalise.split(" ")), liens, hotes_caches(contenu, liens),
+                   bool(LINK_OBFUSCATION_REGEX.search(contenu)))
+
+    @property
+    def a_un_lien(self) -> bool:
+        """Lien visible ou déguisé."""
+        return bool(self.liens) or self.lien_cache
+
+
+def _scam(regles: RuleSet, faits: Faits, historique, maintenant: float) -> str | None:
+    if faits.a_un_lien and regles.scam_keywords.cherche(faits.normalise, faits.mots):
+        return "SCAM DETECTED (Lien/Obfuscation + Mot clé)"
+    # Domaine en liste noire ou hôte (réel ou déguisé) contenant un mot-clé fort -> BAN DIRECT
+    if regles.politique_liens.un_interdit(faits.liens + faits.caches) or hote_suspect(faits.liens, faits.caches):
+        return "SCAM DETECTED (Blacklisted Domain)"
+    return None
+
+
+def _flood(regles: RuleSet, faits: Faits, historique, maintenant: float) -> str | None:
+    # Flood = plus de flood_max_msg messages dans la fenêtre,
+    # donc le plus ancien des flood_max_msg + 1 derniers est encore dedans
+    n = regles.flood_max_msg
+    if len(historique) > n and maintenant - historique[-(n + 1)] <= regles.flood_window_s:
+        return "Flood/Spam"
+    return None
+
+
+def _liens(regles: RuleSet, faits: Faits, historique, maintenant: float) -> str | None:
+    if faits.liens and not regles.politique_liens.tous_autorises(faits.liens):
+        return "Lien interdit"
+    return None
+
+
+def _mots_bannis(regles: RuleSet, faits: Faits, historique, maintenant: float) -> str | None:
+    if regles.banned_words.cherche(faits.normalise, faits.mots):
+        return "Langage interdit"
+    return None
+
+
+# Ordre de Moderator.check_message (liste noire, âge du compte et doublons ne dépendent
+# pas des règles : le Moderator les vérifie lui-même, avant "scam" et entre "scam" et "flood")
+REGLES_ORDONNEES = (("scam", _scam), ("flood", _flood), ("liens", _liens), ("mots_bannis", _mots_bannis))
+
+
+def evaluer(regles: RuleSet, faits: Faits, historique, maintenant: float,
+            mesurer=None) -> tuple[str, str] | None:
+    """Première règle qui attrape le message : (nom, raison), ou None. Sans effet de bord.
+
+    `historique` contient les horodatages des derniers messages du viewer, message
+    courant inclus. `mesurer(nom, debut_ns, correspond)` reçoit le coût de chaque règle.
+    """
+    for nom, regle in REGLES_ORDONNEES:
+        debut = time.perf_counter_ns()
+        raison = regle(regles, faits, historique, maintenant)
+        if mesurer is not None:
+            mesurer(nom, debut, raison is not None)
+        if raison is not None:
+            return nom, raison
+    return None
+
+
+@dataclass(frozen=True)
+class Verdict:
+    """Décision de modération, avec la version des règles qui l'a produite."""
+    date: float
+    auteur: str
+    regle: str
+    raison: str
+    version: int
+
+
+class StatsRegle:
+    """Coût d'une règle : appels, correspondances, temps cumulé."""
+    __slots__ = ("appels", "correspondances", "total_ns")
+
+    def __init__(self):
+        self.appels = 0
+        self.correspondances = 0
+        self.total_ns = 0
+
+    def en_dict(self) -> dict:
+        return {
+            "appels": self.appels,
+            "correspondances": self.correspondances,
+            "cout_moy_us": round(self.total_ns / self.appels / 1000, 2) if self.appels else 0.0,
+        }
+
+
+class RuleStore:
+    """Version active + historique des règles (fichiers JSON)."""
+
+    def __init__(self, fichier: str = RULES_FILE, historique: str = RULES_HISTORY_DIR):
+        self.fichier = fichier
+        self.historique = historique
+        self.stats = {nom: StatsRegle() for nom in NOMS_REGLES}
+        self.verdicts = deque(maxlen=VERDICTS_MAX)
+        self._mtime = None
+        self._mtime_listes = mtime_listes_liens()
+        self._tache = None
+        self.actif = self._charger_actif()
+
+    # ─────────────────────────── FICHIERS ───────────────────────────
+
+    def _chemin_version(self, version: int) -> str:
+        return os.path.join(self.historique, f"v{version}.json")
+
+    def versions(self) -> list[int]:
+        """Versions disponibles dans l'historique (croissantes)."""
+        if not os.path.isdir(self.historique):
+            return []
+        return sorted(int(f[1:-5]) for f in os.listdir(self.historique)
+                      if f.startswith("v") and f.endswith(".json") and f[1:-5].isdigit())
+
+    def _lire_actif(self) -> tuple[int, dict]:
+        with open(self.fichier, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data["version"], data["regles"]
+
+    def _charger_actif(self) -> RuleSet:
+        """Version active au démarrage (config.py si aucun fichier, ou si le fichier est invalide)."""
+        if os.path.exists(self.fichier):
+            try:
+                self._mtime = os.path.getmtime(self.fichier)
+                version, regles = self._lire_actif()
+                return compiler(regles, version)
+            except Exception as e:
+                print(f"[RULES] ⚠️ {self.fichier} invalide, règles de config.py utilisées: {e}")
+        return compiler(source_par_defaut(), 0)
+
+    def recharger(self) -> RuleSet:
+        """Relit la version active sur disque (pour un process qui ne la surveille pas, ex. dashboard)."""
+        self.actif = self._charger_actif()
+        return self.actif
+
+    def _ecrire(self, version: int, regles: dict, nouvelle: bool):
+        os.makedirs(self.historique, exist_ok=True)
+        contenu = {"version": version, "date": time.time(), "regles": regles}
+        cibles = [self.fichier] + ([self._chemin_version(version)] if nouvelle else [])
+        for cible in cibles:
+            tmp = cible + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(contenu, f, indent=4, ensure_ascii=False)
+            os.replace(tmp, cible)
+        self._mtime = os.path.getmtime(self.fichier)
+
+    def _ecrire_historique(self, regles: RuleSet):
+        os.makedirs(self.historique, exist_ok=True)
+        with open(self._chemin_version(regles.version), "w", encoding="utf-8") as f:
+            json.dump({"version": regles.version, "date": time.time(), "regles": regles.source},
+                      f, indent=4, ensure_ascii=False)
+
+    # ─────────────────────────── PUBLICATION ───────────────────────────
+
+    def _basculer(self, regles: RuleSet):
+        # Simple affectation : les messages en cours gardent la version qu'ils ont lue
+        self.actif = regles
+        print(f"[RULES] ✅ Règles v{regles.version} actives (compilées en {regles.compile_ms:.1f}ms)")
+
+    async def publier(self, regles: dict) -> RuleSet:
+        """Valide, compile (hors boucle) et active une nouvelle version. Lève ValueError si invalide."""
+        versions = self.versions()
+        version = max(versions + [self.actif.version]) + 1
+        jeu = await asyncio.to_thread(compiler, regles, version)
+        if not versions:
+            # Première publication : la version active (config.py) reste disponible pour un rollback
+            await asyncio.to_thread(self._ecrire_historique, self.actif)
+        await asyncio.to_thread(self._ecrire, version, jeu.source, True)
+        self._basculer(jeu)
+        return jeu
+
+    async def rollback(self, version: int | None = None) -> RuleSet:
+        """Réactive une version de l'historique (par défaut celle avant la version active)."""
+        versions = self.versions()
+        if version is None:
+            precedentes = [v for v in versions if v < self.actif.version]
+            if not precedentes:
+                raise ValueError("aucune version précédente")
+            version = precedentes[-1]
+        if version not in versions:
+            raise ValueError(f"version {version} introuvable")
+
+        def charger():
+            with open(self._chemin_version(version), "r", encoding="utf-8") as f:
+                return compiler(json.load(f)["regles"], version)
+
+        jeu = await asyncio.to_thread(charger)
+        await asyncio.to_thread(self._ecrire, version, jeu.source, False)
+        self._basculer(jeu)
+        return jeu
+
+    # ─────────────────────────── RECHARGEMENT ───────────────────────────
+
+    async def start(self):
+        if self._tache is None:
+            self._tache = asyncio.create_task(self._surveiller())
+
+    async def stop(self):
+        if self._tache:
+            self._tache.cancel()
+            try:
+                await self._tache
+            except asyncio.CancelledError:
+                pass
+            self._tache = None
+
+    async def _surveiller(self):
+        """Recharge data/rules.json quand le dashboard le modifie (et lui publie les statistiques)."""
+        derniere_stat = time.monotonic()
+        while True:
+            await asyncio.sleep(RULES_RELOAD_S)
+            if time.monotonic() - derniere_stat >= RULES_STATS_S:
+                derniere_stat = time.monotonic()
+                await asyncio.to_thread(self._ecrire_stats)
+            try:
+                listes = mtime_listes_liens()
+                if listes != self._mtime_listes:
+                    # Fichiers de liens modifiés : même version des règles, politique recompilée
+                    self._mtime_listes = listes
+                    self._basculer(await asyncio.to_thread(compiler, self.actif.source, self.actif.version))
+                if not os.path.exists(self.fichier) or os.path.getmtime(self.fichier) == self._mtime:
+                    continue
+                self._mtime = os.path.getmtime(self.fichier)
+                version, regles = await asyncio.to_thread(self._lire_actif)
+                if version != self.actif.version:
+                    self._basculer(await asyncio.to_thread(compiler, regles, version))
+            except Exception as e:
+                print(f"[RULES] Erreur rechargement (version actuelle conservée): {e}")
+
+    # ─────────────────────────── STATISTIQUES ───────────────────────────
+
+    def mesurer(self, nom: str, debut_ns: int, correspond: bool):
+        stats = self.stats[nom]
+        stats.appels += 1
+        stats.total_ns += time.perf_counter_ns() - debut_ns
+        if correspond:
+            stats.correspondances += 1
+
+    def noter(self, auteur: str, regle: str, raison: str, version: int):
+        self.verdicts.append(Verdict(time.time(), auteur, regle, raison, version))
+
+    def rapport(self) -> dict:
+        return {
+            "version": self.actif.version,
+            "compile_ms": round(self.actif.compile_ms, 2),
+            "regles": {nom: stats.en_dict() for nom, stats in self.stats.items()},
+            "verdicts": [asdict(v) for v in list(self.verdicts)[-50:]],
+        }
+
+    def _ecrire_stats(self):
+        try:
+            tmp = RULES_STATS_FILE + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.rapport(), f)
+            os.replace(tmp, RULES_STATS_FILE)
+        except Exception as e:
+            print(f"[RULES] Erreur écriture statistiques: {e}")
@@ -1,55 +1,114 @@
 """
 Script de lancement principal pour RyosaChii (Twitch + Discord).
-Lance les deux bots en parallèle via asyncio.
+Lance les deux bots en parallèle via asyncio, sous un superviseur.
+
+Ordre de démarrage : la connexion IRC (et donc la modération) passe en premier ;
+Discord n'est importé et connecté qu'ensuite, et seulement si DISCORD_TOKEN est défini.
+Si un bot plante, il est relancé seul (l'autre continue) et le bot Twitch
+reprend l'état en mémoire de l'instance précédente (flood, warns, cache...).
 """
+from startup import PhaseTimer
 import asyncio
-import os
-from dotenv import load_dotenv
+import importlib
+import sys
+
+timer = PhaseTimer()
+
+with timer.phase("config"):
+    from dotenv import load_dotenv
+    # Charge les variables d'environnement
+    load_dotenv()
+    from config import DISCORD_TOKEN, verifier_config
 
-# Charge les variables d'environnement
-load_dotenv()
+with timer.phase("import twitch"):
+    from bot import Bot as TwitchBot
+    from http_client import HttpClient
+    from event_bus import EventBus
+    from custom_commands import CommandManager
+    from supervisor import Superviseur
+    import state_snapshot
+
+# Attente max de la connexion IRC avant de lancer Discord quand même
+ATTENTE_IRC_MAX_S = 30
 
-from bot import Bot as TwitchBot
-from discord_client import RyosaDiscordBot
-from config import DISCORD_TOKEN
 
 async def main():
-    # 1. Instanciation des bots
-    twitch_bot = TwitchBot()
-    
-    # Vérification du token Discord
-    if not DISCORD_TOKEN:
-        print("❌ [ERREUR] Pas de DISCORD_TOKEN trouvé dans .env !")
-        print("   Le bot Twitch va démarrer seul, mais pas le bot Discord.")
-        await twitch_bot.start()
-        return
-
-    discord_bot = RyosaDiscordBot()
-    
-    # 2. Lier les bots si besoin (pour qu'ils communiquent entre eux)
-    # twitch_bot.discord_bot = discord_bot
-    # discord_bot.twitch_bot = twitch_bot
-
-    print("🚀 Démarrage de Ryosa (Twitch + Discord)...")
-
-    # 3. Lancement parallèle
-    # On utilise asyncio.gather pour lancer les deux boucles infinies
+    # 0. Client HTTP partagé (pool de connexions commun aux deux bots)
+    with timer.phase("http"):
+        http_client = HttpClient()
+        await http_client.start()
+    # Bus d'événements : le bot Twitch publie (logs, annonces, clips), le bot Discord poste
+    bus = EventBus()
+    # Registre des commandes personnalisées, commun aux deux bots
+    cmd_manager = CommandManager()
+    superviseur = Superviseur()
+    bots = {}  # Instances courantes {"twitch": ..., "discord": ...}
+
+    async def lancer_twitch():
+        precedent = bots.get("twitch")
+        # Après un plantage : reprise directe de l'état en mémoire (pas de relecture disque)
+        etat = state_snapshot.capturer(precedent) if precedent else None
+        bot = TwitchBot(http_client=http_client, bus=bus, cmd_manager=cmd_manager, timer=timer, etat=etat)
+        bots["twitch"] = bot
+        if "discord" in bots:
+            # Lier les bots (requêtes directes, ex: !statut sur Discord)
+            bot.discord_bot = bots["discord"]
+            bots["discord"].twitch_bot = bot
+        try:
+            await bot.start()
+        finally:
+            try:
+                await bot.close()
+            except Exception as e:
+                print(f"[TWITCH] Erreur fermeture: {e}")
+
+    async def lancer_discord():
+        from discord_client import RyosaDiscordBot
+        bot = RyosaDiscordBot(http_client=http_client, bus=bus, cmd_manager=cmd_manager,
+                              twitch_bot=bots.get("twitch"))
+        bots["discord"] = bot
+        if "twitch" in bots:
+            bots["twitch"].discord_bot = bot
+        try:
+            await bot.start(DISCORD_TOKEN)
+        finally:
+            if not bot.is_closed():
+                await bot.close()
+
     try:
-        await asyncio.gather(
-            twitch_bot.start(),            # Démarrage Twitch
-            discord_bot.start(DISCORD_TOKEN) # Démarrage Discord
-        )
+        # 1. Bot Twitch en premier : la modération doit être active au plus vite
+        superviseur.lancer("twitch", lancer_twitch)
+        with timer.phase("connexion IRC"):
+            await asyncio.sleep(0)
+            try:
+                await asyncio.wait_for(bots["twitch"].pret.wait(), timeout=ATTENTE_IRC_MAX_S)
+            except asyncio.TimeoutError:
+                print("⚠️ [TWITCH] Connexion IRC lente, démarrage de Discord quand même")
+
+        # 2. Discord ensuite (import paresseux : discord.py n'est pas chargé sans token)
+        if not DISCORD_TOKEN:
+            print("⚠️ [DISCORD] Pas de DISCORD_TOKEN trouvé dans .env : le bot Twitch tourne seul.")
+        else:
+            with timer.phase("import discord"):
+                importlib.import_module("discord_client")
+            superviseur.lancer("discord", lancer_discord)
+
+        print("🚀 Ryosa démarrée (Twitch" + (" + Discord)" if DISCORD_TOKEN else ")"))
+        await superviseur.attendre()
     except KeyboardInterrupt:
         # En cas d'arrêt manuel (Ctrl+C)
         print("🛑 Arrêt demandé...")
     finally:
-        # Nettoyage propre
-        if not discord_bot.is_closed():
-            await discord_bot.close()
-        # Le bot Twitch se ferme généralement tout seul via le signal, 
-        # mais on peut forcer un save si besoin.
+        # Nettoyage propre (chaque bot se ferme et sauvegarde son état)
+        await superviseur.arreter()
+        await bus.close()
+        await http_client.close()
 
 if __name__ == "__main__":
+    erreurs = verifier_config()
+    if erreurs:
+        print("❌ [ERREUR] " + " / ".join(erreurs))
+        sys.exit(1)
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
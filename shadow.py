@@ -0,0 +1,226 @@
+"""
+Évaluation fantôme (dry-run) de règles candidates sur le chat en direct
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Une version candidate des règles (data/rules_candidate.json, écrite par le
+dashboard) est évaluée sur chaque message en parallèle de la version active,
+sans aucune sanction. Le Moderator se contente de déposer le message dans une
+file (put_nowait) : l'évaluation se fait par lots dans un pool de workers,
+hors du chemin critique. Chaque viewer est toujours traité par le même worker
+(son historique de flood n'est partagé avec personne).
+
+Le rapport (data/shadow_report.json) liste les divergences : messages que la
+candidate attraperait en plus ("attrape") ou laisserait passer ("libere"),
+ainsi que le coût ajouté par la candidate. Les deux versions passent par
+rules.evaluer, la fonction qu'utilise le Moderator : l'âge du compte, les
+doublons et la liste noire ne dépendent pas des règles et ne sont pas comparés.
+"""
+
+import asyncio
+import json
+import os
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, asdict
+from config import (
+    SHADOW_CANDIDATE_FILE, SHADOW_REPORT_FILE, SHADOW_WORKERS,
+    SHADOW_QUEUE_SIZE, SHADOW_BATCH, SHADOW_VIEWERS_MAX, SHADOW_REPORT_S, SHADOW_EXAMPLES_MAX
+)
+from rules import RuleSet, Faits, compiler, evaluer
+
+# Version factice des règles candidates (jamais dans l'historique)
+VERSION_CANDIDATE = -1
+
+
+@dataclass(frozen=True)
+class Divergence:
+    date: float
+    auteur: str
+    message: str
+    actif: str | None
+    candidat: str | None
+    sens: str  # "attrape" ou "libere"
+
+
+class _Worker:
+    """État propre à un worker (aucun partage entre threads)."""
+    __slots__ = ("file", "flood", "generation", "evalues", "attrape", "libere", "actif_ns", "candidat_ns")
+
+    def __init__(self):
+        self.file = asyncio.Queue(maxsize=SHADOW_QUEUE_SIZE)
+        self.flood = {}  # {clé viewer: deque d'horodatages}
+        self.reinitialiser(0)
+
+    def reinitialiser(self, generation: int):
+        self.generation = generation
+        self.flood.clear()
+        self.evalues = 0
+        self.attrape = 0
+        self.libere = 0
+        self.actif_ns = 0
+        self.candidat_ns = 0
+
+
+class EvaluateurOmbre:
+    """Pool de workers qui compare la version candidate des règles à la version active."""
+
+    def __init__(self, moderator, fichier: str = SHADOW_CANDIDATE_FILE):
+        self.moderator = moderator
+        self.fichier = fichier
+        self.candidat = None
+        self.ignores = 0  # Messages non évalués (file pleine)
+        self.divergences = deque(maxlen=SHADOW_EXAMPLES_MAX)
+        self._workers = [_Worker() for _ in range(max(1, SHADOW_WORKERS))]
+        self._mtime = None
+        self._depuis = time.time()
+        self._generation = 0  # Incrémentée à chaque nouvelle candidate
+        self._taches = []
+
+    # ─────────────────────────── CHEMIN CRITIQUE ───────────────────────────
+
+    def soumettre(self, cle: str, auteur: str, faits: Faits):
+        """Dépose le message pour évaluation (ne bloque jamais ; ignoré si la file est pleine)."""
+        if self.candidat is None:
+            return
+        worker = self._workers[zlib.crc32(cle.encode()) % len(self._workers)]
+        try:
+            worker.file.put_nowait((cle, auteur, faits, time.time()))
+        except asyncio.QueueFull:
+            self.ignores += 1
+
+    # ─────────────────────────── WORKERS ───────────────────────────
+
+    async def start(self):
+        if self._taches:
+            return
+        await self._charger_candidat()
+        self._taches = [asyncio.create_task(self._travailler(w)) for w in self._workers]
+        self._taches.append(asyncio.create_task(self._surveiller()))
+
+    async def stop(self):
+        for tache in self._taches:
+            tache.cancel()
+        await asyncio.gather(*self._taches, return_exceptions=True)
+        self._taches = []
+
+    async def _travailler(self, worker: _Worker):
+        while True:
+            lot = [await worker.file.get()]
+            while len(lot) < SHADOW_BATCH and not worker.file.empty():
+                lot.append(worker.file.get_nowait())
+            candidat = self.candidat
+            if candidat is None:
+                continue
+            if worker.generation != self._generation:
+                # Nouvelle candidate : remise à zéro par le worker lui-même (pas de thread en cours)
+                worker.reinitialiser(self._generation)
+            try:
+                await asyncio.to_thread(self._evaluer_lot, worker, lot, self.moderator.regles.actif, candidat)
+            except Exception as e:
+                print(f"[SHADOW] Erreur évaluation: {e}")
+
+    def _evaluer_lot(self, worker: _Worker, lot: list, actif: RuleSet, candidat: RuleSet):
+        # Assez d'historique pour la plus exigeante des deux versions
+        taille = max(actif.flood_max_msg, candidat.flood_max_msg) + 1
+        if len(worker.flood) > SHADOW_VIEWERS_MAX:
+            # Oubli des viewers inactifs (au-delà de la plus longue fenêtre de flood)
+            limite = time.time() - max(actif.flood_window_s, candidat.flood_window_s)
+            worker.flood = {c: h for c, h in worker.flood.items() if h and h[-1] >= limite}
+        for cle, auteur, faits, date in lot:
+            historique = worker.flood.get(cle)
+            if historique is None or historique.maxlen != taille:
+                historique = worker.flood[cle] = deque(historique or (), maxlen=taille)
+            historique.append(date)
+
+            debut = time.perf_counter_ns()
+            verdict_actif = evaluer(actif, faits, historique, date)
+            milieu = time.perf_counter_ns()
+            verdict_candidat = evaluer(candidat, faits, historique, date)
+            worker.actif_ns += milieu - debut
+            worker.candidat_ns += time.perf_counter_ns() - milieu
+            worker.evalues += 1
+
+            if (verdict_actif is None) == (verdict_candidat is None):
+                continue
+            sens = "attrape" if verdict_candidat else "libere"
+            if sens == "attrape":
+                worker.attrape += 1
+            else:
+                worker.libere += 1
+            self.divergences.append(Divergence(
+                date, auteur, faits.contenu[:200],
+                verdict_actif[0] if verdict_actif else None,
+                verdict_candidat[0] if verdict_candidat else None, sens
+            ))
+
+    # ─────────────────────────── CANDIDATE ───────────────────────────
+
+    async def _charger_candidat(self):
+        """(Re)charge la candidate quand le fichier change. Fichier absent = évaluation désactivée."""
+        mtime = os.path.getmtime(self.fichier) if os.path.exists(self.fichier) else None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        candidat = None
+        if mtime is not None:
+            try:
+                def lire():
+                    with open(self.fichier, "r", encoding="utf-8") as f:
+                        return compiler(json.load(f)["regles"], VERSION_CANDIDATE)
+                candidat = await asyncio.to_thread(lire)
+            except Exception as e:
+                print(f"[SHADOW] ⚠️ Règles candidates invalides, évaluation désactivée: {e}")
+        # Nouvelle candidate : on repart de zéro
+        self.candidat = candidat
+        self.ignores = 0
+        self.divergences.clear()
+        self._depuis = time.time()
+        self._generation += 1
+        for worker in self._workers:
+            while not worker.file.empty():
+                worker.file.get_nowait()
+        print(f"[SHADOW] {'✅ Évaluation des règles candidates' if candidat else 'Évaluation fantôme désactivée'}")
+
+    async def _surveiller(self):
+        while True:
+            await asyncio.sleep(SHADOW_REPORT_S)
+            try:
+                await self._charger_candidat()
+                if self.candidat is not None:
+                    await asyncio.to_thread(self._ecrire_rapport, self.rapport())
+            except Exception as e:
+                print(f"[SHADOW] Erreur: {e}")
+
+    # ─────────────────────────── RAPPORT ───────────────────────────
+
+    def rapport(self) -> dict:
+        # Workers pas encore remis à zéro depuis la nouvelle candidate : exclus
+        workers = [w for w in self._workers if w.generation == self._generation]
+        evalues = sum(w.evalues for w in workers)
+        actif_ns = sum(w.actif_ns for w in workers)
+        candidat_ns = sum(w.candidat_ns for w in workers)
+
+        def moyenne_us(total_ns: int) -> float:
+            return round(total_ns / evalues / 1000, 2) if evalues else 0.0
+
+        return {
+            "actif": self.candidat is not None,
+            "version_active": self.moderator.regles.actif.version,
+            "depuis": self._depuis,
+            "evalues": evalues,
+            "ignores": self.ignores,
+            "attrape": sum(w.attrape for w in workers),
+            "libere": sum(w.libere for w in workers),
+            "cout_actif_us": moyenne_us(actif_ns),
+            "cout_candidat_us": moyenne_us(candidat_ns),
+            "latence_ajoutee_us": moyenne_us(candidat_ns - actif_ns),
+            "divergences": [asdict(d) for d in list(self.divergences)],
+        }
+
+    def _ecrire_rapport(self, rapport: dict):
+        os.makedirs(os.path.dirname(SHADOW_REPORT_FILE) or ".", exist_ok=True)
+        tmp = SHADOW_REPORT_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rapport, f, ensure_ascii=False)
+        os.replace(tmp, SHADOW_REPORT_FILE)
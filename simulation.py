@@ -0,0 +1,1032 @@
+"""
+Simulation du bot complet : horloge virtuelle, faux Twitch et faux Discord
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Rejoue des scénarios scriptés (stream de 10 h, raid, panne de l'API) sur le
+vrai Bot (Moderator, StreamAnnouncer, ChatAlerter, ViewerStats...) en
+quelques secondes, sans aucun service en ligne :
+  - boucle asyncio à temps virtuel : quand plus rien n'est prêt, l'horloge
+    saute directement à la prochaine échéance (un asyncio.sleep(3600) est
+    instantané). time.time() et time.monotonic() suivent cette horloge ;
+    perf_counter reste réel pour mesurer le coût du bot lui-même ;
+  - faux serveurs en mémoire branchés à la place de la session HTTP (Helix,
+    OAuth, webhooks Discord) et de la connexion IRC, avec latence et pannes
+    scriptées. Le bot n'utilise pas EventSub (live détecté par polling
+    Helix) : seules les routes réellement appelées existent ;
+  - chaque scénario produit des vérifications et un rapport de performance
+    (accélération, latence par message, coût par règle, requêtes par route).
+
+Les entrées (viewers, messages, instants) sont tirées d'une graine fixe. Les
+routines TwitchIO calculent leur attente sur l'heure réelle : leurs ticks
+peuvent glisser de quelques millisecondes d'une exécution à l'autre.
+
+Usage : python simulation.py [-v] [stream_10h] [raid] [panne_api]
+"""
+
+import asyncio
+import contextlib
+import importlib
+import io
+import itertools
+import os
+import random
+import selectors
+import sys
+import tempfile
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import aiohttp
+
+# Lundi soir (heatmap, dates de follow...)
+DEBUT = datetime(2026, 1, 5, 18, 0, tzinfo=timezone.utc).timestamp()
+
+# Variables lues par config.py à son import (forcées : aucun vrai secret n'est utilisé)
+ENVIRONNEMENT = {
+    "TWITCH_TOKEN": "oauth:simulation",
+    "TWITCH_NICK": "ryosachii_sim",
+    "TWITCH_CHANNEL": "lacabane_sim",
+    "TWITCH_CLIENT_ID": "simulation",
+    "TWITCH_CLIENT_SECRET": "simulation",
+    "TWITCH_BOT_ID": "1",
+    "TWITCH_REFRESH_TOKEN": "simulation",
+    "DISCORD_WEBHOOK_URL": "https://discord.com/api/webhooks/1/logs",
+    "DISCORD_ANNOUNCE_URL": "https://discord.com/api/webhooks/2/annonces",
+    "DISCORD_ANNOUNCE_EXTRA_URLS": "",
+    "DISCORD_ANNOUNCE_CHANNEL_IDS": "",
+    "DISCORD_LOG_CHANNEL_ID": "",
+    "DISCORD_TOKEN": "",
+}
+
+CATEGORIES = {"Just Chatting": "509658", "Minecraft": "27471"}
+
+# Messages courts (sous DUPLICATE_MIN_LENGTH) : un chat normal ne déclenche rien
+PHRASES = (
+    "salut tout le monde", "gg", "trop fort", "mdr", "lol", "Kappa", "PogChamp",
+    "bien joué !", "ahah", "let's go", "bonne soirée", "quelle musique ?", "hype",
+    "LUL", "<3", "GG WP", "on y croit", "quelle action", "allez allez", "oh non",
+    "bravo", "incroyable", "coucou", "re", "wow",
+)
+COMMANDES = ("!points", "!mytime", "!uptime", "!ping")
+SALUTS_RAID = ("RAID <3", "coucou !", "hello hello", "on arrive !", "bonsoir", "<3 <3")
+SPAM = (
+    "best viewers on streamboo .com",
+    "cheap viewers here https://cheap-viewers.xyz",
+    "salut regarde https://bit.ly/3xYz9q",
+    "wanna become famous? https://tinyurl.com/fam3",
+)
+
+
+class PanneSimulee(Exception):
+    """Appel Helix (TwitchIO) pendant une panne scriptée."""
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                              HORLOGE VIRTUELLE
+# ══════════════════════════════════════════════════════════════════════════════
+
+class _SelecteurVirtuel:
+    """Sélecteur qui n'attend jamais : il avance l'horloge jusqu'à la prochaine échéance."""
+
+    def __init__(self, selecteur, boucle):
+        self._selecteur = selecteur
+        self._boucle = boucle
+
+    def select(self, timeout=None):
+        if timeout == 0:
+            return self._selecteur.select(0)
+        if self._boucle.en_vol:
+            # Un thread (asyncio.to_thread) travaille : attente réelle, l'horloge ne bouge pas
+            return self._selecteur.select(None)
+        evenements = self._selecteur.select(0)
+        if not evenements:
+            if timeout is None:
+                raise RuntimeError("simulation bloquée : plus aucune tâche ni échéance")
+            self._boucle.avancer(timeout)
+        return evenements
+
+    def __getattr__(self, nom):
+        return getattr(self._selecteur, nom)
+
+
+class BoucleVirtuelle(asyncio.SelectorEventLoop):
+    """Boucle asyncio dont l'heure est virtuelle (secondes depuis le début de la simulation)."""
+
+    def __init__(self, debut: float = DEBUT):
+        super().__init__(selectors.DefaultSelector())
+        self._selector = _SelecteurVirtuel(self._selector, self)
+        self.debut = debut
+        self.virtuel = 0.0
+        self.en_vol = 0  # Tâches en cours dans des threads
+        self.executeur = ThreadPoolExecutor(max_workers=4)
+        self.set_default_executor(self.executeur)
+
+    def time(self) -> float:
+        return self.virtuel
+
+    def maintenant(self) -> float:
+        """Remplace time.time() pendant la simulation."""
+        return self.debut + self.virtuel
+
+    def avancer(self, secondes: float):
+        self.virtuel += secondes
+
+    def run_in_executor(self, executor, func, *args):
+        futur = super().run_in_executor(executor, func, *args)
+        self.en_vol += 1
+        futur.add_done_callback(self._thread_termine)
+        return futur
+
+    def _thread_termine(self, _futur):
+        self.en_vol -= 1
+
+
+@contextlib.contextmanager
+def _horloge_virtuelle(boucle: BoucleVirtuelle):
+    originaux = time.time, time.monotonic
+    time.time, time.monotonic = boucle.maintenant, boucle.time
+    try:
+        yield
+    finally:
+        time.time, time.monotonic = originaux
+
+
+class Journal(io.TextIOBase):
+    """Sortie du bot capturée ligne par ligne (recopiée sur `echo` si fourni)."""
+
+    def __init__(self, echo=None):
+        self.lignes = []
+        self.echo = echo
+        self._reste = ""
+
+    def write(self, texte: str) -> int:
+        if self.echo:
+            self.echo.write(texte)
+        *completes, self._reste = (self._reste + texte).split("\n")
+        self.lignes.extend(ligne for ligne in completes if ligne)
+        return len(texte)
+
+    def contenant(self, motif: str) -> list[str]:
+        return [ligne for ligne in self.lignes if motif in ligne]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                              FAUX SERVEURS HTTP
+# ══════════════════════════════════════════════════════════════════════════════
+
+class FausseReponse:
+    """Réponse au format aiohttp (status, headers, content_type, json(), text())."""
+
+    def __init__(self, status: int, donnees=None, headers: dict | None = None):
+        self.status = status
+        self.headers = headers or {}
+        self.content_type = "application/json" if donnees is not None else "text/plain"
+        self._donnees = donnees
+
+    async def json(self):
+        return self._donnees
+
+    async def text(self) -> str:
+        return "" if self._donnees is None else str(self._donnees)
+
+
+class _Requete:
+    """`async with session.request(...) as resp` : la requête part à l'entrée du bloc."""
+
+    def __init__(self, sim, methode: str, url: str, options: dict):
+        self.sim = sim
+        self.methode = methode.upper()
+        self.url = url
+        self.options = options
+
+    async def __aenter__(self) -> FausseReponse:
+        return await self.sim.http(self.methode, self.url, self.options)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FausseSession:
+    """Remplace la session aiohttp partagée (HttpClient.session)."""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.closed = False
+
+    def request(self, methode: str, url: str, **options) -> _Requete:
+        return _Requete(self.sim, methode, url, options)
+
+    def get(self, url: str, **options) -> _Requete:
+        return self.request("GET", url, **options)
+
+    def post(self, url: str, **options) -> _Requete:
+        return self.request("POST", url, **options)
+
+    async def close(self):
+        self.closed = True
+
+
+class FauxServeur:
+    """Serveur en mémoire : latence et panne scriptables, routes {(méthode, chemin): fonction}."""
+
+    def __init__(self, sim, latence: float):
+        self.sim = sim
+        self.latence = latence  # Secondes virtuelles par requête
+        self.panne = None  # None, code HTTP (ex: 503) ou "reseau"
+        self.routes = {}
+
+    def route(self, methode: str, chemin: str):
+        return self.routes.get((methode, chemin))
+
+    async def traiter(self, methode: str, chemin: str, options: dict) -> FausseReponse:
+        if self.latence:
+            await asyncio.sleep(self.latence)
+        if self.panne == "reseau":
+            raise aiohttp.ClientConnectionError("connexion refusée (simulation)")
+        if self.panne:
+            return FausseReponse(self.panne, {"error": "Service Unavailable", "status": self.panne})
+        fonction = self.route(methode, chemin)
+        if fonction is None:
+            return FausseReponse(404, {"error": "Not Found", "status": 404})
+        return fonction(options)
+
+
+class Compte:
+    """Compte Twitch du faux monde."""
+    __slots__ = ("id", "login", "cree_le")
+
+    def __init__(self, user_id: str, login: str, cree_le: float):
+        self.id = user_id
+        self.login = login
+        self.cree_le = cree_le
+
+
+class FauxHelix(FauxServeur):
+    """api.twitch.tv/helix + état de la chaîne (stream, followers, abonnés, bans, réglages du chat)."""
+
+    def __init__(self, sim, latence: float = 0.08):
+        super().__init__(sim, latence)
+        self.comptes = {}  # {login: Compte}
+        self.par_id = {}  # {user_id: Compte}
+        self.stream = None
+        self.chaine = {"title": "Stream de la Cabane", "game_name": "Just Chatting", "game_id": CATEGORIES["Just Chatting"]}
+        self.followers = {}  # {login: followed_at}
+        self.abonnes = {}  # {login: tier}
+        self.bannis = {}  # {user_id: raison}
+        self.timeouts = []  # (user_id, durée)
+        self.supprimes = []  # IDs de messages
+        self.reglages = {"follower_mode": False, "follower_mode_duration": None,
+                         "slow_mode": False, "slow_mode_wait_time": None}
+        self.historique_reglages = []  # Chaque PATCH reçu
+        self.routes = {
+            ("GET", "/helix/chat/chatters"): self._chatters,
+            ("POST", "/helix/moderation/bans"): self._ban,
+            ("DELETE", "/helix/moderation/chat"): self._supprimer,
+            ("GET", "/helix/chat/settings"): self._lire_reglages,
+            ("PATCH", "/helix/chat/settings"): self._modifier_reglages,
+            ("GET", "/helix/channels/followers"): self._followers,
+            ("GET", "/helix/subscriptions"): self._abonnements,
+        }
+
+    # ─────────────────────────── MONDE ───────────────────────────
+
+    def creer_compte(self, login: str, user_id: str, age_jours: float) -> Compte:
+        compte = Compte(user_id, login, time.time() - age_jours * 86400)
+        self.comptes[login] = self.par_id[user_id] = compte
+        return compte
+
+    @staticmethod
+    def _page(lignes: list, options: dict, defaut: int = 20) -> tuple[list, dict]:
+        params = options.get("params") or {}
+        debut = int(params.get("after") or 0)
+        fin = debut + int(params.get("first") or defaut)
+        return lignes[debut:fin], ({"cursor": str(fin)} if fin < len(lignes) else {})
+
+    # ─────────────────────────── ROUTES ───────────────────────────
+
+    def _chatters(self, options):
+        presents = [chatter.compte for chatter in self.sim.membres.values()]
+        page, pagination = self._page(presents, options, 100)
+        data = [{"user_id": c.id, "user_login": c.login, "user_name": c.login} for c in page]
+        return FausseReponse(200, {"data": data, "pagination": pagination, "total": len(presents)})
+
+    def _ban(self, options):
+        data = (options.get("json") or {}).get("data", {})
+        compte = self.par_id.get(str(data.get("user_id")))
+        if compte is None:
+            return FausseReponse(400, {"error": "Bad Request", "message": "user_id not found"})
+        if data.get("duration"):
+            self.timeouts.append((compte.id, data["duration"]))
+        elif compte.id in self.bannis:
+            return FausseReponse(400, {"error": "Bad Request", "message": "The user specified is already banned."})
+        else:
+            self.bannis[compte.id] = data.get("reason", "")
+            self.sim.membres.pop(compte.login, None)
+        return FausseReponse(200, {"data": [{"user_id": compte.id, "end_time": None}]})
+
+    def _supprimer(self, options):
+        self.supprimes.append((options.get("params") or {}).get("message_id"))
+        return FausseReponse(204)
+
+    def _lire_reglages(self, options):
+        return FausseReponse(200, {"data": [dict(self.reglages)]})
+
+    def _modifier_reglages(self, options):
+        modifs = options.get("json") or {}
+        self.reglages.update(modifs)
+        self.historique_reglages.append(dict(modifs))
+        return FausseReponse(200, {"data": [dict(self.reglages)]})
+
+    def _followers(self, options):
+        recents = sorted(self.followers.items(), key=lambda f: f[1], reverse=True)
+        page, pagination = self._page(recents, options)
+        data = [{"user_id": self.comptes[login].id, "user_login": login, "user_name": login,
+                 "followed_at": datetime.fromtimestamp(date, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+                for login, date in page]
+        return FausseReponse(200, {"data": data, "pagination": pagination, "total": len(recents)})
+
+    def _abonnements(self, options):
+        page, pagination = self._page(list(self.abonnes.items()), options)
+        data = [{"user_id": self.comptes[login].id, "user_login": login, "user_name": login,
+                 "tier": tier, "is_gift": False} for login, tier in page]
+        return FausseReponse(200, {"data": data, "pagination": pagination, "total": len(self.abonnes)})
+
+    # ─────────────────────────── APPELS TWITCHIO (fetch_*) ───────────────────────────
+
+    def streams(self) -> list:
+        if self.stream is None:
+            return []
+        return [SimpleNamespace(**self.stream, viewer_count=len(self.sim.membres))]
+
+    def utilisateurs(self, noms=None, ids=None) -> list:
+        comptes = [self.comptes.get(n.lower()) for n in noms or ()] + [self.par_id.get(str(i)) for i in ids or ()]
+        return [SimpleNamespace(id=int(c.id), name=c.login, display_name=c.login,
+                                created_at=datetime.fromtimestamp(c.cree_le, timezone.utc))
+                for c in comptes if c is not None]
+
+    def chaines(self, ids) -> list:
+        return [SimpleNamespace(broadcaster_id=i, **self.chaine) for i in ids]
+
+    def jeux(self, ids=None, noms=None) -> list:
+        return [SimpleNamespace(id=game_id, name=nom,
+                                box_art_url=f"https://static-cdn.jtvnw.net/ttv-boxart/{game_id}-{{width}}x{{height}}.jpg")
+                for nom, game_id in CATEGORIES.items()
+                if (ids and int(game_id) in ids) or (noms and nom in noms)]
+
+
+class FauxOAuth(FauxServeur):
+    """id.twitch.tv : validation et refresh du token (durée de vie de 4 h, comme Twitch)."""
+    DUREE = 4 * 3600
+
+    def __init__(self, sim, scopes: list[str], latence: float = 0.05):
+        super().__init__(sim, latence)
+        self.scopes = scopes
+        self.expire_le = time.time() + self.DUREE
+        self.validations = 0
+        self.refresh = 0
+        self.routes = {
+            ("GET", "/oauth2/validate"): self._valider,
+            ("POST", "/oauth2/token"): self._rafraichir,
+        }
+
+    def _valider(self, options):
+        self.validations += 1
+        restant = int(self.expire_le - time.time())
+        if restant <= 0:
+            return FausseReponse(401, {"status": 401, "message": "invalid access token"})
+        return FausseReponse(200, {"client_id": "simulation", "login": self.sim.irc.nick, "user_id": "1",
+                                   "scopes": self.scopes, "expires_in": restant})
+
+    def _rafraichir(self, options):
+        self.refresh += 1
+        self.expire_le = time.time() + self.DUREE
+        return FausseReponse(200, {"access_token": f"simulation{self.refresh}", "refresh_token": "simulation",
+                                   "expires_in": self.DUREE, "scope": self.scopes, "token_type": "bearer"})
+
+
+class FauxDiscord(FauxServeur):
+    """discord.com : webhooks (annonces et logs), réponse 204 comme sans ?wait=true."""
+
+    def __init__(self, sim, urls_annonces: list[str], latence: float = 0.12):
+        super().__init__(sim, latence)
+        self.chemins_annonces = {url.split("discord.com", 1)[-1] for url in urls_annonces}
+        self.annonces = []  # (t, payload)
+        self.logs = []  # (t, texte)
+
+    def route(self, methode, chemin):
+        if methode == "POST" and chemin.startswith("/api/webhooks/"):
+            return lambda options: self._webhook(chemin, options)
+        return None
+
+    def _webhook(self, chemin, options):
+        payload = options.get("json") or {}
+        if chemin in self.chemins_annonces:
+            self.annonces.append((time.time(), payload))
+        else:
+            self.logs.append((time.time(), payload.get("content", "")))
+        return FausseReponse(204)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                              FAUX IRC
+# ══════════════════════════════════════════════════════════════════════════════
+
+class FauxIRC:
+    """Connexion IRC vue par TwitchIO : cache des salons (`_cache`) et envoi des PRIVMSG."""
+
+    def __init__(self, nick: str):
+        self.nick = nick
+        self._cache = {}  # {salon: viewers présents}, lu par Context pour le quota des modérateurs
+        self.envoyes = []  # (t, salon, texte)
+        self.bannis = set()  # Logins bannis par /ban (repli IRC)
+
+    async def send(self, brut: str):
+        """'PRIVMSG #salon :texte' (envoi de Context.send)."""
+        entete, _, texte = brut.rstrip("\r\n").partition(" :")
+        self.envoyer(entete.split("#", 1)[-1], texte)
+
+    def envoyer(self, salon: str, texte: str):
+        self.envoyes.append((time.time(), salon, texte))
+        if texte.startswith("/ban "):
+            self.bannis.add(texte.split()[1].lower())
+
+    def textes(self, prefixe: str = "") -> list[str]:
+        return [texte for _, _, texte in self.envoyes if texte.startswith(prefixe)]
+
+
+class FauxCanal:
+    """Salon IRC (channel.send, channel.chatters)."""
+    __messageable_channel__ = True
+
+    def __init__(self, irc: FauxIRC, nom: str):
+        self._irc = irc
+        self.name = self._name = nom
+
+    @property
+    def chatters(self):
+        return list(self._irc._cache[self.name])
+
+    async def send(self, contenu: str):
+        self._irc.envoyer(self.name, contenu)
+
+
+class FauxChatter:
+    """Viewer vu par IRC : comme avec TwitchIO, son ID n'est connu qu'une fois qu'il a parlé."""
+
+    def __init__(self, irc: FauxIRC, compte: Compte, mod: bool = False, broadcaster: bool = False):
+        self._ws = irc
+        self.compte = compte
+        self.name = self.display_name = compte.login
+        self.is_mod = mod
+        self.is_broadcaster = broadcaster
+        self.is_subscriber = False
+        self.a_parle = False
+
+    @property
+    def id(self) -> str | None:
+        return self.compte.id if self.a_parle else None
+
+
+class FauxMessage:
+    """Message du chat au format TwitchIO."""
+    echo = False
+
+    def __init__(self, contenu: str, auteur: FauxChatter, canal: FauxCanal, message_id: str):
+        self.content = contenu
+        self.author = auteur
+        self.channel = canal
+        self.id = message_id
+        self.timestamp = datetime.fromtimestamp(time.time(), timezone.utc)
+        self.tags = {"id": message_id, "user-id": auteur.compte.id, "display-name": auteur.name}
+
+
+def _classe_bot():
+    """Bot réel branché sur les faux serveurs (import tardif : config lit l'environnement)."""
+    from bot import Bot
+
+    class BotSimule(Bot):
+        def __init__(self, sim, **kwargs):
+            self.sim = sim
+            super().__init__(**kwargs)
+            # Connexion IRC jamais ouverte : ce que Client.close() attend de connect()
+            self._closing = asyncio.Event()
+            self._connection._keeper = asyncio.get_running_loop().create_future()
+
+        @property
+        def nick(self):
+            return self.sim.irc.nick
+
+        @property
+        def connected_channels(self):
+            return [self.sim.canal]
+
+        def get_channel(self, name: str):
+            return self.sim.canal if name.lower() == self.sim.canal.name else None
+
+        async def fetch_streams(self, user_logins=None, **kwargs):
+            return await self.sim.twitchio("fetch_streams", self.sim.helix.streams)
+
+        async def fetch_users(self, names=None, ids=None, **kwargs):
+            return await self.sim.twitchio("fetch_users", self.sim.helix.utilisateurs, names, ids)
+
+        async def fetch_channels(self, broadcaster_ids, **kwargs):
+            return await self.sim.twitchio("fetch_channels", self.sim.helix.chaines, broadcaster_ids)
+
+        async def fetch_games(self, ids=None, names=None, **kwargs):
+            return await self.sim.twitchio("fetch_games", self.sim.helix.jeux, ids, names)
+
+    return BotSimule
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                              SIMULATION
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _centiles(valeurs: list[float]) -> dict:
+    """p50 / p95 / p99 / max en millisecondes."""
+    if not valeurs:
+        return {}
+    tries = sorted(valeurs)
+    resultat = {f"p{p}": round(tries[min(len(tries) - 1, len(tries) * p // 100)] * 1000, 2) for p in (50, 95, 99)}
+    resultat["max"] = round(tries[-1] * 1000, 2)
+    return resultat
+
+
+class Simulation:
+    """Le faux monde (Twitch, Discord, viewers) et les actions d'un scénario."""
+
+    def __init__(self, boucle: BoucleVirtuelle, journal: Journal, graine: int = 0):
+        import config
+        if not (config.TWITCH_CHANNEL and config.TWITCH_NICK):
+            raise RuntimeError("config importé sans TWITCH_CHANNEL / TWITCH_NICK : lancer via executer()")
+        self.config = config
+        self.boucle = boucle
+        self.journal = journal
+        self.rng = random.Random(graine)
+        self.irc = FauxIRC(config.TWITCH_NICK.lower())
+        self.canal = FauxCanal(self.irc, config.TWITCH_CHANNEL.lower())
+        self.membres = {}  # {login: FauxChatter} présents dans le chat
+        self.irc._cache[self.canal.name] = self.membres.values()
+        self.helix = FauxHelix(self)
+        self.oauth = FauxOAuth(self, list(config.TWITCH_REQUIRED_SCOPES) + ["channel:read:subscriptions"])
+        self.discord = FauxDiscord(self, config.DISCORD_ANNOUNCE_URLS)
+        self.serveurs = {"api.twitch.tv": self.helix, "id.twitch.tv": self.oauth, "discord.com": self.discord}
+        self.requetes = Counter()  # {"GET api.twitch.tv/helix/...": n}
+        self.erreurs_http = Counter()
+        self.messages = 0
+        self.auteurs = set()  # Logins qui ont écrit au moins une fois
+        self.latences_virtuelles = []
+        self.latences_reelles = []
+        self.erreurs = []  # Exceptions non gérées (tâches, event_message)
+        self.verifications = []
+        self.bot = None
+        self._ids = itertools.count(100000)
+        self._messages_ids = itertools.count(1)
+        self._taches = set()
+        self.helix.creer_compte(self.irc.nick, "1", 900)
+        self.helix.creer_compte(self.canal.name, "1000", 2000)
+
+    # ─────────────────────────── CYCLE DE VIE ───────────────────────────
+
+    async def demarrer(self):
+        """Crée le bot sur les faux serveurs et attend la fin de son démarrage."""
+        from event_bus import EventBus
+        from http_client import HttpClient
+        http = HttpClient()
+        http.session = FausseSession(self)
+        self.bot = _classe_bot()(self, http_client=http, bus=EventBus(), etat={})
+        self._entrer(self.irc.nick, mod=True)
+        self._entrer(self.canal.name, broadcaster=True)
+        # Ce que Bot.start() fait avant la connexion IRC (jamais ouverte ici)
+        await self.bot._avant_connexion()
+        await self.bot.event_ready()
+        await self.bot._demarrage
+
+    async def arreter(self):
+        await self.bot.close()
+        await asyncio.gather(*self._taches, return_exceptions=True)
+        # Routines des cogs (jamais déchargés par close()) et tâches orphelines
+        restantes = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for tache in restantes:
+            tache.cancel()
+        await asyncio.gather(*restantes, return_exceptions=True)
+
+    def exception(self, boucle, contexte: dict):
+        """Gestionnaire d'exceptions de la boucle : toute erreur non gérée est un échec."""
+        erreur = contexte.get("exception")
+        self.erreurs.append(contexte.get("message", "") + (f" : {erreur!r}" if erreur else ""))
+        boucle.default_exception_handler(contexte)
+
+    def _lancer(self, coro):
+        """Tâche de fond gardée en référence (comme les événements de TwitchIO)."""
+        tache = asyncio.get_running_loop().create_task(coro)
+        self._taches.add(tache)
+        tache.add_done_callback(self._taches.discard)
+
+    # ─────────────────────────── HTTP ───────────────────────────
+
+    async def http(self, methode: str, url: str, options: dict) -> FausseReponse:
+        """Routage de la fausse session vers le serveur de l'hôte."""
+        hote, _, chemin = url.split("://", 1)[-1].partition("/")
+        chemin = "/" + chemin.split("?", 1)[0]
+        cle = f"{methode} {hote}{chemin}"
+        self.requetes[cle] += 1
+        serveur = self.serveurs.get(hote)
+        if serveur is None:
+            self.erreurs_http[cle] += 1
+            raise aiohttp.ClientConnectionError(f"hôte inconnu en simulation : {hote}")
+        try:
+            reponse = await serveur.traiter(methode, chemin, options)
+        except aiohttp.ClientError:
+            self.erreurs_http[cle] += 1
+            raise
+        if reponse.status >= 500 or reponse.status == 429:
+            self.erreurs_http[cle] += 1
+        return reponse
+
+    async def twitchio(self, nom: str, fonction, *args):
+        """Appel Helix fait par TwitchIO (fetch_*) : même latence et mêmes pannes que les routes HTTP."""
+        cle = f"twitchio {nom}"
+        self.requetes[cle] += 1
+        if self.helix.latence:
+            await asyncio.sleep(self.helix.latence)
+        if self.helix.panne:
+            self.erreurs_http[cle] += 1
+            raise PanneSimulee(f"Helix indisponible ({self.helix.panne})")
+        return fonction(*args)
+
+    # ─────────────────────────── VIEWERS ───────────────────────────
+
+    def creer_viewers(self, prefixe: str, nb: int, age_jours: float = 700) -> list[str]:
+        """Comptes Twitch (pas encore dans le chat). Retourne leurs logins."""
+        logins = [f"{prefixe}{i:04d}" for i in range(nb)]
+        for login in logins:
+            self.helix.creer_compte(login, str(next(self._ids)), age_jours)
+        return logins
+
+    def suivre(self, logins: list[str]):
+        """Followers de la chaîne (dates de follow tirées sur les 3 dernières années)."""
+        for login in logins:
+            self.helix.followers[login] = time.time() - self.rng.uniform(1, 3 * 365) * 86400
+
+    def abonner(self, logins: list[str], tier: str = "1000"):
+        for login in logins:
+            self.helix.abonnes[login] = tier
+
+    def _entrer(self, login: str, mod: bool = False, broadcaster: bool = False) -> FauxChatter:
+        chatter = self.membres.get(login)
+        if chatter is None:
+            compte = self.helix.comptes.get(login) or self.helix.creer_compte(login, str(next(self._ids)), 700)
+            chatter = self.membres[login] = FauxChatter(self.irc, compte, mod, broadcaster)
+        return chatter
+
+    def est_banni(self, login: str) -> bool:
+        compte = self.helix.comptes.get(login)
+        return login in self.irc.bannis or (compte is not None and compte.id in self.helix.bannis)
+
+    async def rejoindre(self, logins: list[str], duree: float = 0.0):
+        """Arrivées dans le chat (JOIN IRC + liste Get Chatters), étalées sur `duree` secondes."""
+        pas = duree / len(logins) if logins else 0
+        for login in logins:
+            chatter = self._entrer(login)
+            self._lancer(self.bot.event_join(self.canal, chatter))
+            if pas:
+                await asyncio.sleep(pas)
+
+    def partir(self, logins: list[str]):
+        for login in logins:
+            self.membres.pop(login, None)
+
+    # ─────────────────────────── CHAT ───────────────────────────
+
+    def message(self, login: str, texte: str) -> bool:
+        """Un viewer écrit (traité comme TwitchIO : une tâche par événement). False si banni."""
+        if self.est_banni(login):
+            return False
+        chatter = self._entrer(login)
+        chatter.a_parle = True
+        self.auteurs.add(login)
+        self.messages += 1
+        self._lancer(self._traiter(FauxMessage(texte, chatter, self.canal, f"msg-{next(self._messages_ids)}")))
+        return True
+
+    async def _traiter(self, message: FauxMessage):
+        debut_virtuel, debut_reel = self.boucle.time(), time.perf_counter()
+        try:
+            await self.bot.event_message(message)
+        except Exception as e:
+            self.erreurs.append(f"event_message({message.content!r}) : {e!r}")
+            traceback.print_exc()
+            return
+        self.latences_virtuelles.append(self.boucle.time() - debut_virtuel)
+        self.latences_reelles.append(time.perf_counter() - debut_reel)
+
+    async def chat(self, duree: float, par_minute: float, auteurs: list[str],
+                   textes: tuple = PHRASES, part_commandes: float = 0.03):
+        """Chat aléatoire (arrivées de Poisson) pendant `duree` secondes."""
+        fin = self.boucle.time() + duree
+        while True:
+            await asyncio.sleep(self.rng.expovariate(par_minute / 60))
+            if self.boucle.time() >= fin:
+                return
+            auteur = self.rng.choice(auteurs)
+            if self.rng.random() < part_commandes:
+                self.message(auteur, self.rng.choice(COMMANDES))
+            else:
+                self.message(auteur, self.rng.choice(textes))
+
+    def raid(self, de: str, nb: int):
+        """USERNOTICE de raid entrant (les raiders arrivent ensuite via rejoindre())."""
+        self._lancer(self.bot.event_raw_usernotice(
+            self.canal, {"msg-id": "raid", "msg-param-login": de, "msg-param-viewerCount": str(nb)}
+        ))
+
+    # ─────────────────────────── STREAM ET PANNES ───────────────────────────
+
+    async def avancer(self, secondes: float):
+        await asyncio.sleep(secondes)
+
+    def demarrer_stream(self, titre: str, categorie: str = "Just Chatting"):
+        self.helix.chaine.update(title=titre, game_name=categorie, game_id=CATEGORIES[categorie])
+        self.helix.stream = {
+            "id": str(next(self._ids)), "user_name": self.canal.name, "title": titre,
+            "game_name": categorie, "game_id": CATEGORIES[categorie],
+            "started_at": datetime.fromtimestamp(time.time(), timezone.utc),
+            "thumbnail_url": f"https://static-cdn.jtvnw.net/previews-ttv/live_user_{self.canal.name}-{{width}}x{{height}}.jpg",
+        }
+
+    def arreter_stream(self):
+        self.helix.stream = None
+
+    def panne_helix(self, panne: int | str | None = 503):
+        """Helix (HTTP et fetch_* de TwitchIO) répond `panne` (code HTTP ou "reseau") ; None = rétabli."""
+        self.helix.panne = panne
+        print(f"[SIMU] Helix : {'panne ' + str(panne) if panne else 'rétabli'}")
+
+    # ─────────────────────────── RAPPORT ───────────────────────────
+
+    @property
+    def stats_viewers(self):
+        return self.bot.cogs.get("ViewerStats")
+
+    def verifier(self, nom: str, condition: bool, detail: str = ""):
+        self.verifications.append({"nom": nom, "ok": bool(condition), "detail": detail})
+
+    def rapport(self, duree_reelle: float) -> dict:
+        virtuel = self.boucle.time()
+        tracebacks = self.journal.contenant("Traceback")
+        stats = self.stats_viewers
+        return {
+            "duree_virtuelle_s": round(virtuel),
+            "duree_reelle_s": round(duree_reelle, 2),
+            "acceleration": round(virtuel / max(duree_reelle, 1e-9)),
+            "messages": self.messages,
+            "debit_msg_s": round(self.messages / max(duree_reelle, 1e-9)),
+            "latence_ms": {"virtuelle": _centiles(self.latences_virtuelles),
+                           "reelle": _centiles(self.latences_reelles)},
+            "requetes": dict(sorted(self.requetes.items())),
+            "erreurs_http": dict(sorted(self.erreurs_http.items())),
+            "discord": {"annonces": len(self.discord.annonces), "logs": len(self.discord.logs)},
+            "irc": {"envoyes": len(self.irc.envoyes), "bans": len(self.irc.bannis)},
+            "moderation": {"bans": len(self.helix.bannis), "timeouts": len(self.helix.timeouts),
+                           "suppressions": len(self.helix.supprimes)},
+            "regles": self.bot.moderator.regles.rapport()["regles"],
+            "presence": dict(stats.presence.cout) if stats else {},
+            "erreurs": self.erreurs + ([f"{len(tracebacks)} traceback(s) dans le journal"] if tracebacks else []),
+            "verifications": list(self.verifications),
+        }
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                              EXÉCUTION
+# ══════════════════════════════════════════════════════════════════════════════
+
+async def _derouler(boucle: BoucleVirtuelle, journal: Journal, scenario, graine: int, options: dict) -> dict:
+    sim = Simulation(boucle, journal, graine)
+    boucle.set_exception_handler(sim.exception)
+    debut = time.perf_counter()
+    await sim.demarrer()
+    try:
+        await scenario(sim, **options)
+    finally:
+        await sim.arreter()
+    rapport = sim.rapport(time.perf_counter() - debut)
+    rapport["scenario"] = scenario.__name__
+    return rapport
+
+
+def executer(scenario, *, graine: int = 0, verbeux: bool = False, **options) -> dict:
+    """
+    Lance `scenario(sim, **options)` dans une boucle à temps virtuel, depuis un
+    dossier de travail temporaire (data/, token, état : rien n'est écrit dans le dépôt).
+    Retourne le rapport (vérifications, performances).
+    """
+    anciens = {nom: os.environ.get(nom) for nom in ENVIRONNEMENT}
+    os.environ.update(ENVIRONNEMENT)
+    from twitchio.abcs import limiter
+    limiter.buckets.clear()  # Quotas IRC datés de l'horloge précédente
+
+    dossier = os.getcwd()
+    journal = Journal(sys.stdout if verbeux else None)
+    boucle = BoucleVirtuelle()
+    try:
+        with tempfile.TemporaryDirectory(prefix="simulation_") as travail, _horloge_virtuelle(boucle), \
+                contextlib.redirect_stdout(journal), contextlib.redirect_stderr(journal):
+            asyncio.set_event_loop(boucle)
+            # Imports depuis le dépôt, avant de changer de dossier. Les cogs sont réimportés :
+            # leurs routines se lient à la boucle courante dès l'import
+            importlib.import_module("bot")
+            for module in ("viewer_stats", "general_commands"):
+                sys.modules.pop(module, None)
+                importlib.import_module(module)
+            os.chdir(travail)
+            try:
+                return boucle.run_until_complete(_derouler(boucle, journal, scenario, graine, options))
+            finally:
+                boucle.run_until_complete(boucle.shutdown_asyncgens())
+                boucle.executeur.shutdown(wait=True)
+                asyncio.set_event_loop(None)
+                os.chdir(dossier)
+    finally:
+        boucle.close()
+        for nom, valeur in anciens.items():
+            if valeur is None:
+                os.environ.pop(nom, None)
+            else:
+                os.environ[nom] = valeur
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#                              SCÉNARIOS
+# ══════════════════════════════════════════════════════════════════════════════
+
+async def stream_10h(sim: Simulation, viewers: int = 1500, heures: float = 10, par_minute: float = 25):
+    """Un long live chargé : annonce, présence, points, messages auto, token rafraîchi."""
+    public = sim.creer_viewers("viewer", viewers)
+    sim.suivre(public[::2])
+    sim.abonner(public[::10])
+    # Arrivées étalées avant le live (bots connus compris, filtrés par la présence)
+    await sim.rejoindre(["nightbot", "streamelements"] + public, duree=40 * 60)
+    sim.demarrer_stream("Marathon de la Cabane")
+    await sim.chat(heures * 3600, par_minute, public[:300])
+    sim.arreter_stream()
+    await sim.avancer(180)
+
+    bot, stats = sim.bot, sim.stats_viewers
+    sim.verifier("annonce_unique", len(sim.discord.annonces) == 1, f"{len(sim.discord.annonces)} annonce(s)")
+    session = (await asyncio.to_thread(bot.sessions.historique.dernieres, 1) or [{}])[0]
+    sim.verifier("session_close", session.get("fin") is not None and (session.get("messages") or 0) > 0,
+                 f"session {session}")
+    fidele = sim.helix.comptes[public[-1]].id  # Arrivé avant le live, jamais parti, ni abonné ni bavard
+    minutes = await bot.fidelite.minutes(fidele)
+    attendu = int(heures * 60)
+    sim.verifier("minutes_viewer_fidele", attendu - 5 <= minutes <= attendu + 5, f"{minutes} min (attendu ~{attendu})")
+    solde = await bot.fidelite.solde(fidele) or {"points": 0}
+    sim.verifier("points_viewer_fidele", solde["points"] >= sim.config.LOYALTY_POINTS_PAR_TICK * minutes,
+                 f"{solde['points']} points pour {minutes} min")
+    auto = len(sim.irc.textes(sim.config.AUTO_MSG_TEXT))
+    sim.verifier("messages_auto", auto >= heures * 3600 / sim.config.AUTO_MSG_INTERVAL * 0.8, f"{auto} messages auto")
+    sim.verifier("aucune_sanction", not (sim.helix.bannis or sim.helix.timeouts or sim.irc.bannis),
+                 f"{len(sim.helix.bannis)} ban(s), {len(sim.helix.timeouts)} timeout(s), {len(sim.irc.bannis)} /ban")
+    cout = stats.presence.cout
+    sim.verifier("presence_helix", cout.get("source") == "helix" and cout.get("pages") == -(-(viewers + 4) // 1000),
+                 f"{cout}")
+    sim.verifier("bots_filtres", not {"nightbot", "streamelements"} & set(stats.presence.presents.values()) and
+                 cout.get("presents") == viewers + 1, f"{cout.get('presents')} présents")
+    sim.verifier("token_rafraichi", sim.oauth.refresh >= int(heures * 3600 // FauxOAuth.DUREE),
+                 f"{sim.oauth.refresh} refresh, {sim.oauth.validations} validations")
+
+
+async def raid(sim: Simulation, habitues: int = 200, raiders: int = 300, vague: int = 60):
+    """Raid légitime (pas de bouclier), puis vague de bots à liens de scam (bouclier + bans Helix)."""
+    sim.demarrer_stream("Soirée entre amis")
+    public = sim.creer_viewers("habitue", habitues)
+    sim.suivre(public)
+    bavards = public[:80]
+    await asyncio.gather(sim.rejoindre(public, duree=10 * 60), sim.chat(20 * 60, 15, bavards))
+
+    amis = sim.creer_viewers("raider", raiders)
+    sim.raid("amie_streameuse", raiders)
+    await asyncio.gather(sim.rejoindre(amis, duree=20), sim.chat(3 * 60, 12, amis, SALUTS_RAID),
+                         sim.chat(3 * 60, 15, bavards))
+    activations = sim.journal.contenant("[SHIELD] 🛡️ Activé")
+    sim.verifier("raid_sans_bouclier", not activations and not sim.bot.raid_shield.actif, f"{activations}")
+
+    bots = sim.creer_viewers("fr33v13wers", vague, age_jours=1)
+    legitimes = bavards + amis[:40]
+    await asyncio.gather(sim.rejoindre(bots, duree=15), sim.chat(40, vague * 2, bots, SPAM, 0),
+                         sim.chat(60, 15, legitimes))
+    sim.verifier("bouclier_active", bool(sim.journal.contenant("[SHIELD] 🛡️ Activé")),
+                 f"{sim.journal.contenant('[SHIELD]')}")
+    await sim.chat(8 * 60, 15, legitimes)
+
+    spammeurs = {sim.helix.comptes[b].id for b in sim.auteurs.intersection(bots)}
+    bannis = set(sim.helix.bannis)
+    sim.verifier("bots_bannis_helix", spammeurs and spammeurs <= bannis and not sim.irc.bannis,
+                 f"{len(bannis & spammeurs)}/{len(spammeurs)} bannis via Helix, {len(sim.irc.bannis)} /ban IRC")
+    legit_ids = {sim.helix.comptes[login].id for login in public + amis}
+    sim.verifier("aucun_legitime_banni", not bannis & legit_ids, f"{len(bannis & legit_ids)} banni(s)")
+    modes = [r.get("follower_mode") for r in sim.helix.historique_reglages if "follower_mode" in r]
+    sim.verifier("follower_mode_restaure", modes[:1] == [True] and modes[-1:] == [False] and
+                 not sim.helix.reglages["follower_mode"], f"PATCH follower_mode : {modes}")
+    sim.verifier("bouclier_desactive", not sim.bot.raid_shield.actif and
+                 bool(sim.journal.contenant("[SHIELD] Désactivé")), f"{sim.journal.contenant('[SHIELD] Désactivé')}")
+
+
+async def panne_api(sim: Simulation, viewers: int = 300, duree_panne: float = 15 * 60):
+    """Helix en 503 pendant le live : replis IRC (ban, présence), pas de double annonce, reprise."""
+    public = sim.creer_viewers("viewer", viewers)
+    bavards = public[:100]
+    await sim.rejoindre(public, duree=10 * 60)
+    sim.demarrer_stream("Live du dimanche")
+    await sim.chat(10 * 60, 20, bavards)
+    presence = sim.stats_viewers.presence
+    sim.verifier("presence_helix_avant", presence.cout.get("source") == "helix", f"{presence.cout}")
+
+    async def spammeur():
+        await sim.avancer(120)
+        sim.message("spam_0ld_account", "best viewers on streamboo .com")
+
+    sim.panne_helix(503)
+    await asyncio.gather(sim.chat(duree_panne, 20, bavards), spammeur())
+    sim.verifier("ban_repli_irc", "spam_0ld_account" in sim.irc.bannis, f"/ban envoyés : {sim.irc.textes('/ban')}")
+    sim.verifier("presence_repli_irc", presence.cout.get("source") == "irc" and presence.cout.get("presents", 0) > 0,
+                 f"{presence.cout}")
+    # IDs repris du relevé Helix précédent : personne ne « part » au passage en IRC
+    sim.verifier("repli_irc_sans_departs", presence.cout.get("partis") == 0, f"{presence.cout}")
+    sim.verifier("toujours_en_live", sim.bot.etat_live.en_live is True, f"en_live={sim.bot.etat_live.en_live}")
+
+    sim.panne_helix(None)
+    await sim.chat(5 * 60, 20, bavards)
+    sim.verifier("presence_helix_apres", presence.cout.get("source") == "helix" and presence.cout.get("arrives") == 0,
+                 f"{presence.cout}")
+    sim.verifier("annonce_unique", len(sim.discord.annonces) == 1, f"{len(sim.discord.annonces)} annonce(s)")
+
+
+async def cooldown_annonce(sim: Simulation):
+    """Annonce au début du live, pas de nouvelle annonce pendant le cooldown (coupure), puis de nouveau après."""
+    cooldown = sim.config.DISCORD_ANNOUNCE_COOLDOWN_S
+    poll = sim.config.POLL_INTERVAL_S
+    sim.demarrer_stream("Premier live")
+    await sim.avancer(3 * poll)
+    sim.verifier("annonce_debut_live", len(sim.discord.annonces) == 1, f"{len(sim.discord.annonces)} annonce(s)")
+    sim.verifier("etat_annonce_sauve", os.path.exists(sim.config.ANNOUNCE_STATE_FILE),
+                 sim.config.ANNOUNCE_STATE_FILE)
+
+    # Toujours en live : aucun nouvel envoi
+    await sim.avancer(10 * poll)
+    sim.verifier("pas_de_reannonce_en_live", len(sim.discord.annonces) == 1, f"{len(sim.discord.annonces)} annonce(s)")
+
+    # Coupure (crash OBS...) puis reprise pendant le cooldown : pas de deuxième annonce
+    sim.arreter_stream()
+    await sim.avancer(3 * poll)
+    sim.demarrer_stream("Premier live (reprise)")
+    await sim.avancer(3 * poll)
+    sim.verifier("cooldown_respecte", len(sim.discord.annonces) == 1 and
+                 bool(sim.journal.contenant("Cooldown actif")), f"{len(sim.discord.annonces)} annonce(s)")
+
+    # Nouveau live une fois le cooldown écoulé : annoncé
+    sim.arreter_stream()
+    await sim.avancer(cooldown)
+    sim.demarrer_stream("Deuxième live")
+    await sim.avancer(3 * poll)
+    sim.verifier("annonce_apres_cooldown", len(sim.discord.annonces) == 2, f"{len(sim.discord.annonces)} annonce(s)")
+
+
+SCENARIOS = {"stream_10h": stream_10h, "raid": raid, "panne_api": panne_api, "cooldown_annonce": cooldown_annonce}
+
+
+def afficher(rapport: dict):
+    """Rapport lisible (console)."""
+    print(f"\n[SIMU] ═══ {rapport['scenario']} : {rapport['duree_virtuelle_s']}s simulées en "
+          f"{rapport['duree_reelle_s']}s (x{rapport['acceleration']}) ═══")
+    print(f"[SIMU] {rapport['messages']} messages ({rapport['debit_msg_s']} msg/s réels)")
+    for nature, centiles in rapport["latence_ms"].items():
+        print(f"[SIMU] Latence par message ({nature}, ms) : "
+              + " / ".join(f"{nom} {valeur}" for nom, valeur in centiles.items()))
+    for route, n in rapport["requetes"].items():
+        erreurs = rapport["erreurs_http"].get(route, 0)
+        print(f"[SIMU]   {route} : {n}" + (f" ({erreurs} en erreur)" if erreurs else ""))
+    print("[SIMU] Règles (coût moyen) : " + ", ".join(
+        f"{nom} {stats['cout_moy_us']}µs x{stats['appels']}" for nom, stats in rapport["regles"].items()))
+    print(f"[SIMU] Présence : {rapport['presence']}")
+    print(f"[SIMU] Discord : {rapport['discord']} | IRC : {rapport['irc']} | Modération : {rapport['moderation']}")
+    for erreur in rapport["erreurs"]:
+        print(f"[SIMU] ❌ Erreur : {erreur}")
+    for v in rapport["verifications"]:
+        print(f"[SIMU] {'✅' if v['ok'] else '❌'} {v['nom']} ({v['detail']})")
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    verbeux = "-v" in arguments
+    noms = [a for a in arguments if a != "-v"] or list(SCENARIOS)
+    echecs = 0
+    for nom in noms:
+        rapport = executer(SCENARIOS[nom], verbeux=verbeux)
+        afficher(rapport)
+        echecs += len(rapport["erreurs"]) + sum(not v["ok"] for v in rapport["verifications"])
+    sys.exit(1 if echecs else 0)
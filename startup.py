@@ -0,0 +1,40 @@
+"""
+Mesure du temps de démarrage par phase
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+    timer = PhaseTimer()
+    with timer.phase("config"):
+        ...
+    timer.rapport()
+"""
+
+import time
+from contextlib import contextmanager
+
+# Référence commune : importé en premier par run.py, c'est ~le lancement du process
+DEBUT_PROCESS = time.perf_counter()
+
+
+class PhaseTimer:
+    """Durée (ms) de chaque phase du démarrage, dans l'ordre."""
+
+    def __init__(self):
+        self.phases = []  # [(nom, durée ms)]
+
+    @contextmanager
+    def phase(self, nom: str):
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.noter(nom, (time.perf_counter() - debut) * 1000)
+
+    def noter(self, nom: str, duree_ms: float):
+        self.phases.append((nom, duree_ms))
+
+    def depuis_lancement_ms(self) -> float:
+        return (time.perf_counter() - DEBUT_PROCESS) * 1000
+
+    def rapport(self, titre: str = "Démarrage"):
+        details = " | ".join(f"{nom} {duree:.0f}ms" for nom, duree in self.phases)
+        print(f"[STARTUP] {titre} : {details} (total depuis lancement {self.depuis_lancement_ms():.0f}ms)")
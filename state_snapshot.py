@@ -0,0 +1,108 @@
+"""
+Sauvegarde / restauration de l'état en mémoire (flood, warns, cache des comptes...)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Chaque composant expose `exporter_etat() -> dict` et `restaurer_etat(dict)`.
+L'état est capturé régulièrement dans la boucle (copies détachées : tuples,
+listes neuves), puis sérialisé en pickle (protocole 5) et écrit de façon
+atomique dans un thread : après un crash, le bot repart avec ses compteurs
+au lieu de tout réapprendre. Lors d'un redémarrage dans le même process, l'état est repris
+directement en mémoire (pas de lecture disque).
+"""
+
+import asyncio
+import os
+import pickle
+import time
+from config import STATE_SNAPSHOT_FILE, STATE_SNAPSHOT_S, STATE_SNAPSHOT_MAX_AGE_S
+
+VERSION = 3
+# Composants du bot dont l'état est sauvegardé (attribut du bot)
+COMPOSANTS = ("moderator", "analytics", "raid_shield")
+
+
+def capturer(bot) -> dict:
+    """Photo de l'état des composants (dans la boucle asyncio : cohérente)."""
+    etat = {"version": VERSION, "date": time.time()}
+    for nom in COMPOSANTS:
+        composant = getattr(bot, nom, None)
+        if composant is not None:
+            etat[nom] = composant.exporter_etat()
+    return etat
+
+
+def restaurer(bot, etat: dict | None) -> float:
+    """Réinjecte l'état dans les composants. Retourne la durée en ms."""
+    debut = time.perf_counter()
+    if not etat or etat.get("version") != VERSION:
+        return 0.0
+    if time.time() - etat.get("date", 0) > STATE_SNAPSHOT_MAX_AGE_S:
+        print("[ETAT] Sauvegarde trop ancienne, ignorée")
+        return 0.0
+    for nom in COMPOSANTS:
+        composant = getattr(bot, nom, None)
+        if composant is not None and nom in etat:
+            try:
+                composant.restaurer_etat(etat[nom])
+            except Exception as e:
+                print(f"[ETAT] Erreur restauration {nom}: {e}")
+    return (time.perf_counter() - debut) * 1000
+
+
+def charger(chemin: str = STATE_SNAPSHOT_FILE) -> dict | None:
+    """Lit la dernière sauvegarde sur disque (None si absente ou illisible)."""
+    if not os.path.exists(chemin):
+        return None
+    try:
+        with open(chemin, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"[ETAT] Erreur lecture {chemin}: {e}")
+        return None
+
+
+def _ecrire(etat: dict, chemin: str):
+    donnees = pickle.dumps(etat, protocol=5)
+    os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+    tmp = chemin + ".tmp"
+    with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+        f.write(donnees)
+    os.replace(tmp, chemin)
+
+
+class Snapshotter:
+    """Sauvegarde périodique de l'état du bot."""
+
+    def __init__(self, bot, chemin: str = STATE_SNAPSHOT_FILE):
+        self.bot = bot
+        self.chemin = chemin
+        self.dernier = None  # Dernière capture (reprise en mémoire après un crash)
+        self._tache = None
+
+    async def start(self):
+        if self._tache is None:
+            self._tache = asyncio.create_task(self._boucle())
+
+    async def stop(self):
+        """Arrête la boucle et écrit une dernière sauvegarde."""
+        if self._tache:
+            self._tache.cancel()
+            try:
+                await self._tache
+            except asyncio.CancelledError:
+                pass
+            self._tache = None
+        await self.sauver()
+
+    async def sauver(self):
+        try:
+            self.dernier = capturer(self.bot)
+            # Sérialisation + écriture disque hors de la boucle (la capture ne partage rien avec les composants)
+            await asyncio.to_thread(_ecrire, self.dernier, self.chemin)
+        except Exception as e:
+            print(f"[ETAT] Erreur sauvegarde: {e}")
+
+    async def _boucle(self):
+        while True:
+            await asyncio.sleep(STATE_SNAPSHOT_S)
+            await self.sauver()
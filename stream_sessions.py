@@ -0,0 +1,181 @@
+"""
+Historique des streams : sessions, échantillons de viewers et de catégorie
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Une session est ouverte quand l'announcer détecte le live, puis chaque poll
+(POLL_INTERVAL_S) ajoute un échantillon (viewers, catégorie) : aucun appel
+Helix en plus. À la fin du live, la session est close avec le résumé du chat
+(voir chat_analytics). Le tout est stocké dans une base SQLite indexée
+(data/streams.db) : les requêtes du type "viewers moyens par catégorie sur
+30 jours" ne lisent que l'index. `!uptime` lit la session en mémoire.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from config import STREAMS_DB_FILE
+
+
+class HistoriqueStreams:
+    """Base SQLite des streams (appelée depuis un thread : ne bloque pas la boucle)."""
+
+    def __init__(self, chemin: str = STREAMS_DB_FILE):
+        self.chemin = chemin
+        self._conn = None
+        self._verrou = threading.Lock()
+
+    def ouvrir(self):
+        os.makedirs(os.path.dirname(self.chemin) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.chemin, check_same_thread=False)
+        with self._verrou, self._conn:
+            # WAL : le dashboard lit pendant que le bot écrit
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY,
+                    stream_id TEXT UNIQUE NOT NULL,
+                    debut REAL NOT NULL,
+                    fin REAL,
+                    titre TEXT,
+                    categorie TEXT,
+                    pic_viewers INTEGER NOT NULL DEFAULT 0,
+                    messages INTEGER,
+                    chatters INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS idx_sessions_debut ON sessions(debut);
+                CREATE TABLE IF NOT EXISTS echantillons (
+                    session_id INTEGER NOT NULL REFERENCES sessions(id),
+                    date REAL NOT NULL,
+                    viewers INTEGER NOT NULL,
+                    categorie TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_echantillons_session ON echantillons(session_id, date);
+                -- Index couvrant pour les moyennes par catégorie
+                CREATE INDEX IF NOT EXISTS idx_echantillons_date ON echantillons(date, categorie, viewers);
+            """)
+
+    def fermer(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def ouvrir_session(self, stream_id: str, debut: float, titre: str, categorie: str) -> int:
+        """Session du stream (reprise si elle existe déjà). Les sessions restées ouvertes sont closes."""
+        with self._verrou, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (stream_id, debut, titre, categorie) VALUES (?, ?, ?, ?)",
+                (stream_id, debut, titre, categorie)
+            )
+            session_id = self._conn.execute(
+                "SELECT id FROM sessions WHERE stream_id = ?", (stream_id,)
+            ).fetchone()[0]
+            # Bot arrêté pendant la fin d'un live : fin = dernier échantillon
+            self._conn.execute("""
+                UPDATE sessions SET fin = COALESCE(
+                    (SELECT MAX(date) FROM echantillons e WHERE e.session_id = sessions.id), debut)
+                WHERE fin IS NULL AND id != ?
+            """, (session_id,))
+            self._conn.execute("UPDATE sessions SET fin = NULL WHERE id = ?", (session_id,))
+        return session_id
+
+    def echantillon(self, session_id: int, date: float, viewers: int, categorie: str):
+        with self._verrou, self._conn:
+            self._conn.execute("INSERT INTO echantillons VALUES (?, ?, ?, ?)",
+                               (session_id, date, viewers, categorie))
+            self._conn.execute("UPDATE sessions SET pic_viewers = MAX(pic_viewers, ?) WHERE id = ?",
+                               (viewers, session_id))
+
+    def clore_session(self, session_id: int, fin: float, messages: int | None, chatters: int | None):
+        with self._verrou, self._conn:
+            self._conn.execute(
+                "UPDATE sessions SET fin = ?, messages = ?, chatters = ? WHERE id = ?",
+                (fin, messages, chatters, session_id)
+            )
+
+    def moyenne_par_categorie(self, jours: int = 30) -> list[dict]:
+        """Viewers moyens / max par catégorie sur les `jours` derniers jours (un échantillon par poll)."""
+        with self._verrou:
+            lignes = self._conn.execute("""
+                SELECT categorie, AVG(viewers), MAX(viewers), COUNT(*)
+                FROM echantillons WHERE date >= ?
+                GROUP BY categorie ORDER BY AVG(viewers) DESC
+            """, (time.time() - jours * 86400,)).fetchall()
+        return [{"categorie": c, "viewers_moyens": round(moy, 1), "pic_viewers": pic, "echantillons": n}
+                for c, moy, pic, n in lignes]
+
+    def dernieres(self, n: int = 20) -> list[dict]:
+        """Dernières sessions (la plus récente d'abord)."""
+        cles = ("id", "stream_id", "debut", "fin", "titre", "categorie", "pic_viewers", "messages", "chatters")
+        with self._verrou:
+            lignes = self._conn.execute(
+                f"SELECT {', '.join(cles)} FROM sessions ORDER BY debut DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [dict(zip(cles, ligne)) for ligne in lignes]
+
+
+class SessionsStream:
+    """Session du stream en cours, alimentée par les polls de l'announcer."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.historique = HistoriqueStreams()
+        self.session_id = None
+        self.stream_id = None
+        self.debut = None  # Timestamp du début du live en cours (None = hors ligne)
+        self.verifie = False  # Au moins un poll de l'announcer depuis le démarrage
+        self._ouvert = False
+
+    async def start(self):
+        if not self._ouvert:
+            await asyncio.to_thread(self.historique.ouvrir)
+            self._ouvert = True
+
+    async def stop(self):
+        if self._ouvert:
+            self.historique.fermer()
+            self._ouvert = False
+
+    async def echantillonner(self, stream):
+        """Appelé à chaque poll pendant le live (ouvre la session au premier)."""
+        maintenant = time.time()
+        categorie = stream.game_name or ""
+        if self.stream_id != stream.id:
+            self.stream_id = stream.id
+            self.debut = stream.started_at.timestamp() if stream.started_at else maintenant
+            self.session_id = None
+        self.verifie = True
+        if not self._ouvert:
+            return
+        try:
+            if self.session_id is None:
+                self.session_id = await asyncio.to_thread(
+                    self.historique.ouvrir_session, str(stream.id), self.debut, stream.title or "", categorie
+                )
+                print(f"[STREAMS] Session #{self.session_id} ouverte ({categorie})")
+            await asyncio.to_thread(
+                self.historique.echantillon, self.session_id, maintenant, stream.viewer_count or 0, categorie
+            )
+        except Exception as e:
+            print(f"[STREAMS] Erreur enregistrement: {e}")
+
+    async def hors_ligne(self, resume: dict | None = None):
+        """Poll hors live. À la fin d'un live, clôt la session avec le résumé du chat (chat_analytics)."""
+        self.verifie = True
+        session_id, self.session_id, self.stream_id, self.debut = self.session_id, None, None, None
+        if session_id is None or not self._ouvert:
+            return
+        resume = resume or {}
+        try:
+            await asyncio.to_thread(
+                self.historique.clore_session, session_id, time.time(),
+                resume.get("messages"), resume.get("chatters")
+            )
+            print(f"[STREAMS] Session #{session_id} close")
+        except Exception as e:
+            print(f"[STREAMS] Erreur clôture: {e}")
+
+    def uptime(self) -> float | None:
+        """Durée du live en cours (secondes), None si hors ligne (voir `verifie`)."""
+        return time.time() - self.debut if self.debut is not None else None
@@ -0,0 +1,52 @@
+"""
+Superviseur des composants (bot Twitch, bot Discord...)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Chaque composant est une coroutine relancée quand elle plante (immédiatement,
+puis avec un backoff exponentiel si ça recommence), sans arrêter les autres. Le backoff est remis à zéro
+quand un composant a tourné assez longtemps sans erreur.
+"""
+
+import asyncio
+import time
+from config import SUPERVISOR_BACKOFF_MIN_S, SUPERVISOR_BACKOFF_MAX_S, SUPERVISOR_STABLE_S
+
+
+class Superviseur:
+    """Lance et relance des composants indépendants."""
+
+    def __init__(self):
+        self._taches = {}
+        self.redemarrages = {}
+
+    def lancer(self, nom: str, fabrique):
+        """Lance un composant. `fabrique()` retourne la coroutine à exécuter (rappelée à chaque redémarrage)."""
+        self.redemarrages[nom] = 0
+        self._taches[nom] = asyncio.create_task(self._surveiller(nom, fabrique))
+
+    async def _surveiller(self, nom: str, fabrique):
+        delai = 0  # Premier redémarrage immédiat
+        while True:
+            debut = time.monotonic()
+            try:
+                await fabrique()
+                print(f"[SUPERVISEUR] {nom} s'est arrêté")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if time.monotonic() - debut >= SUPERVISOR_STABLE_S:
+                    delai = 0
+                self.redemarrages[nom] += 1
+                print(f"[SUPERVISEUR] ❌ {nom} a planté ({type(e).__name__}: {e}), redémarrage dans {delai:.0f}s")
+                await asyncio.sleep(delai)
+                delai = min(max(delai * 2, SUPERVISOR_BACKOFF_MIN_S), SUPERVISOR_BACKOFF_MAX_S)
+
+    async def attendre(self):
+        """Attend que tous les composants lancés se terminent."""
+        await asyncio.gather(*self._taches.values())
+
+    async def arreter(self):
+        for tache in self._taches.values():
+            tache.cancel()
+        await asyncio.gather(*self._taches.values(), return_exceptions=True)
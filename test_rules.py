@@ -0,0 +1,49 @@
+"""
+Mots interdits / mots-clés scam sur la forme normalisée : python -m pytest test_rules.py
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+"""
+
+import pytest
+from rules import Faits, compiler, source_par_defaut
+
+
+@pytest.fixture(scope="module")
+def regles():
+    return compiler({**source_par_defaut(), "banned_words": ["viagra", "crypto", "follow4follow"],
+                     "scam_keywords": ["buy viewers", "doge"]}, 0)
+
+
+def _banni(regles, texte: str) -> bool:
+    faits = Faits.depuis(texte)
+    return regles.banned_words.cherche(faits.normalise, faits.mots)
+
+
+def _scam(regles, texte: str) -> bool:
+    faits = Faits.depuis(texte)
+    return regles.scam_keywords.cherche(faits.normalise, faits.mots)
+
+
+@pytest.mark.parametrize("texte", [
+    "crypto", "CRYPTO gratuit", "cryptocurrency", "achète des cryptomonnaies",  # sous-chaîne (comme avant)
+    "cr ypto", "c r y p t o", "cry.pto", "v.i.a.g.r.a", "v1agra", "vіagra",      # mots coupés / déguisés
+    "follow4follow", "follow 4 follow",
+])
+def test_mots_bannis_detectes(regles, texte):
+    assert _banni(regles, texte)
+
+
+@pytest.mark.parametrize("texte", [
+    "via gratuit", "le cri du coeur", "on va gra ver", "bonne soirée à tous",
+])
+def test_mots_bannis_sans_faux_positif(regles, texte):
+    assert not _banni(regles, texte)
+
+
+@pytest.mark.parametrize("texte", ["buy viewers", "BUY   VIEWERS", "buy view ers", "d o g e", "dogecoin"])
+def test_scam_detecte(regles, texte):
+    assert _scam(regles, texte)
+
+
+@pytest.mark.parametrize("texte", ["I do get it", "buy the game, viewers", "do gentil"])
+def test_scam_sans_faux_positif(regles, texte):
+    assert not _scam(regles, texte)
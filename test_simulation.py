@@ -0,0 +1,49 @@
+"""
+Scénarios de simulation (voir simulation.py) : python -m pytest test_simulation.py
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+"""
+
+import os
+import sys
+import pytest
+
+pytest.importorskip("twitchio")
+pytest.importorskip("aiohttp")
+
+RACINE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="module")
+def simulation():
+    # config lit l'environnement à l'import (fixé par simulation.executer) : modules du dépôt réimportés
+    for nom, module in list(sys.modules.items()):
+        fichier = getattr(module, "__file__", None)
+        if fichier and os.path.dirname(os.path.abspath(fichier)) == RACINE and not nom.startswith("test_"):
+            del sys.modules[nom]
+    import simulation
+    return simulation
+
+
+def _verifier(rapport: dict):
+    echecs = [f"{v['nom']} : {v['detail']}" for v in rapport["verifications"] if not v["ok"]]
+    assert not echecs, echecs
+    assert not rapport["erreurs"], rapport["erreurs"]
+
+
+def test_stream_10h(simulation):
+    rapport = simulation.executer(simulation.stream_10h, viewers=300, par_minute=10)
+    _verifier(rapport)
+    assert rapport["duree_virtuelle_s"] >= 10 * 3600
+    assert rapport["acceleration"] > 100
+
+
+def test_raid(simulation):
+    _verifier(simulation.executer(simulation.raid))
+
+
+def test_panne_api(simulation):
+    _verifier(simulation.executer(simulation.panne_api))
+
+
+def test_cooldown_annonce(simulation):
+    _verifier(simulation.executer(simulation.cooldown_annonce))
@@ -0,0 +1,134 @@
+"""
+Normalisation des messages pour la détection des mots interdits / scam
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Ramène un message à une forme normalisée avant de passer les regex :
+  - décomposition Unicode (NFKD : pleine chasse, ligatures, exposants...)
+  - suppression des accents et caractères invisibles
+  - homoglyphes (cyrillique / grec -> latin) et leetspeak (v1agra -> viagra)
+  - espaces et ponctuation ramenés à un seul espace (les mots restent séparés),
+    lettres isolées recollées (v.i.a.g.r.a)
+
+Tout passe par une seule table str.translate précalculée : coût linéaire,
+un seul passage sur le texte.
+
+Les mots-clés (MotsCles) sont cherchés en sous-chaîne sur la forme normalisée
+("cryptocurrency" contient "crypto"), et aussi comme suite exacte de mots
+consécutifs recollés ("cr ypto") : un mot-clé à cheval sur une partie de mot
+("via gratuit", "I do get it") ne compte pas. La forme compacte (sans séparateurs, points
+conservés) ne sert qu'à repérer les liens déguisés (voir link_policy.hotes_caches).
+"""
+
+import re
+import unicodedata
+
+# Homoglyphes courants (cyrillique / grec / symboles) -> latin
+CONFUSABLES = {
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h",
+    "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i",
+    "ї": "i", "ј": "j", "ѕ": "s", "ԁ": "d", "ԛ": "q", "ԝ": "w", "ɡ": "g",
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v",
+    "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ω": "w", "ς": "c",
+    "ı": "i", "ł": "l", "ø": "o", "đ": "d", "ß": "ss", "æ": "ae", "œ": "oe",
+}
+
+# Leetspeak -> lettres
+LEET = {
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+    "@": "a", "$": "s", "€": "e", "£": "l",
+}
+
+# Caractères invisibles utilisés pour couper les mots
+ZERO_WIDTH = "\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff\u00ad\u180e\u034f"
+
+# Séparateurs ramenés à un espace ("v.i.a.g.r.a" -> "v i a g r a")
+SEPARATEURS = " \t\n\r\f\v\u00a0\u3000.,;:!?'\"`´^~*_-+=/\\|()[]{}<>#%&"
+
+
+def _construire_table(separateur: str | None, garder: str = "") -> dict:
+    table = {}
+    for source, cible in CONFUSABLES.items():
+        table[ord(source)] = cible
+    for source, cible in LEET.items():
+        table[ord(source)] = cible
+    for c in ZERO_WIDTH:
+        table[ord(c)] = None
+    for c in SEPARATEURS:
+        if c not in garder:
+            table[ord(c)] = separateur
+    # Diacritiques combinants (après NFKD : "é" -> "e" + U+0301)
+    for code in range(0x0300, 0x0370):
+        table[code] = None
+    return table
+
+
+TABLE_NORMALISATION = _construire_table(" ")
+# Forme compacte : "streamboo (.) com" -> "streamboo.com"
+TABLE_COMPACTE = _construire_table(None, garder=".")
+
+
+# Lettres isolées recollées à partir de ce nombre ("v i a g r a" oui, "il y a" non)
+LETTRES_ISOLEES_MIN = 3
+
+
+def _recoller(mots: list[str]) -> list[str]:
+    """Recolle les suites de lettres isolées : ['v', 'i', 'a', 'g', 'r', 'a'] -> ['viagra']."""
+    resultat = []
+    suite = []
+    for mot in mots + [""]:
+        if len(mot) == 1:
+            suite.append(mot)
+            continue
+        if len(suite) >= LETTRES_ISOLEES_MIN:
+            resultat.append("".join(suite))
+        else:
+            resultat.extend(suite)
+        suite = []
+        if mot:
+            resultat.append(mot)
+    return resultat
+
+
+def normaliser(texte: str) -> str:
+    """Forme normalisée d'un message : minuscule, mots séparés par un seul espace."""
+    if not texte.isascii():
+        texte = unicodedata.normalize("NFKD", texte)
+    return " ".join(_recoller(texte.lower().translate(TABLE_NORMALISATION).split()))
+
+
+def compacter(texte: str) -> str:
+    """Forme compacte (séparateurs retirés sauf le point) : uniquement pour les liens déguisés."""
+    if not texte.isascii():
+        texte = unicodedata.normalize("NFKD", texte)
+    return texte.lower().translate(TABLE_COMPACTE)
+
+
+class MotsCles:
+    """Mots-clés compilés sur leur forme normalisée (voir normaliser)."""
+    __slots__ = ("_regex", "_colles", "_longueur_max")
+
+    def __init__(self, mots: list[str]):
+        formes = sorted({f for f in map(normaliser, mots) if f}, key=len, reverse=True)
+        self._regex = re.compile("|".join(re.escape(f) for f in formes)) if formes else None
+        # Formes sans espace ("buy viewers" -> "buyviewers") pour les mots coupés
+        self._colles = frozenset(f.replace(" ", "") for f in formes)
+        self._longueur_max = max(map(len, self._colles), default=0)
+
+    def __bool__(self) -> bool:
+        return self._regex is not None
+
+    def cherche(self, normalise: str, mots: tuple[str, ...]) -> bool:
+        """`normalise` contient un mot-clé, ou une suite de `mots` (ses mots) recollés en est un."""
+        if self._regex is None:
+            return False
+        if self._regex.search(normalise):
+            return True
+        for i in range(len(mots) - 1):
+            colle = mots[i]
+            for mot in mots[i + 1:]:
+                colle += mot
+                if len(colle) > self._longueur_max:
+                    break
+                if colle in self._colles:
+                    return True
+        return False
@@ -0,0 +1,215 @@
+"""
+Gestion du token Twitch (validation, refresh anticipé, persistance)
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Le token est stocké dans TOKEN_STORE_FILE (access + refresh + expiration)
+et rafraîchi en arrière-plan avant son expiration. Tous les appels API
+passent par `await get_token()` : un seul refresh à la fois, partagé par
+toutes les requêtes qui attendent. En cas d'échec, les réessais s'espacent
+(backoff exponentiel) et le log Discord est limité à un par TOKEN_ERROR_LOG_S.
+
+start() est appelé par Bot.start() avant la connexion IRC : TwitchIO valide le
+token dans _connect, un token stocké déjà expiré doit donc être rafraîchi avant.
+"""
+
+import asyncio
+import json
+import os
+import time
+from config import (
+    TWITCH_TOKEN, TWITCH_REFRESH_TOKEN, TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET,
+    TOKEN_STORE_FILE, TOKEN_REFRESH_MARGIN_S, TOKEN_VALIDATE_INTERVAL_S, TWITCH_REQUIRED_SCOPES,
+    TOKEN_RETRY_MIN_S, TOKEN_RETRY_MAX_S, TOKEN_ERROR_LOG_S
+)
+
+VALIDATE_URL = "https://id.twitch.tv/oauth2/validate"
+REFRESH_URL = "https://id.twitch.tv/oauth2/token"
+
+
+def _sans_prefixe(token: str | None) -> str:
+    if token and token.startswith("oauth:"):
+        return token[len("oauth:"):]
+    return token or ""
+
+
+class TokenManager:
+    """Fournit un token valide à tout le bot et le rafraîchit à l'avance."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.access_token = _sans_prefixe(TWITCH_TOKEN)
+        self.refresh_token = TWITCH_REFRESH_TOKEN
+        self.expires_at = 0.0
+        self.scopes = []
+        self.login = None
+        self.user_id = None
+        self.echecs = 0  # Refresh ratés d'affilée
+        self._prochain_essai = 0.0
+        self._dernier_log_echec = 0.0
+        self._refresh_en_cours = None
+        self._tache = None
+        self._charger()
+
+    # ─────────────────────────── STOCKAGE ───────────────────────────
+
+    def _charger(self):
+        """Charge le dernier token connu (plus récent que celui du .env après un refresh)."""
+        if not os.path.exists(TOKEN_STORE_FILE):
+            return
+        try:
+            with open(TOKEN_STORE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("access_token"):
+                self.access_token = data["access_token"]
+                self.refresh_token = data.get("refresh_token") or self.refresh_token
+                self.expires_at = data.get("expires_at", 0)
+                self.scopes = data.get("scopes", [])
+        except Exception as e:
+            print(f"[TOKEN] Erreur lecture {TOKEN_STORE_FILE}: {e}")
+
+    def _sauver(self):
+        data = {
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "expires_at": self.expires_at,
+            "scopes": self.scopes,
+        }
+        try:
+            tmp = TOKEN_STORE_FILE + ".tmp"
+            with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, TOKEN_STORE_FILE)
+        except Exception as e:
+            print(f"[TOKEN] Erreur sauvegarde: {e}")
+
+    @property
+    def token_irc(self) -> str:
+        """Token au format attendu par la connexion IRC (oauth:xxx)."""
+        return f"oauth:{self.access_token}"
+
+    # ─────────────────────────── CYCLE DE VIE ───────────────────────────
+
+    async def start(self):
+        """Valide le token au démarrage (refresh si besoin) puis lance le refresh anticipé."""
+        if not await self.valider():
+            await self.rafraichir()
+        manquants = [s for s in TWITCH_REQUIRED_SCOPES if s not in self.scopes]
+        if manquants:
+            print(f"[TOKEN] ⚠️ Scopes manquants : {', '.join(manquants)}")
+            self.bot.moderator._log_background(f"⚠️ Token Twitch : scopes manquants ({', '.join(manquants)})")
+        if self._tache is None:
+            self._tache = asyncio.create_task(self._boucle())
+
+    async def stop(self):
+        if self._tache:
+            self._tache.cancel()
+            try:
+                await self._tache
+            except asyncio.CancelledError:
+                pass
+            self._tache = None
+
+    async def _boucle(self):
+        """Rafraîchit avant expiration et valide régulièrement (exigé par Twitch)."""
+        while True:
+            if self.echecs:
+                # Dernier refresh raté : attente du prochain essai (backoff)
+                delai = self._prochain_essai - time.time()
+            else:
+                delai = min(self.expires_at - time.time() - TOKEN_REFRESH_MARGIN_S, TOKEN_VALIDATE_INTERVAL_S)
+            await asyncio.sleep(max(TOKEN_RETRY_MIN_S, delai))
+            try:
+                if self.expires_at - time.time() <= TOKEN_REFRESH_MARGIN_S or not await self.valider():
+                    await self.rafraichir()
+            except Exception as e:
+                print(f"[TOKEN] Erreur boucle: {e}")
+
+    # ─────────────────────────── API ───────────────────────────
+
+    async def get_token(self) -> str:
+        """Retourne un token valide (attend le refresh en cours s'il y en a un)."""
+        if self._refresh_en_cours is not None or (
+                self.expires_at and self.expires_at - time.time() <= TOKEN_REFRESH_MARGIN_S
+                and time.time() >= self._prochain_essai):
+            await self.rafraichir()
+        return self.access_token
+
+    async def valider(self) -> bool:
+        """Appelle /oauth2/validate : met à jour expiration et scopes. False si le token est invalide."""
+        session = getattr(self.bot, "http_session", None)
+        if not session:
+            return True
+        try:
+            headers = {"Authorization": f"OAuth {self.access_token}"}
+            async with session.get(VALIDATE_URL, headers=headers, timeout=5) as resp:
+                if resp.status == 401:
+                    return False
+                if resp.status != 200:
+                    print(f"[TOKEN] Validation {resp.status}: {await resp.text()}")
+                    return True  # Twitch indisponible : on garde le token
+                data = await resp.json()
+        except Exception as e:
+            print(f"[TOKEN] Erreur validation: {e}")
+            return True
+        self.expires_at = time.time() + data.get("expires_in", 0)
+        self.scopes = data.get("scopes", [])
+        self.login = data.get("login")
+        self.user_id = data.get("user_id")
+        self._sauver()
+        return True
+
+    async def rafraichir(self) -> str:
+        """Rafraîchit le token. Un seul refresh à la fois : les appels concurrents attendent le même."""
+        if self._refresh_en_cours is None:
+            self._refresh_en_cours = asyncio.ensure_future(self._rafraichir())
+        tache = self._refresh_en_cours
+        try:
+            await asyncio.shield(tache)
+        finally:
+            if self._refresh_en_cours is tache and tache.done():
+                self._refresh_en_cours = None
+        return self.access_token
+
+    def _echec(self, detail: str):
+        """Refresh raté : prochain essai repoussé (backoff exponentiel), log Discord limité."""
+        self.echecs += 1
+        delai = min(TOKEN_RETRY_MAX_S, TOKEN_RETRY_MIN_S * 2 ** (self.echecs - 1))
+        self._prochain_essai = time.time() + delai
+        print(f"[TOKEN] ❌ {detail} (échec {self.echecs}, nouvel essai dans {delai}s)")
+        if time.time() - self._dernier_log_echec >= TOKEN_ERROR_LOG_S:
+            self._dernier_log_echec = time.time()
+            self.bot.moderator._log_background(f"❌ Token Twitch : {detail} (échec {self.echecs})")
+
+    async def _rafraichir(self):
+        session = getattr(self.bot, "http_session", None)
+        if not session or not self.refresh_token or not TWITCH_CLIENT_SECRET:
+            self._echec("refresh impossible (session, refresh token ou client secret manquant)")
+            return
+        data = {
+            "grant_type": "refresh_token",
+            "refresh_token": self.refresh_token,
+            "client_id": TWITCH_CLIENT_ID,
+            "client_secret": TWITCH_CLIENT_SECRET,
+        }
+        try:
+            async with session.post(REFRESH_URL, data=data, timeout=10) as resp:
+                if resp.status != 200:
+                    err = await resp.text()
+                    self._echec(f"refresh refusé ({resp.status}: {err[:200]})")
+                    return
+                reponse = await resp.json()
+        except Exception as e:
+            self._echec(f"erreur refresh ({e})")
+            return
+
+        self.access_token = reponse["access_token"]
+        self.refresh_token = reponse.get("refresh_token", self.refresh_token)
+        self.expires_at = time.time() + reponse.get("expires_in", 0)
+        self.scopes = reponse.get("scope", self.scopes)
+        self.echecs = 0
+        self._prochain_essai = 0.0
+        self._sauver()
+        # TwitchIO utilise aussi ce token : appels Helix et (re)connexion IRC
+        self.bot._http.token = self.access_token
+        self.bot._connection._token = self.access_token
+        print("[TOKEN] 🔄 Token rafraîchi")
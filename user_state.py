@@ -0,0 +1,75 @@
+"""
+État de modération par viewer en enregistrements compacts
+Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
+
+Un seul enregistrement `__slots__` par viewer, indexé par son ID Twitch
+(stable, contrairement au pseudo) : une seule recherche par message au lieu
+d'une par dictionnaire (flood, warns, date de création...).
+Le registre est borné (VIEWERS_ETAT_MAX, LRU) : au-delà, le viewer qui n'a
+pas parlé depuis le plus longtemps est oublié (ses warns repartent de zéro).
+"""
+
+import sys
+from collections import OrderedDict, deque
+from config import VIEWERS_ETAT_MAX
+
+
+class EtatViewer:
+    """État de modération d'un viewer."""
+    __slots__ = ("login", "flood", "warns", "date_creation")
+
+    def __init__(self, login: str):
+        self.login = login
+        # Horodatages des derniers messages (tronqué selon les règles de flood actives)
+        self.flood = deque()
+        self.warns = 0
+        self.date_creation = None  # Timestamp de création du compte (cache API)
+
+    def exporter(self) -> tuple:
+        return self.login, tuple(self.flood), self.warns, self.date_creation
+
+    @classmethod
+    def depuis(cls, donnees: tuple) -> "EtatViewer":
+        login, flood, warns, date_creation = donnees
+        etat = cls(login)
+        etat.flood.extend(flood)
+        etat.warns = warns
+        etat.date_creation = date_creation
+        return etat
+
+
+class RegistreViewers:
+    """{ID Twitch: EtatViewer}, du moins au plus récemment actif (borné à `taille_max`)."""
+
+    def __init__(self, taille_max: int = VIEWERS_ETAT_MAX):
+        self.taille_max = taille_max
+        self._viewers = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._viewers)
+
+    def obtenir(self, user_id: str | None, login: str) -> EtatViewer:
+        """Enregistrement du viewer (créé au premier message). Le pseudo sert de clé si l'ID manque."""
+        cle = sys.intern(user_id or login.lower())
+        etat = self._viewers.get(cle)
+        if etat is None:
+            etat = self._viewers[cle] = EtatViewer(login)
+            if len(self._viewers) > self.taille_max:
+                self._viewers.popitem(last=False)
+            return etat
+        self._viewers.move_to_end(cle)
+        if etat.login != login:
+            etat.login = login  # Changement de pseudo
+        return etat
+
+    def exporter(self) -> dict:
+        return {cle: etat.exporter() for cle, etat in self._viewers.items()}
+
+    def restaurer(self, donnees: dict):
+        # Ordre d'export conservé : les plus récemment actifs en dernier
+        for cle, valeurs in list(donnees.items())[-self.taille_max:]:
+            self._viewers[sys.intern(cle)] = EtatViewer.depuis(valeurs)
+            self._viewers.move_to_end(cle)
+        while len(self._viewers) > self.taille_max:
+            self._viewers.popitem(last=False)
+
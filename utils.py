@@ -3,19 +3,7 @@ Fonctions utilitaires pour le bot RyosaChii
 Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
 """
 
-import re
-from config import LINK_REGEX, LINK_WHITELIST, STREAMER_TAG_REGEX
-
-
-def is_link_whitelisted(text: str) -> bool:
-    """Vérifie si tous les liens du texte sont dans la whitelist."""
-    if not LINK_WHITELIST:
-        return False
-    for match in re.finditer(LINK_REGEX, text):
-        link = match.group(0).lower()
-        if not any(re.search(pattern, link, re.IGNORECASE) for pattern in LINK_WHITELIST):
-            return False
-    return True
+from config import STREAMER_TAG_REGEX
 
 
 def detect_streamer(title: str) -> str:
@@ -3,80 +3,38 @@ Module de statistiques des viewers (Temps de visionnage, rangs, etc.)
 Copyright (c) 2026 Tosachii et LaCabaneVirtuelle
 """
 
-import json
-import os
 import asyncio
-import time
 from datetime import datetime
 from twitchio.ext import commands, routines
-
-DATA_FILE = "data/viewers.json"
+from presence import PresenceChat
+from config import LOYALTY_NOM, LOYALTY_REWARDS
 
 class ViewerStats(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.stats = {}
-        self.session_start = {}  # {user_id: timestamp} pour la session actuelle
-        self._load_stats()
-        self.verifier_presence.start()
+        self.presence = PresenceChat(bot)
+        # Comptage uniquement pendant le live (routine arrêtée hors ligne)
+        self.bot.etat_live.piloter_routine(self.verifier_presence, self.presence.reinitialiser)
 
-    def _load_stats(self):
-        """Charge les statistiques depuis le fichier JSON."""
-        if os.path.exists(DATA_FILE):
-            try:
-                with open(DATA_FILE, "r", encoding="utf-8") as f:
-                    self.stats = json.load(f)
-            except Exception as e:
-                print(f"[STATS] Erreur chargement: {e}")
-                self.stats = {}
-        
-        # S'assurer que le dossier data existe
-        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
+    async def temps_regarde(self, user_id: str) -> str:
+        """Temps de visionnage formaté (ex: 3h05)."""
+        minutes = await self.bot.fidelite.minutes(user_id)
+        return f"{minutes // 60}h{minutes % 60:02d}"
 
-    def _save_stats(self):
-        """Sauvegarde les statistiques dans le fichier JSON."""
-        try:
-            with open(DATA_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.stats, f, indent=4)
-        except Exception as e:
-            print(f"[STATS] Erreur sauvegarde: {e}")
-
-    def _update_user(self, user):
-        """Met à jour les infos de base d'un viewer."""
-        user_id = str(user.id)
-        if user_id not in self.stats:
-            self.stats[user_id] = {
-                "username": user.name,
-                "total_minutes": 0,
-                "first_seen": time.time(),
-                "last_seen": time.time()
-            }
-        else:
-            self.stats[user_id]["username"] = user.name
-            self.stats[user_id]["last_seen"] = time.time()
+    async def top(self, n: int = 5) -> list[tuple[str, int]]:
+        """Les n viewers les plus fidèles : [(pseudo, minutes)]."""
+        return [(v["login"], v["minutes"]) for v in await self.bot.fidelite.classement_temps(n)]
 
     @routines.routine(minutes=1)
     async def verifier_presence(self):
-        """Vérifie les chatters présents et ajoute 1 minute à leur compteur."""
-        # On ne compte que si le stream est (théoriquement) lancé ou si le bot détecte de l'activité
-        # Pour simplifier ici, on compte pour tous les gens connectés au chat
+        """Vérifie les chatters présents et ajoute 1 minute à leur compteur (live uniquement, voir live_state)."""
         try:
-            # Note: Pour TwitchIO, on récupère les chatters via le channel
-            # Il faut que le bot ait rejoint le channel
-            for channel in self.bot.connected_channels:
-                chatters = channel.chatters
-                if not chatters:
-                    continue
-                
-                for chatter in chatters:
-                    # Ignore le bot lui-même
-                    if chatter.name.lower() == self.bot.nick.lower():
-                        continue
-
-                    self._update_user(chatter)
-                    self.stats[str(chatter.id)]["total_minutes"] += 1
-                
-            self._save_stats()
+            # Helix Get Chatters (bots filtrés), voir presence
+            presents = await self.presence.relever()
+            if presents is None:
+                return  # Relevé précédent encore en cours : cette minute est sautée
+            # Un seul UPSERT groupé pour tous les présents (points et minutes de visionnage)
+            await self.bot.fidelite.crediter_presence(list(presents.items()))
         except Exception as e:
             print(f"[STATS] Erreur boucle présence: {e}")
 
@@ -86,39 +44,25 @@ class ViewerStats(commands.Cog):
         user_id = str(ctx.author.id)
         
         # 1. Temps de visionnage
-        minutes = 0
-        if user_id in self.stats:
-            minutes = self.stats[user_id]["total_minutes"]
+        temps_str = await self.temps_regarde(user_id)
         
-        heures = minutes // 60
-        rest_minutes = minutes % 60
-        temps_str = f"{heures}h{rest_minutes:02d}"
-        
-        # 2. Date de follow (Appel API Twitch)
-        follow_text = "Pas de follow détecté"
+        # 2. Date de follow (copie locale synchronisée en arrière-plan, voir follower_sync)
+        communaute = self.bot.communaute
         try:
-            # On cherche le channel broadcaster
-            broadcaster = (await self.bot.fetch_users(names=[ctx.channel.name]))[0]
-            # On cherche le lien de follow entre l'auteur et le broadcaster
-            # Note: fetch_followers est paginé, mais ici on veut juste un user spécifique
-            # Malheureusement l'API Twitch v5 simple n'existe plus, il faut ruser
-            # TwitchIO helper: 
-            follow = await ctx.author.fetch_follow(to_user=broadcaster.id, token=self.bot._http.token)
-            
-            if follow:
+            # Pas encore synchronisé (premier démarrage) : on ne peut rien affirmer
+            follow = await communaute.follow(user_id) if communaute.prete else None
+            if not communaute.prete:
+                follow_text = "donnée indisponible"
+            elif follow:
                 # Calcul de la durée
-                now = datetime.now(follow.followed_at.tzinfo)
-                diff = now - follow.followed_at
-                jours = diff.days
-                
-                date_follow = follow.followed_at.strftime("%d/%m/%Y")
-                follow_text = f"{jours} jours ({date_follow})"
+                followed_at = datetime.fromtimestamp(follow["followed_at"])
+                jours = (datetime.now() - followed_at).days
+                date_follow = followed_at.strftime("%d/%m/%Y")
+                follow_text = f"{jours} jours ({date_follow}, follower n°{follow['rang']})"
             else:
                 follow_text = "ne follow pas encore (HONTE !)"
-                
         except Exception as e:
-            # Souvent erreur si pas follow ou token scope manquant
-            print(f"[STATS] Erreur check follow: {e}")
+            print(f"[STATS] Erreur lecture follow: {e}")
             follow_text = "donnée indisponible"
 
         await ctx.send(f"⏳ @{ctx.author.name} : Tu as regardé le stream pendant **{temps_str}** ! "
@@ -127,24 +71,72 @@ class ViewerStats(commands.Cog):
     @commands.command(name="ScoreTime")
     async def score_time(self, ctx: commands.Context):
         """Affiche le top 5 des viewers les plus fidèles."""
-        # Trier par total_minutes décroissant
-        sorted_users = sorted(
-            self.stats.items(), 
-            key=lambda item: item[1].get("total_minutes", 0), 
-            reverse=True
-        )
-        
-        top_5 = sorted_users[:5]
         msg_lines = ["🏆 **Top 5 Fidélité** 🏆"]
         
-        for i, (uid, data) in enumerate(top_5, 1):
-            mins = data["total_minutes"]
-            h = mins // 60
-            m = mins % 60
-            pseudo = data.get("username", "Inconnu")
-            msg_lines.append(f"{i}. **{pseudo}** : {h}h{m:02d}")
+        for i, (pseudo, mins) in enumerate(await self.top(5), 1):
+            msg_lines.append(f"{i}. **{pseudo}** : {mins // 60}h{mins % 60:02d}")
             
         await ctx.send(" | ".join(msg_lines))
 
+    # ─────────────────────────── POINTS DE FIDÉLITÉ ───────────────────────────
+
+    @commands.command(name="points")
+    async def points(self, ctx: commands.Context):
+        """Solde de points du viewer et son rang."""
+        solde = await self.bot.fidelite.solde(ctx.author.id)
+        if not solde:
+            await ctx.send(f"@{ctx.author.name} Tu n'as pas encore de {LOYALTY_NOM}, reste avec nous pendant le live 💜")
+            return
+        await ctx.send(f"💰 @{ctx.author.name} : **{solde['points']} {LOYALTY_NOM}** (rang #{solde['rang']})")
+
+    @commands.command(name="toppoints")
+    async def top_points(self, ctx: commands.Context):
+        """Top 5 des soldes."""
+        classement = await self.bot.fidelite.classement(5)
+        lignes = [f"{i}. **{v['login']}** : {v['points']}" for i, v in enumerate(classement, 1)]
+        await ctx.send(f"💰 **Top {LOYALTY_NOM}** 💰 | " + " | ".join(lignes))
+
+    @commands.command(name="redeem")
+    async def redeem(self, ctx: commands.Context, nom: str = None):
+        """Dépense des points pour une récompense (!redeem <nom>)."""
+        recompense = LOYALTY_REWARDS.get((nom or "").lower())
+        if recompense is None:
+            liste = ", ".join(f"{n} ({r['cout']})" for n, r in LOYALTY_REWARDS.items())
+            await ctx.send(f"🎁 Récompenses : {liste} | !redeem <nom>")
+            return
+        reste = await self.bot.fidelite.depenser(ctx.author.id, recompense["cout"], f"redeem:{nom.lower()}")
+        if reste is None:
+            await ctx.send(f"❌ @{ctx.author.name} Pas assez de {LOYALTY_NOM} ({recompense['cout']} requis).")
+            return
+        await ctx.send(recompense["message"].format(pseudo=ctx.author.name) + f" (reste {reste} {LOYALTY_NOM})")
+
+    @commands.command(name="addpoints")
+    async def add_points(self, ctx: commands.Context, pseudo: str = None, montant: str = None):
+        """Ajoute (ou retire si négatif) des points à un viewer (Mod only)."""
+        if not ctx.author.is_mod and not ctx.author.is_broadcaster:
+            return
+        try:
+            delta = int(montant)
+        except (TypeError, ValueError):
+            await ctx.send("⚠️ Utilisation : !addpoints @pseudo <montant>")
+            return
+        users = await self.bot.fetch_users(names=[(pseudo or "").lstrip("@")]) if pseudo else []
+        if not users:
+            await ctx.send(f"❌ Viewer {pseudo} introuvable.")
+            return
+        solde = await self.bot.fidelite.ajuster(users[0].id, users[0].name, delta, f"mod:{ctx.author.name}")
+        await ctx.send(f"✅ @{users[0].name} a maintenant {solde} {LOYALTY_NOM}.")
+
+    @commands.command(name="link")
+    async def link(self, ctx: commands.Context, code: str = None):
+        """Confirme la liaison avec un compte Discord (code donné par !link sur Discord)."""
+        if not code:
+            await ctx.send(f"@{ctx.author.name} Tape !link sur le Discord pour obtenir ton code 🔗")
+            return
+        if self.bot.liens_comptes.confirmer(code, str(ctx.author.id), ctx.author.name):
+            await ctx.send(f"✅ @{ctx.author.name} Ton compte Discord est lié !")
+        else:
+            await ctx.send(f"❌ @{ctx.author.name} Code invalide ou expiré.")
+
 def prepare(bot):
     bot.add_cog(ViewerStats(bot))